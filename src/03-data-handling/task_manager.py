@@ -5,9 +5,20 @@ import tomllib
 from pathlib import Path
 from fastmcp import FastMCP
 import sqlite3
-from typing import List, Dict, Optional
+import queue
+import threading
+import functools
+import inspect
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from typing import List, Dict, Optional, Tuple
 import json
-import shutil
+import base64
+import csv
+import gzip
+import os
+import sys
+import time
 from datetime import datetime
 
 # 設定読み込み
@@ -18,13 +29,392 @@ if config_path.exists():
 else:
     config = {}
 
+# ストレージプロファイル（接続ごとに適用するPRAGMA）
+STORAGE_PROFILES = {
+    # SQLite標準のロールバックジャーナル
+    "default": {
+        "journal_mode": "DELETE",
+        "busy_timeout": 5000,
+    },
+    # WAL: 書き込み中も読み取りをブロックしない
+    "wal": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,  # 256MB
+        "cache_size": -64000,    # 約64MB（負の値はKB単位）
+        "busy_timeout": 5000,
+    },
+}
+
+def get_storage_pragmas(db_config: dict) -> dict:
+    """設定からPRAGMAを決定（プロファイル + [database.pragmas] の上書き）"""
+    profile = db_config.get("storage_profile", "default")
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"無効なストレージプロファイル: {profile}")
+    pragmas = dict(STORAGE_PROFILES[profile])
+    pragmas.update(db_config.get("pragmas", {}))
+    return pragmas
+
+def open_connection(db_path: str, pragmas: dict = None, timeout: float = 5.0) -> sqlite3.Connection:
+    """PRAGMA適用済みの接続を作成"""
+    conn = sqlite3.connect(db_path, timeout=timeout, check_same_thread=False)
+    conn.row_factory = sqlite3.Row  # 辞書形式でアクセス可能
+    conn.execute("PRAGMA foreign_keys = ON")  # 外部キー制約を有効化
+    for name, value in (pragmas or {}).items():
+        if name == "journal_mode":
+            continue  # データベース単位の設定のため init_database で適用
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+def detect_fts_tokenizer(conn: sqlite3.Connection) -> Optional[str]:
+    """利用可能なFTS5トークナイザを判定（FTS5非対応ならNone）
+    
+    日本語は単語区切りがないため、部分一致できる trigram を優先する。
+    """
+    for tokenizer in ("trigram", "unicode61"):
+        try:
+            conn.execute(
+                f"CREATE VIRTUAL TABLE temp.fts_probe USING fts5(body, tokenize='{tokenizer}')"
+            )
+            conn.execute("DROP TABLE temp.fts_probe")
+            return tokenizer
+        except sqlite3.OperationalError:
+            continue
+    return None
+
+def _migrate_tasks_fts(conn: sqlite3.Connection) -> bool:
+    """tasks の全文検索テーブルとトリガーを作成"""
+    tokenizer = detect_fts_tokenizer(conn)
+    if tokenizer is None:
+        return False
+    
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            title, description,
+            content='tasks', content_rowid='id',
+            tokenize='{tokenizer}'
+        )
+    """)
+    # tasks の変更を全文検索インデックスへ反映
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+    """)
+    # 既存タスクを取り込み、タイトル一致を説明文より重く評価する
+    conn.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO tasks_fts (tasks_fts, rank) VALUES ('rank', 'bm25(2.0, 1.0)')")
+    return True
+
+# 集計テーブルを tasks から作り直すSQL（マイグレーションと再構築ツールで共用）
+REBUILD_TASK_COUNTERS_SQL = [
+    "DELETE FROM task_counters",
+    "INSERT INTO task_counters (dimension, value, count) "
+    "SELECT 'total', '', COUNT(*) FROM tasks",
+    "INSERT INTO task_counters (dimension, value, count) "
+    "SELECT 'status', status, COUNT(*) FROM tasks GROUP BY status",
+    "INSERT INTO task_counters (dimension, value, count) "
+    "SELECT 'priority', priority, COUNT(*) FROM tasks GROUP BY priority",
+]
+
+# スキーママイグレーション（version順に適用し schema_migrations に記録）
+# 手順が関数の場合は False を返すと未適用のまま次回に持ち越す
+MIGRATIONS = [
+    (1, "add_task_list_indexes", [
+        # get_tasks（全件）の ORDER BY priority DESC, created_at DESC
+        "CREATE INDEX IF NOT EXISTS idx_tasks_priority_created "
+        "ON tasks (priority DESC, created_at DESC)",
+        # get_tasks（status指定）と get_task_statistics の GROUP BY status
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_priority_created "
+        "ON tasks (status, priority DESC, created_at DESC)",
+        # カテゴリ側からの task_categories 参照（ON DELETE CASCADE含む）
+        "CREATE INDEX IF NOT EXISTS idx_task_categories_category "
+        "ON task_categories (category_id)",
+    ]),
+    (2, "add_tasks_fts", _migrate_tasks_fts),
+    (3, "add_task_keyset_indexes", [
+        # id を末尾に含め、(priority, created_at, id) のキーセットページングに対応
+        "DROP INDEX IF EXISTS idx_tasks_priority_created",
+        "DROP INDEX IF EXISTS idx_tasks_status_priority_created",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_priority_created_id "
+        "ON tasks (priority DESC, created_at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_status_priority_created_id "
+        "ON tasks (status, priority DESC, created_at DESC, id DESC)",
+    ]),
+    (4, "add_task_counters", [
+        # get_task_statistics 用の件数テーブル（value は型を持たず status/priority をそのまま保持）
+        """
+        CREATE TABLE IF NOT EXISTS task_counters (
+            dimension TEXT NOT NULL,
+            value,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, value)
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS task_counters_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO task_counters (dimension, value, count)
+            VALUES ('total', '', 1), ('status', new.status, 1), ('priority', new.priority, 1)
+            ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS task_counters_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO task_counters (dimension, value, count)
+            VALUES ('total', '', -1), ('status', old.status, -1), ('priority', old.priority, -1)
+            ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS task_counters_update AFTER UPDATE OF status, priority ON tasks
+        WHEN old.status IS NOT new.status OR old.priority IS NOT new.priority BEGIN
+            INSERT INTO task_counters (dimension, value, count)
+            VALUES ('status', old.status, -1), ('status', new.status, 1),
+                   ('priority', old.priority, -1), ('priority', new.priority, 1)
+            ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count;
+        END
+        """,
+        *REBUILD_TASK_COUNTERS_SQL,
+    ]),
+]
+
+# 接続プール
+class ConnectionPool:
+    """SQLite接続のプール（チェックアウト/返却方式）
+
+    接続はPRAGMA適用済みの状態で保持し、リクエストごとの
+    connect()とPRAGMA実行のコストを避ける。
+    """
+    def __init__(self, db_path: str, size: int = 5, timeout: float = 5.0,
+                 pragmas: dict = None):
+        self.db_path = db_path
+        self.pragmas = pragmas or {}
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=self.size)
+        self._lock = threading.Lock()
+        # 接続の返却・空き枠の発生を待機中の acquire に知らせる
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._stats = {"checkouts": 0, "created": 0, "replaced": 0, "waits": 0}
+    
+    def _connect(self) -> sqlite3.Connection:
+        """PRAGMA適用済みの新しい接続を作成
+        
+        作成に失敗した場合は予約済みの枠を解放し、待機中の acquire を起こす。
+        """
+        try:
+            conn = open_connection(self.db_path, self.pragmas, self.timeout)
+        except Exception:
+            with self._available:
+                self._created -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self._stats["created"] += 1
+        return conn
+    
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """接続が利用可能か確認"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def acquire(self) -> sqlite3.Connection:
+        """接続をチェックアウト（上限到達時は返却を待つ）"""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        with self._available:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                    break
+                except queue.Empty:
+                    pass
+                if self._created < self.size:
+                    # 枠を予約してからロックの外で接続する
+                    self._created += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f"データベース接続の取得がタイムアウトしました（{self.timeout}秒）"
+                    )
+                if not waited:
+                    self._stats["waits"] += 1
+                    waited = True
+                self._available.wait(remaining)
+        
+        if conn is None:
+            conn = self._connect()
+        elif not self._is_healthy(conn):
+            # 壊れた接続は破棄して作り直す（枠はそのまま引き継ぐ）
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            conn = self._connect()
+            with self._lock:
+                self._stats["replaced"] += 1
+        
+        with self._lock:
+            self._stats["checkouts"] += 1
+        return conn
+    
+    def release(self, conn: sqlite3.Connection):
+        """接続をプールへ返却"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (sqlite3.Error, queue.Full):
+            conn.close()
+            with self._lock:
+                self._created -= 1
+        with self._available:
+            self._available.notify()
+    
+    def close_all(self):
+        """待機中の接続をすべて閉じる"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+    
+    def get_stats(self) -> dict:
+        """プールの利用状況"""
+        return {
+            "size": self.size,
+            "open_connections": self._created,
+            "idle_connections": self._idle.qsize(),
+            **dict(self._stats)
+        }
+
+# 読み取り結果キャッシュ
+class ResultCache:
+    """読み取りツールの結果をLRU/TTLで保持するキャッシュ
+
+    書き込みのたびに世代（generation）を進め、古い世代の結果は返さない。
+    読み取り開始後に書き込みがあった結果は保存しない。
+    """
+    def __init__(self, max_size: int = 256, ttl: float = 30.0, enabled: bool = True):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = enabled and max_size > 0
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+    
+    @staticmethod
+    def make_key(tool_name: str, arguments: dict) -> str:
+        """ツール名と引数からキャッシュキーを作成"""
+        return json.dumps([tool_name, arguments], sort_keys=True, ensure_ascii=False, default=str)
+    
+    def get(self, key: str):
+        """有効なキャッシュ結果を返す（なければNone）"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                generation, expires_at, value = entry
+                if generation == self.generation and time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+            self._stats["misses"] += 1
+            return None
+    
+    def put(self, key: str, value, generation: int):
+        """読み取り開始時の世代が現在と同じ場合だけ結果を保存"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (generation, time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+    
+    def invalidate(self):
+        """世代を進めて既存の結果をすべて無効にする"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+    
+    def get_stats(self) -> dict:
+        """ヒット率などの統計"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "generation": self.generation,
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else None
+            }
+
 # データベース管理クラス
 class TaskDatabase:
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, pool_size: int = None,
+                 storage_profile: str = None):
+        db_config = config.get("database", {})
+        if storage_profile is not None:
+            db_config = {**db_config, "storage_profile": storage_profile}
         if db_path is None:
-            db_path = config.get("database", {}).get("path", "tasks.db")
+            db_path = db_config.get("path", "tasks.db")
+        if pool_size is None:
+            pool_size = db_config.get("pool_size", 5)
         self.db_path = db_path
+        self.pragmas = get_storage_pragmas(db_config)
+        self.timeout = db_config.get("pool_timeout", 5.0)
         self.init_database()
+        self.pool = ConnectionPool(
+            db_path,
+            size=pool_size,
+            timeout=self.timeout,
+            pragmas=self.pragmas
+        )
+        # 読み取りツールの結果キャッシュ（書き込みコミットで無効化）
+        cache_config = config.get("cache", {})
+        self.cache = ResultCache(
+            max_size=cache_config.get("max_size", 256),
+            ttl=cache_config.get("ttl_seconds", 30.0),
+            enabled=cache_config.get("enabled", True)
+        )
+        # 書き込みは専用接続1本に直列化する（読み取りはプールで並行）
+        self._writer = None
+        self._write_lock = threading.Lock()
+        self._write_stats = {"writes": 0, "contended": 0}
     
     def init_database(self):
         """データベースとテーブルを初期化"""
@@ -34,6 +424,11 @@ class TaskDatabase:
             # 外部キー制約を有効化
             cursor.execute("PRAGMA foreign_keys = ON")
             
+            # ジャーナルモードはデータベースファイルに永続化される
+            journal_mode = self.pragmas.get("journal_mode")
+            if journal_mode:
+                cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+            
             # tasksテーブル作成
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS tasks (
@@ -68,17 +463,245 @@ class TaskDatabase:
                 )
             """)
             
+            # マイグレーション履歴テーブル作成
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
             conn.commit()
+            
+            if config.get("database", {}).get("auto_migrate", True):
+                self.migrate(conn)
+            
+            self.fts_tokenizer = self._get_fts_tokenizer(conn)
+    
+    def _get_fts_tokenizer(self, conn: sqlite3.Connection) -> Optional[str]:
+        """tasks_fts のトークナイザ（未作成ならNone）"""
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'tasks_fts'"
+        ).fetchone()
+        if row is None:
+            return None
+        return "trigram" if "trigram" in row[0] else "unicode61"
+    
+    def get_schema_version(self, conn: sqlite3.Connection) -> int:
+        """適用済みの最新マイグレーションバージョン"""
+        row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+        return row[0] or 0
+    
+    def migrate(self, conn: sqlite3.Connection = None) -> List[int]:
+        """未適用のマイグレーションを順に適用する
+        
+        Returns:
+            今回適用したバージョンのリスト
+        """
+        if conn is None:
+            with closing(sqlite3.connect(self.db_path)) as own_conn:
+                return self.migrate(own_conn)
+        
+        done = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+        applied = []
+        for version, name, steps in MIGRATIONS:
+            if version in done:
+                continue
+            # 1マイグレーション = 1トランザクション（DDLも含めてロールバック可能）
+            with conn:
+                conn.execute("BEGIN")
+                if callable(steps):
+                    if not steps(conn):
+                        # 前提条件を満たさないため記録せず、次回起動時に再判定する
+                        continue
+                else:
+                    for statement in steps:
+                        conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (?, ?)",
+                    (version, name)
+                )
+            applied.append(version)
+        return applied
     
+    @contextmanager
     def get_connection(self):
-        """データベース接続を取得"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # 辞書形式でアクセス可能
-        conn.execute("PRAGMA foreign_keys = ON")  # 外部キー制約を有効化
-        return conn
+        """プールから接続を取得（ブロック終了時にコミットして返却）"""
+        conn = self.pool.acquire()
+        try:
+            with conn:  # 正常終了でコミット、例外でロールバック
+                yield conn
+        finally:
+            self.pool.release(conn)
+    
+    def _get_writer(self) -> sqlite3.Connection:
+        """書き込み専用接続（_write_lock 保持中に呼ぶ）"""
+        if self._writer is None:
+            self._writer = open_connection(self.db_path, self.pragmas, self.timeout)
+        return self._writer
+    
+    @contextmanager
+    def write_connection(self):
+        """書き込み専用接続を取得（書き込みは1件ずつ直列に実行）
+        
+        BEGIN IMMEDIATE で書き込みロックを先に確保するため、
+        トランザクション途中の "database is locked" を避けられる。
+        行が変更されなかった場合（対象が見つからない等）は結果キャッシュを無効化しない。
+        """
+        contended = not self._write_lock.acquire(blocking=False)
+        if contended and not self._write_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(
+                f"書き込み接続の取得がタイムアウトしました（{self.timeout}秒）"
+            )
+        try:
+            # 統計は書き込みロックを保持している間に更新する
+            if contended:
+                self._write_stats["contended"] += 1
+            conn = self._get_writer()
+            changes_before = conn.total_changes
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            self._write_stats["writes"] += 1
+            if conn.total_changes != changes_before:
+                self.cache.invalidate()
+        finally:
+            self._write_lock.release()
+    
+    def backup_to(self, target_path: str, pages_per_step: int = 256,
+                  step_sleep: float = 0.0) -> dict:
+        """SQLiteバックアップAPIでオンラインバックアップする
+        
+        読み取りトランザクションを開いたままコピーするため、開始時点の一貫した
+        スナップショットになる。
+        WALモードでは pages_per_step ページずつコピーし、コピー中も書き込みを通す。
+        WAL以外では読み取り中の共有ロックで書き込みのコミットが待たされるため、
+        ステップに分けず一度にコピーする（コピーが終わるまで書き込みはブロックされる）。
+        """
+        progress = {"steps": 0, "pages": 0}
+        
+        def on_progress(status, remaining, total):
+            progress["steps"] += 1
+            progress["pages"] = total
+        
+        if str(self.pragmas.get("journal_mode", "")).upper() != "WAL":
+            pages_per_step = -1  # 全ページを1ステップで
+        
+        conn = self.pool.acquire()
+        try:
+            conn.execute("BEGIN")
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            with closing(sqlite3.connect(target_path)) as target:
+                conn.backup(target, pages=pages_per_step, progress=on_progress,
+                            sleep=step_sleep)
+        finally:
+            self.pool.release(conn)  # 読み取りトランザクションは返却時に終了
+        return progress
+    
+    def vacuum_into(self, target_path: str):
+        """VACUUM INTO で空き領域を詰めたコピーを作成する"""
+        with self.get_connection() as conn:
+            conn.execute("VACUUM INTO ?", (target_path,))
+    
+    def get_storage_info(self) -> dict:
+        """ストレージ設定と書き込み状況"""
+        with self.get_connection() as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            schema_version = self.get_schema_version(conn)
+        return {
+            "journal_mode": journal_mode,
+            "schema_version": schema_version,
+            "full_text_search": self.fts_tokenizer or "unavailable",
+            "pragmas": self.pragmas,
+            "writer": dict(self._write_stats)
+        }
+    
+    def close(self):
+        """プール内の接続と書き込み接続を閉じる"""
+        self.pool.close_all()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+class LazyDatabase:
+    """最初に使われたときにデータベースを開くプロキシ
+    
+    import しただけではDBファイルの作成・マイグレーションを行わないため、
+    テストがサーバーを import しても tasks.db には触れない。
+    """
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+    
+    def _get(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+    
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+    
+    def close(self):
+        """開いていれば閉じる"""
+        if self._instance is not None:
+            self._instance.close()
+
+# グローバルデータベースインスタンス（最初のツール呼び出しで開く）
+db = LazyDatabase(TaskDatabase)
+
+def cached_tool(func):
+    """読み取りツールの結果を db.cache に保存するデコレータ（成功時のみ）"""
+    signature = inspect.signature(func)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        cache = db.cache
+        key = cache.make_key(func.__name__, bound.arguments)
+        result = cache.get(key)
+        if result is not None:
+            return result
+        
+        generation = cache.generation
+        result = func(*args, **kwargs)
+        if result.get("success"):
+            cache.put(key, result, generation)
+        return result
+    
+    return wrapper
+
+# タスクのステータス
+VALID_STATUSES = ["pending", "completed", "cancelled"]
 
-# グローバルデータベースインスタンス
-db = TaskDatabase()
+# 一括処理でIN句に渡すIDの最大数（SQLiteのパラメータ数上限対策）
+BULK_ID_CHUNK = 500
+
+# エクスポート形式と拡張子
+EXPORT_FORMATS = {"json": "json", "ndjson": "ndjson", "csv": "csv"}
+
+def get_process_peak_rss_mb() -> Optional[float]:
+    """プロセス開始以来の最大常駐メモリ（MB、取得できない環境ではNone）
+    
+    ru_maxrss は減らないため、ある処理の使用量は前後の差（最大値の増分）で見る。
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB 単位、macOS はバイト単位
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
 
 # 設定を使用してサーバー作成
 mcp = FastMCP(
@@ -98,7 +721,7 @@ def create_task(title: str, description: str = "", priority: int = 1) -> dict:
         作成されたタスクの情報
     """
     try:
-        with db.get_connection() as conn:
+        with db.write_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO tasks (title, description, priority)
@@ -125,41 +748,59 @@ def create_task(title: str, description: str = "", priority: int = 1) -> dict:
         }
 
 @mcp.tool
-def get_tasks(status: str = "all", limit: int = 10) -> dict:
+@cached_tool
+def get_tasks(status: str = "all", limit: int = 10, cursor: Optional[str] = None) -> dict:
     """タスク一覧を取得する
     
     Args:
         status: フィルタするステータス（all, pending, completed, cancelled）
         limit: 取得する最大件数
+        cursor: 前回の結果の next_cursor（続きのページを取得）
         
     Returns:
-        タスク一覧
+        タスク一覧と次ページ用の next_cursor（最終ページならNone）
     """
+    if limit < 1:
+        return {
+            "success": False,
+            "error": f"limit は1以上を指定してください: {limit}",
+            "tasks": []
+        }
+    
     try:
+        conditions = []
+        params = []
+        if status != "all":
+            conditions.append("status = ?")
+            params.append(status)
+        if cursor:
+            # 前ページ最後の (priority, created_at, id) より後ろから読む
+            conditions.append("(priority, created_at, id) < (?, ?, ?)")
+            params.extend(decode_cursor(cursor, "tasks"))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
         with db.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            if status == "all":
-                cursor.execute("""
-                    SELECT * FROM tasks 
-                    ORDER BY priority DESC, created_at DESC 
-                    LIMIT ?
-                """, (limit,))
-            else:
-                cursor.execute("""
-                    SELECT * FROM tasks 
-                    WHERE status = ? 
-                    ORDER BY priority DESC, created_at DESC 
-                    LIMIT ?
-                """, (status, limit))
+            rows = conn.execute(f"""
+                SELECT * FROM tasks 
+                {where}
+                ORDER BY priority DESC, created_at DESC, id DESC 
+                LIMIT ?
+            """, (*params, limit + 1)).fetchall()
             
-            tasks = [dict(row) for row in cursor.fetchall()]
+            tasks = [dict(row) for row in rows[:limit]]
+            next_cursor = None
+            if len(rows) > limit:
+                last = tasks[-1]
+                next_cursor = encode_cursor(
+                    "tasks", [last["priority"], last["created_at"], last["id"]]
+                )
             
             return {
                 "success": True,
                 "tasks": tasks,
                 "count": len(tasks),
-                "filter": status
+                "filter": status,
+                "next_cursor": next_cursor
             }
     
     except Exception as e:
@@ -180,17 +821,15 @@ def update_task_status(task_id: int, status: str) -> dict:
     Returns:
         更新結果
     """
-    valid_statuses = ["pending", "completed", "cancelled"]
-    
-    if status not in valid_statuses:
+    if status not in VALID_STATUSES:
         return {
             "success": False,
             "error": f"無効なステータス: {status}",
-            "valid_statuses": valid_statuses
+            "valid_statuses": VALID_STATUSES
         }
     
     try:
-        with db.get_connection() as conn:
+        with db.write_connection() as conn:
             cursor = conn.cursor()
             
             # タスクの存在確認
@@ -223,6 +862,142 @@ def update_task_status(task_id: int, status: str) -> dict:
             "error": str(e)
         }
 
+@mcp.tool
+def create_tasks_bulk(tasks: List[Dict]) -> dict:
+    """複数のタスクを1トランザクションで作成する
+    
+    Args:
+        tasks: 作成するタスクのリスト（各要素は title, description, priority を持つ辞書）
+        
+    Returns:
+        要素ごとの作成結果（入力と同じ順序）
+    """
+    # 事前検証（不正な要素は作成せずエラーとして返す）
+    results = [None] * len(tasks)
+    rows = []
+    row_indexes = []
+    for index, task in enumerate(tasks):
+        title = task.get("title") if isinstance(task, dict) else None
+        priority = task.get("priority", 1) if isinstance(task, dict) else None
+        if not isinstance(title, str) or not title.strip():
+            results[index] = {"index": index, "success": False, "error": "title は必須です"}
+        elif isinstance(priority, bool) or not isinstance(priority, int) or not 1 <= priority <= 5:
+            results[index] = {"index": index, "success": False, "error": f"無効な優先度: {priority}"}
+        else:
+            rows.append((title, task.get("description", ""), priority))
+            row_indexes.append(index)
+    
+    try:
+        if rows:
+            with db.write_connection() as conn:
+                conn.executemany("""
+                    INSERT INTO tasks (title, description, priority)
+                    VALUES (?, ?, ?)
+                """, rows)
+                # 書き込みロック中の連続INSERTなのでIDは連番になる
+                last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            
+            first_id = last_id - len(rows) + 1
+            for offset, index in enumerate(row_indexes):
+                results[index] = {"index": index, "success": True, "task_id": first_id + offset}
+        
+        return {
+            "success": True,
+            "created": len(rows),
+            "failed": len(tasks) - len(rows),
+            "results": results,
+            "message": f"{len(rows)}件のタスクを作成しました"
+        }
+    
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": "タスクの一括作成に失敗しました"
+        }
+
+@mcp.tool
+def update_task_status_bulk(updates: List[Dict]) -> dict:
+    """複数のタスクのステータスを1トランザクションで更新する
+    
+    Args:
+        updates: 更新内容のリスト（各要素は task_id, status を持つ辞書）
+        
+    Returns:
+        要素ごとの更新結果（入力と同じ順序）
+    """
+    # ステータスは事前にまとめて検証する
+    results = [None] * len(updates)
+    pending = []
+    for index, update in enumerate(updates):
+        task_id = update.get("task_id") if isinstance(update, dict) else None
+        status = update.get("status") if isinstance(update, dict) else None
+        if not isinstance(task_id, int):
+            results[index] = {"index": index, "success": False, "error": f"無効なタスクID: {task_id}"}
+        elif status not in VALID_STATUSES:
+            results[index] = {
+                "index": index,
+                "success": False,
+                "task_id": task_id,
+                "error": f"無効なステータス: {status}"
+            }
+        else:
+            pending.append((index, task_id, status))
+    
+    try:
+        updated = 0
+        if pending:
+            with db.write_connection() as conn:
+                # タスクの存在確認
+                task_ids = sorted({task_id for _, task_id, _ in pending})
+                existing = set()
+                for start in range(0, len(task_ids), BULK_ID_CHUNK):
+                    chunk = task_ids[start:start + BULK_ID_CHUNK]
+                    placeholders = ",".join("?" * len(chunk))
+                    existing.update(row[0] for row in conn.execute(
+                        f"SELECT id FROM tasks WHERE id IN ({placeholders})", chunk
+                    ))
+                
+                rows = []
+                for index, task_id, status in pending:
+                    if task_id in existing:
+                        rows.append((status, task_id))
+                        results[index] = {
+                            "index": index,
+                            "success": True,
+                            "task_id": task_id,
+                            "new_status": status
+                        }
+                    else:
+                        results[index] = {
+                            "index": index,
+                            "success": False,
+                            "task_id": task_id,
+                            "error": f"ID {task_id} のタスクが見つかりません"
+                        }
+                
+                conn.executemany("""
+                    UPDATE tasks 
+                    SET status = ?, updated_at = CURRENT_TIMESTAMP 
+                    WHERE id = ?
+                """, rows)
+                updated = len(rows)
+        
+        return {
+            "success": True,
+            "updated": updated,
+            "failed": len(updates) - updated,
+            "results": results,
+            "message": f"{updated}件のタスクのステータスを更新しました"
+        }
+    
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "message": "ステータスの一括更新に失敗しました"
+        }
+
 @mcp.tool
 def delete_task(task_id: int) -> dict:
     """タスクを削除する
@@ -234,7 +1009,7 @@ def delete_task(task_id: int) -> dict:
         削除結果
     """
     try:
-        with db.get_connection() as conn:
+        with db.write_connection() as conn:
             cursor = conn.cursor()
             
             # タスクの存在確認
@@ -262,34 +1037,132 @@ def delete_task(task_id: int) -> dict:
             "error": str(e)
         }
 
+def encode_cursor(kind: str, values: list) -> str:
+    """ページング用の不透明なカーソル文字列を作成"""
+    payload = json.dumps([kind, *values], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str, kind: str) -> list:
+    """カーソル文字列を検証して値を取り出す"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError(f"無効なカーソルです: {cursor}")
+    if not isinstance(payload, list) or not payload or payload[0] != kind:
+        raise ValueError(f"このツールでは使用できないカーソルです: {cursor}")
+    return payload[1:]
+
+def build_fts_query(keyword: str, tokenizer: Optional[str]) -> Tuple[Optional[str], List[str]]:
+    """検索キーワードをFTS5のMATCH式とLIKEで絞り込む語に分ける
+    
+    空白区切りの語をAND検索する。末尾が * の語は前方一致。
+    全文検索できない語（FTS5非対応、trigramで3文字未満）はLIKE用の語として返す。
+    """
+    fts_terms = []
+    like_terms = []
+    for term in keyword.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if not term:
+            continue
+        # trigram は3文字未満の語を検索できない
+        if tokenizer is None or (tokenizer == "trigram" and len(term) < 3):
+            like_terms.append(term)
+            continue
+        quoted = '"' + term.replace('"', '""') + '"'
+        fts_terms.append(quoted + "*" if prefix else quoted)
+    
+    return " ".join(fts_terms) or None, like_terms
+
+def _like_conditions(terms: List[str]) -> tuple:
+    """語ごとの部分一致条件をANDで連結したSQL断片とパラメータ"""
+    clauses = []
+    params = []
+    for term in terms:
+        pattern = f"%{term}%"
+        clauses.append("(title LIKE ? OR description LIKE ?)")
+        params.extend([pattern, pattern])
+    return " AND ".join(clauses), params
+
 @mcp.tool
-def search_tasks(keyword: str) -> dict:
+@cached_tool
+def search_tasks(keyword: str, limit: int = 20, offset: int = 0, cursor: Optional[str] = None) -> dict:
     """タスクを検索する
     
     Args:
-        keyword: 検索キーワード（タイトルまたは説明に含まれる）
+        keyword: 検索キーワード（タイトルまたは説明に含まれる。空白区切りでAND検索、末尾 * で前方一致）
+        limit: 取得する最大件数
+        offset: 読み飛ばす件数（cursor 指定時は無視）
+        cursor: 前回の結果の next_cursor（続きのページを取得）
         
     Returns:
-        検索結果
+        検索結果（全文検索時は関連度順）と次ページ用の next_cursor
     """
+    if limit < 1:
+        return {
+            "success": False,
+            "error": f"limit は1以上を指定してください: {limit}",
+            "tasks": []
+        }
+    
     try:
+        fts_query, like_terms = build_fts_query(keyword, db.fts_tokenizer)
+        search_mode = "fts5" if fts_query is not None else "like"
+        if cursor:
+            last_key = decode_cursor(cursor, f"search_{search_mode}")
+            offset = 0
+        
         with db.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            search_pattern = f"%{keyword}%"
-            cursor.execute("""
-                SELECT * FROM tasks 
-                WHERE title LIKE ? OR description LIKE ?
-                ORDER BY priority DESC, created_at DESC
-            """, (search_pattern, search_pattern))
+            if search_mode == "fts5":
+                # 全文検索（bm25スコア順、値が小さいほど関連度が高い）
+                # 全文検索できない短い語は部分一致で絞り込む
+                like_sql, like_params = _like_conditions(like_terms)
+                where = "tasks_fts MATCH ?" + (f" AND {like_sql}" if like_sql else "")
+                params = [fts_query, *like_params]
+                if cursor:
+                    where += " AND (rank > ? OR (rank = ? AND rowid > ?))"
+                    params.extend([last_key[0], last_key[0], last_key[1]])
+                rows = conn.execute(f"""
+                    SELECT t.*, f.rank AS score
+                    FROM (
+                        SELECT rowid, rank FROM tasks_fts
+                        WHERE {where}
+                        ORDER BY rank, rowid
+                        LIMIT ? OFFSET ?
+                    ) f
+                    JOIN tasks t ON t.id = f.rowid
+                    ORDER BY f.rank, f.rowid
+                """, (*params, limit + 1, offset)).fetchall()
+            else:
+                # FTS5が使えない場合は語ごとの部分一致検索（AND）
+                where, params = _like_conditions(like_terms or [""])
+                if cursor:
+                    where += " AND (priority, created_at, id) < (?, ?, ?)"
+                    params.extend(last_key)
+                rows = conn.execute(f"""
+                    SELECT * FROM tasks 
+                    WHERE {where}
+                    ORDER BY priority DESC, created_at DESC, id DESC
+                    LIMIT ? OFFSET ?
+                """, (*params, limit + 1, offset)).fetchall()
             
-            tasks = [dict(row) for row in cursor.fetchall()]
+            tasks = [dict(row) for row in rows[:limit]]
+            next_cursor = None
+            if len(rows) > limit:
+                last = tasks[-1]
+                if search_mode == "fts5":
+                    key = [last["score"], last["id"]]
+                else:
+                    key = [last["priority"], last["created_at"], last["id"]]
+                next_cursor = encode_cursor(f"search_{search_mode}", key)
             
             return {
                 "success": True,
                 "tasks": tasks,
                 "count": len(tasks),
-                "keyword": keyword
+                "keyword": keyword,
+                "search_mode": search_mode,
+                "next_cursor": next_cursor
             }
     
     except Exception as e:
@@ -299,7 +1172,65 @@ def search_tasks(keyword: str) -> dict:
             "tasks": []
         }
 
+def aggregate_task_statistics(conn: sqlite3.Connection) -> dict:
+    """tasks テーブルを集計して統計情報を求める（全件走査）"""
+    cursor = conn.cursor()
+    
+    # 全体統計
+    cursor.execute("SELECT COUNT(*) as total FROM tasks")
+    total = cursor.fetchone()["total"]
+    
+    # ステータス別統計
+    cursor.execute("""
+        SELECT status, COUNT(*) as count 
+        FROM tasks 
+        GROUP BY status
+    """)
+    status_stats = {row["status"]: row["count"] for row in cursor.fetchall()}
+    
+    # 優先度別統計
+    cursor.execute("""
+        SELECT priority, COUNT(*) as count 
+        FROM tasks 
+        GROUP BY priority 
+        ORDER BY priority DESC
+    """)
+    priority_stats = {f"priority_{row['priority']}": row["count"] for row in cursor.fetchall()}
+    
+    return {
+        "total_tasks": total,
+        "by_status": status_stats,
+        "by_priority": priority_stats
+    }
+
+def read_task_counters(conn: sqlite3.Connection) -> dict:
+    """task_counters から統計情報を読み出す（行数に依存しない）"""
+    rows = conn.execute("""
+        SELECT dimension, value, count FROM task_counters
+        WHERE count != 0
+        ORDER BY dimension, value
+    """).fetchall()
+    
+    statistics = {"total_tasks": 0, "by_status": {}, "by_priority": {}}
+    for row in rows:
+        if row["dimension"] == "total":
+            statistics["total_tasks"] = row["count"]
+        elif row["dimension"] == "status":
+            statistics["by_status"][row["value"]] = row["count"]
+    # 優先度は従来どおり高い順に並べる
+    for row in reversed(rows):
+        if row["dimension"] == "priority":
+            statistics["by_priority"][f"priority_{row['value']}"] = row["count"]
+    return statistics
+
+def has_task_counters(conn: sqlite3.Connection) -> bool:
+    """task_counters が作成済みか（auto_migrate 無効時は未作成の場合がある）"""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_counters'"
+    ).fetchone() is not None
+
 @mcp.tool
+@cached_tool
 def get_task_statistics() -> dict:
     """タスクの統計情報を取得する
     
@@ -308,36 +1239,14 @@ def get_task_statistics() -> dict:
     """
     try:
         with db.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # 全体統計
-            cursor.execute("SELECT COUNT(*) as total FROM tasks")
-            total = cursor.fetchone()["total"]
-            
-            # ステータス別統計
-            cursor.execute("""
-                SELECT status, COUNT(*) as count 
-                FROM tasks 
-                GROUP BY status
-            """)
-            status_stats = {row["status"]: row["count"] for row in cursor.fetchall()}
-            
-            # 優先度別統計
-            cursor.execute("""
-                SELECT priority, COUNT(*) as count 
-                FROM tasks 
-                GROUP BY priority 
-                ORDER BY priority DESC
-            """)
-            priority_stats = {f"priority_{row['priority']}": row["count"] for row in cursor.fetchall()}
+            if has_task_counters(conn):
+                statistics = read_task_counters(conn)
+            else:
+                statistics = aggregate_task_statistics(conn)
             
             return {
                 "success": True,
-                "statistics": {
-                    "total_tasks": total,
-                    "by_status": status_stats,
-                    "by_priority": priority_stats
-                }
+                "statistics": statistics
             }
     
     except Exception as e:
@@ -346,6 +1255,51 @@ def get_task_statistics() -> dict:
             "error": str(e)
         }
 
+@mcp.tool
+def verify_task_statistics(repair: bool = False) -> dict:
+    """集計テーブルと実データの件数が一致しているか検証する
+    
+    Args:
+        repair: Trueなら不一致時に集計テーブルを tasks から作り直す
+        
+    Returns:
+        検証結果（不一致の項目と、修復した場合はその結果）
+    """
+    try:
+        with db.get_connection() as conn:
+            if not has_task_counters(conn):
+                return {
+                    "success": False,
+                    "error": "集計テーブルがありません（auto_migrate を有効にしてください）"
+                }
+            expected = aggregate_task_statistics(conn)
+            actual = read_task_counters(conn)
+        
+        mismatches = []
+        for key in ("total_tasks", "by_status", "by_priority"):
+            if expected[key] != actual[key]:
+                mismatches.append({"item": key, "expected": expected[key], "actual": actual[key]})
+        
+        repaired = False
+        if mismatches and repair:
+            with db.write_connection() as conn:
+                for statement in REBUILD_TASK_COUNTERS_SQL:
+                    conn.execute(statement)
+            repaired = True
+        
+        return {
+            "success": True,
+            "consistent": not mismatches,
+            "mismatches": mismatches,
+            "repaired": repaired
+        }
+    
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
 @mcp.tool
 def create_category(name: str, color: str = "#007bff") -> dict:
     """新しいカテゴリを作成する
@@ -358,7 +1312,7 @@ def create_category(name: str, color: str = "#007bff") -> dict:
         作成されたカテゴリの情報
     """
     try:
-        with db.get_connection() as conn:
+        with db.write_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO categories (name, color)
@@ -398,7 +1352,7 @@ def assign_category_to_task(task_id: int, category_id: int) -> dict:
         割り当て結果
     """
     try:
-        with db.get_connection() as conn:
+        with db.write_connection() as conn:
             cursor = conn.cursor()
             
             # タスクとカテゴリの存在確認
@@ -429,90 +1383,235 @@ def assign_category_to_task(task_id: int, category_id: int) -> dict:
             "error": str(e)
         }
 
+def apply_backup_retention(backup_dir: str, keep: int) -> List[str]:
+    """自動命名のバックアップを新しい順に keep 件だけ残して削除する"""
+    if keep <= 0:
+        return []
+    backups = sorted(Path(backup_dir).glob("backup_tasks_*.db"), reverse=True)
+    removed = []
+    for old_backup in backups[keep:]:
+        old_backup.unlink()
+        removed.append(str(old_backup))
+    return removed
+
 @mcp.tool
-def backup_database(backup_path: str = None) -> dict:
-    """データベースをバックアップする
+def backup_database(backup_path: Optional[str] = None, compact: bool = False,
+                    pages_per_step: Optional[int] = None) -> dict:
+    """データベースをバックアップする（オンラインバックアップ）
+    
+    WALモード（storage_profile = "wal"）ではコピー中も書き込みを止めない。
+    それ以外ではコピーが終わるまで書き込みが待たされる。
     
     Args:
-        backup_path: バックアップファイルのパス
+        backup_path: バックアップファイルのパス（省略時は backup_dir に日時付きで作成）
+        compact: TrueならVACUUM INTOで空き領域を詰めたコピーを作成する
+        pages_per_step: バックアップAPIが1ステップでコピーするページ数（WALモードのみ）
         
     Returns:
-        バックアップ結果
+        バックアップ結果（所要時間、サイズ、削除した古いバックアップ）
     """
+    db_config = config.get("database", {})
+    if not db_config.get("backup_enabled", True):
+        return {
+            "success": False,
+            "error": "バックアップは無効化されています（config.toml の backup_enabled）"
+        }
+    
+    auto_named = backup_path is None
+    backup_dir = db_config.get("backup_dir", ".")
+    if auto_named:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.makedirs(backup_dir, exist_ok=True)
+        backup_path = os.path.join(backup_dir, f"backup_tasks_{timestamp}.db")
+    if pages_per_step is None:
+        pages_per_step = db_config.get("backup_pages_per_step", 256)
+    # 完成するまでは一時ファイルに書き込む
+    temp_path = backup_path + ".tmp"
+    
     try:
-        if backup_path is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_path = f"backup_tasks_{timestamp}.db"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         
-        shutil.copy2(db.db_path, backup_path)
+        start = time.perf_counter()
+        if compact:
+            db.vacuum_into(temp_path)
+            progress = {}
+        else:
+            progress = db.backup_to(temp_path, pages_per_step=pages_per_step)
+        os.replace(temp_path, backup_path)
+        elapsed = time.perf_counter() - start
+        
+        removed = []
+        if auto_named:
+            removed = apply_backup_retention(backup_dir, db_config.get("backup_retention", 0))
         
         return {
             "success": True,
             "message": f"データベースを {backup_path} にバックアップしました",
-            "backup_path": backup_path
+            "backup_path": backup_path,
+            "mode": "vacuum_into" if compact else "backup_api",
+            "elapsed_seconds": round(elapsed, 3),
+            "source_size": sum(
+                os.path.getsize(path) for path in (db.db_path, db.db_path + "-wal")
+                if os.path.exists(path)
+            ),
+            "backup_size": os.path.getsize(backup_path),
+            **progress,
+            "removed_backups": removed
         }
     
     except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         return {
             "success": False,
             "error": str(e)
         }
 
 @mcp.tool
-def export_tasks_to_json(file_path: str = "tasks_export.json") -> dict:
-    """タスクをJSONファイルにエクスポートする
+def export_tasks_to_json(file_path: Optional[str] = None, file_format: str = "json",
+                         compress: bool = False, chunk_size: int = 1000) -> dict:
+    """タスクをファイルにエクスポートする（全件をストリーミング書き出し）
     
     Args:
-        file_path: エクスポートファイルのパス
+        file_path: エクスポートファイルのパス（省略時は tasks_export.<形式>）
+        file_format: 出力形式（json: JSON配列, ndjson: 1行1タスク, csv）
+        compress: Trueならgzip圧縮する（拡張子 .gz を付与）
+        chunk_size: 1回にデータベースから読み込む行数
         
     Returns:
-        エクスポート結果
+        エクスポート結果（件数、処理速度、最大常駐メモリの増分）
     """
+    if file_format not in EXPORT_FORMATS:
+        return {
+            "success": False,
+            "error": f"無効な形式: {file_format}",
+            "valid_formats": list(EXPORT_FORMATS)
+        }
+    
+    if file_path is None:
+        file_path = f"tasks_export.{EXPORT_FORMATS[file_format]}"
+    if compress and not file_path.endswith(".gz"):
+        file_path += ".gz"
+    # 途中で失敗しても既存ファイルを壊さないよう一時ファイルに書いてから置き換える
+    temp_path = file_path + ".tmp"
+    
     try:
-        # データベースから直接全タスクを取得
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT * FROM tasks 
-                ORDER BY priority DESC, created_at DESC 
-                LIMIT 1000
+        start = time.perf_counter()
+        peak_rss_before = get_process_peak_rss_mb()
+        exported = 0
+        
+        opener = gzip.open if compress else open
+        with db.get_connection() as conn, \
+                opener(temp_path, "wt", encoding="utf-8", newline="") as f:
+            cursor = conn.execute("""
+                SELECT t.*,
+                       (SELECT json_group_array(c.name)
+                        FROM task_categories tc
+                        JOIN categories c ON c.id = tc.category_id
+                        WHERE tc.task_id = t.id) AS categories
+                FROM tasks t
+                ORDER BY t.priority DESC, t.created_at DESC, t.id DESC
             """)
+            columns = [column[0] for column in cursor.description]
+            
+            if file_format == "json":
+                f.write("[")
+            elif file_format == "csv":
+                writer = csv.writer(f)
+                writer.writerow(columns)
+            
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    task = dict(zip(columns, row))
+                    task["categories"] = json.loads(task["categories"])
+                    if file_format == "csv":
+                        task["categories"] = ";".join(task["categories"])
+                        writer.writerow(task.values())
+                    else:
+                        line = json.dumps(task, ensure_ascii=False)
+                        if file_format == "json":
+                            f.write(("\n" if exported == 0 else ",\n") + line)
+                        else:
+                            f.write(line + "\n")
+                    exported += 1
             
-            tasks = [dict(row) for row in cursor.fetchall()]
+            if file_format == "json":
+                f.write("\n]\n" if exported else "]\n")
         
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(tasks, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, file_path)
+        elapsed = time.perf_counter() - start
+        peak_rss_after = get_process_peak_rss_mb()
         
         return {
             "success": True,
             "message": f"タスクを {file_path} にエクスポートしました",
-            "exported_count": len(tasks),
-            "file_path": file_path
+            "exported_count": exported,
+            "file_path": file_path,
+            "file_format": file_format,
+            "compressed": compress,
+            "file_size": os.path.getsize(file_path),
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_sec": round(exported / elapsed) if elapsed > 0 else None,
+            # エクスポート中にプロセスの最大常駐メモリが増えた量（それまでの最大以下なら0）
+            "peak_rss_increase_mb": (round(peak_rss_after - peak_rss_before, 1)
+                                     if peak_rss_before is not None else None),
+            "process_peak_rss_mb": peak_rss_after
         }
     
     except Exception as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         return {
             "success": False,
             "error": str(e)
         }
 
 @mcp.tool
-def get_categories() -> dict:
+@cached_tool
+def get_categories(limit: int = 100, cursor: Optional[str] = None) -> dict:
     """カテゴリ一覧を取得する
     
+    Args:
+        limit: 取得する最大件数
+        cursor: 前回の結果の next_cursor（続きのページを取得）
+    
     Returns:
-        カテゴリ一覧
+        カテゴリ一覧と次ページ用の next_cursor（最終ページならNone）
     """
+    if limit < 1:
+        return {
+            "success": False,
+            "error": f"limit は1以上を指定してください: {limit}",
+            "categories": []
+        }
+    
     try:
+        where = ""
+        params = []
+        if cursor:
+            # name は一意なので name だけでページ位置が決まる
+            where = "WHERE name > ?"
+            params.extend(decode_cursor(cursor, "categories"))
+        
         with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM categories ORDER BY name")
-            categories = [dict(row) for row in cursor.fetchall()]
+            rows = conn.execute(f"""
+                SELECT * FROM categories {where} ORDER BY name LIMIT ?
+            """, (*params, limit + 1)).fetchall()
+            
+            categories = [dict(row) for row in rows[:limit]]
+            next_cursor = None
+            if len(rows) > limit:
+                next_cursor = encode_cursor("categories", [categories[-1]["name"]])
             
             return {
                 "success": True,
                 "categories": categories,
-                "count": len(categories)
+                "count": len(categories),
+                "next_cursor": next_cursor
             }
     
     except Exception as e:
@@ -538,7 +1637,10 @@ def get_server_info() -> dict:
         "description": server_config.get("description", "SQLiteを使用したタスク管理MCPサーバー"),
         "author": server_config.get("author", "あなたの名前"),
         "database_path": db.db_path,
-        "tools_count": 12  # 現在のツール数
+        "connection_pool": db.pool.get_stats(),
+        "storage": db.get_storage_info(),
+        "result_cache": db.cache.get_stats(),
+        "tools_count": 15  # 現在のツール数
     }
 
 if __name__ == "__main__":
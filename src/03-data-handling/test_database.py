@@ -0,0 +1,552 @@
+"""
+タスク管理データベースの単体テスト
+"""
+import asyncio
+import csv
+import gzip
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from fastmcp import Client
+
+import task_manager
+from task_manager import (
+    MIGRATIONS, ConnectionPool, TaskDatabase, aggregate_task_statistics, apply_backup_retention,
+    build_fts_query, read_task_counters
+)
+
+def _query_plan(db: TaskDatabase, sql: str, params: tuple = ()) -> str:
+    """EXPLAIN QUERY PLAN の結果を1つの文字列にまとめる"""
+    with db.get_connection() as conn:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return "\n".join(row["detail"] for row in rows)
+
+def _new_database(tmp: str, storage_profile: str = None) -> TaskDatabase:
+    db = TaskDatabase(os.path.join(tmp, "test.db"), storage_profile=storage_profile)
+    with db.write_connection() as conn:
+        conn.executemany(
+            "INSERT INTO tasks (title, description, priority, status) VALUES (?, ?, ?, ?)",
+            [(f"タスク{i}", "", i % 5 + 1, ("pending", "completed")[i % 2]) for i in range(200)]
+        )
+        conn.execute("ANALYZE")
+    return db
+
+@contextmanager
+def swap_database(db: TaskDatabase):
+    """task_manager.db を db に差し替え、終了時に元に戻して閉じる"""
+    original_db = task_manager.db
+    task_manager.db = db
+    try:
+        yield db
+    finally:
+        task_manager.db = original_db
+        db.close()
+
+def test_migrations_recorded():
+    """マイグレーションが schema_migrations に記録され、再実行されないこと"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _new_database(tmp)
+        with db.get_connection() as conn:
+            versions = [row["version"] for row in conn.execute(
+                "SELECT version FROM schema_migrations ORDER BY version"
+            )]
+        assert versions == [version for version, _, _ in MIGRATIONS]
+        assert db.migrate() == []
+        db.close()
+
+def test_task_list_queries_use_indexes():
+    """get_tasks の一覧クエリがインデックスで並び替え済みの行を返すこと"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _new_database(tmp)
+
+        plan = _query_plan(db, """
+            SELECT * FROM tasks
+            ORDER BY priority DESC, created_at DESC
+            LIMIT 10
+        """)
+        assert "idx_tasks_priority_created_id" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+
+        plan = _query_plan(db, """
+            SELECT * FROM tasks
+            WHERE status = ?
+            ORDER BY priority DESC, created_at DESC
+            LIMIT 10
+        """, ("pending",))
+        assert "idx_tasks_status_priority_created_id (status=?)" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+
+        # キーセットページングの続きも索引の範囲検索になる
+        plan = _query_plan(db, """
+            SELECT * FROM tasks
+            WHERE status = ? AND (priority, created_at, id) < (?, ?, ?)
+            ORDER BY priority DESC, created_at DESC, id DESC
+            LIMIT 10
+        """, ("pending", 3, "2030-01-01 00:00:00", 100))
+        assert "idx_tasks_status_priority_created_id (status=? AND (priority,created_at)<(?,?))" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+        db.close()
+
+def test_statistics_queries_use_covering_indexes():
+    """get_task_statistics の集計がテーブルを読まずに済むこと"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _new_database(tmp)
+
+        plan = _query_plan(db, "SELECT status, COUNT(*) as count FROM tasks GROUP BY status")
+        assert "USING COVERING INDEX idx_tasks_status_priority_created_id" in plan, plan
+
+        plan = _query_plan(db, """
+            SELECT priority, COUNT(*) as count
+            FROM tasks
+            GROUP BY priority
+            ORDER BY priority DESC
+        """)
+        assert "USING COVERING INDEX idx_tasks_priority_created_id" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+
+        plan = _query_plan(db, "SELECT task_id FROM task_categories WHERE category_id = ?", (1,))
+        assert "idx_task_categories_category" in plan, plan
+        db.close()
+
+def _fts_ids(db: TaskDatabase, keyword: str) -> list:
+    query, _ = build_fts_query(keyword, db.fts_tokenizer)
+    with db.get_connection() as conn:
+        rows = conn.execute(
+            "SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ? ORDER BY rank", (query,)
+        ).fetchall()
+    return [row[0] for row in rows]
+
+def test_fts_index_follows_task_changes():
+    """tasks への追加・更新・削除が全文検索テーブルに反映されること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _new_database(tmp)
+        assert db.fts_tokenizer is not None
+
+        with db.write_connection() as conn:
+            review_id = conn.execute(
+                "INSERT INTO tasks (title, description) VALUES (?, ?)",
+                ("コードレビュー", "プルリクエストを確認する")
+            ).lastrowid
+            docs_id = conn.execute(
+                "INSERT INTO tasks (title, description) VALUES (?, ?)",
+                ("ドキュメント更新", "レビュー指摘を反映する")
+            ).lastrowid
+        # タイトル一致が説明文一致より上位になる
+        assert _fts_ids(db, "レビュー") == [review_id, docs_id]
+
+        with db.write_connection() as conn:
+            conn.execute("UPDATE tasks SET title = ? WHERE id = ?", ("設計見直し", review_id))
+            conn.execute("DELETE FROM tasks WHERE id = ?", (docs_id,))
+        assert _fts_ids(db, "レビュー") == []
+        assert _fts_ids(db, "設計見直し") == [review_id]
+        db.close()
+
+def test_build_fts_query():
+    """MATCH式の組み立てとLIKEで絞り込む語の振り分け"""
+    assert build_fts_query("コード レビュー*", "trigram") == ('"コード" "レビュー"*', [])
+    assert build_fts_query('say "hi"', "unicode61") == ('"say" """hi"""', [])
+    # trigram は3文字未満の語を扱えない
+    assert build_fts_query("バグ", "trigram") == (None, ["バグ"])
+    assert build_fts_query("コード 1*", "trigram") == ('"コード"', ["1"])
+    assert build_fts_query("バグ", "unicode61") == ('"バグ"', [])
+    # FTS5 非対応
+    assert build_fts_query("レビュー 依頼*", None) == (None, ["レビュー", "依頼"])
+
+async def _walk_pages(tool: str, args: dict, key: str) -> list:
+    """next_cursor をたどって全ページを取得"""
+    pages = []
+    async with Client(task_manager.mcp) as client:
+        cursor = None
+        while True:
+            page_args = {**args, "cursor": cursor} if cursor else args
+            result = await client.call_tool(tool, page_args)
+            data = json.loads(result[0].text)
+            assert data["success"], data
+            pages.append(data[key])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return pages
+
+def test_cursor_pagination_walks_every_row_once():
+    """カーソルで全件を重複・欠落なくたどれること"""
+    with tempfile.TemporaryDirectory() as tmp, swap_database(_new_database(tmp)) as db:
+        with db.write_connection() as conn:
+            conn.executemany(
+                "INSERT INTO categories (name) VALUES (?)", [(f"カテゴリ{i:02d}",) for i in range(25)]
+            )
+            conn.executemany(
+                "INSERT INTO tasks (title, description, priority) VALUES (?, ?, ?)",
+                [(f"レビュー依頼{i}", "", i % 3 + 1) for i in range(45)]
+            )
+
+        pages = asyncio.run(_walk_pages("get_tasks", {"status": "pending", "limit": 30}, "tasks"))
+        ids = [task["id"] for page in pages for task in page]
+        with db.get_connection() as conn:
+            expected = [row["id"] for row in conn.execute("""
+                SELECT id FROM tasks WHERE status = 'pending'
+                ORDER BY priority DESC, created_at DESC, id DESC
+            """)]
+        assert ids == expected
+        assert [len(page) for page in pages] == [30, 30, 30, 30, 25]
+
+        pages = asyncio.run(_walk_pages("search_tasks", {"keyword": "レビュー依頼", "limit": 10}, "tasks"))
+        ids = [task["id"] for page in pages for task in page]
+        assert len(ids) == len(set(ids)) == 45
+
+        pages = asyncio.run(_walk_pages("get_categories", {"limit": 10}, "categories"))
+        names = [category["name"] for page in pages for category in page]
+        assert names == [f"カテゴリ{i:02d}" for i in range(25)]
+
+async def _call(tool: str, args: dict) -> dict:
+    async with Client(task_manager.mcp) as client:
+        result = await client.call_tool(tool, args)
+        return json.loads(result[0].text)
+
+def test_pagination_rejects_non_positive_limit():
+    """limit が1未満ならページを作らずにエラーを返すこと"""
+    with tempfile.TemporaryDirectory() as tmp, swap_database(_new_database(tmp)) as db:
+        for limit in (0, -1):
+            for tool, args, key in (
+                ("get_tasks", {}, "tasks"),
+                ("search_tasks", {"keyword": "タスク"}, "tasks"),
+                ("get_categories", {}, "categories"),
+            ):
+                result = asyncio.run(_call(tool, {**args, "limit": limit}))
+                assert not result["success"] and result[key] == [], result
+                assert "limit" in result["error"], result
+
+def test_search_terms_are_anded_on_every_path():
+    """短い語を含む検索でも、すべての語を含むタスクだけが返ること"""
+    with tempfile.TemporaryDirectory() as tmp, swap_database(TaskDatabase(os.path.join(tmp, "search.db"))) as db:
+        with db.write_connection() as conn:
+            ids = [conn.execute("INSERT INTO tasks (title) VALUES (?)", (title,)).lastrowid for title in (
+                "コードレビュー 1回目", "コードレビュー 2回目", "1番目の資料作成"
+            )]
+
+        def search(keyword: str) -> list:
+            result = asyncio.run(_call("search_tasks", {"keyword": keyword}))
+            assert result["success"], result
+            return sorted(task["id"] for task in result["tasks"])
+
+        # 全文検索できる語と短い語の組み合わせ
+        assert search("コードレビュー 1") == [ids[0]]
+        assert search("1 コードレビュー*") == [ids[0]]
+        # 短い語だけ（trigram では部分一致検索になる）
+        assert search("1 目") == [ids[0], ids[2]]
+        assert search("2 資料") == []
+
+def test_bulk_tools_report_per_item_results():
+    """一括ツールが要素ごとの結果を入力順に返すこと"""
+    with tempfile.TemporaryDirectory() as tmp, swap_database(TaskDatabase(os.path.join(tmp, "bulk.db"))) as db:
+        created = asyncio.run(_call("create_tasks_bulk", {"tasks": [
+            {"title": "設計", "priority": 3},
+            {"title": "", "priority": 1},
+            {"title": "実装", "description": "API", "priority": 9},
+            {"title": "テスト"},
+            {"title": "真偽値", "priority": True},
+        ]}))
+        assert created["created"] == 2 and created["failed"] == 3
+        assert [item["success"] for item in created["results"]] == [True, False, False, True, False]
+        ids = [created["results"][0]["task_id"], created["results"][3]["task_id"]]
+        with db.get_connection() as conn:
+            titles = [row["title"] for row in conn.execute(
+                "SELECT title FROM tasks WHERE id IN (?, ?) ORDER BY id", ids
+            )]
+        assert titles == ["設計", "テスト"]
+
+        updated = asyncio.run(_call("update_task_status_bulk", {"updates": [
+            {"task_id": ids[0], "status": "completed"},
+            {"task_id": ids[1], "status": "done"},
+            {"task_id": 9999, "status": "cancelled"},
+        ]}))
+        assert updated["updated"] == 1
+        assert [item["success"] for item in updated["results"]] == [True, False, False]
+        with db.get_connection() as conn:
+            statuses = [row["status"] for row in conn.execute(
+                "SELECT status FROM tasks WHERE id IN (?, ?) ORDER BY id", ids
+            )]
+        assert statuses == ["completed", "pending"]
+
+def test_online_backup_is_consistent_while_writing():
+    """WALモードでは書き込み中でもバックアップが開始時点のスナップショットになること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _new_database(tmp, storage_profile="wal")
+        with db.write_connection() as conn:
+            conn.executemany(
+                "INSERT INTO tasks (title, description) VALUES (?, ?)",
+                [(f"大量タスク{i}", "x" * 500) for i in range(5000)]
+            )
+        with db.get_connection() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+        stop = threading.Event()
+        def writer():
+            while not stop.is_set():
+                with db.write_connection() as conn:
+                    conn.execute("INSERT INTO tasks (title) VALUES ('バックアップ中の追加')")
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            backup_path = os.path.join(tmp, "backup.db")
+            progress = db.backup_to(backup_path, pages_per_step=16)
+        finally:
+            stop.set()
+            thread.join()
+
+        assert progress["steps"] > 1
+        backup = sqlite3.connect(backup_path)
+        assert backup.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        # 開始時点以降の追加は含まれない（書き込みはブロックされていない）
+        assert backup.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == before
+        backup.close()
+        with db.get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] > before
+        db.close()
+
+def test_backup_without_wal_copies_in_one_step():
+    """WAL以外では一度にコピーし、書き込みが挟まらない一貫したバックアップになること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _new_database(tmp, storage_profile="default")
+        with db.get_connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+            before = conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+        backup_path = os.path.join(tmp, "backup.db")
+        progress = db.backup_to(backup_path, pages_per_step=1)
+        assert progress["steps"] == 1
+
+        backup = sqlite3.connect(backup_path)
+        assert backup.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        assert backup.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == before
+        backup.close()
+        # バックアップ後は書き込める（共有ロックが残っていない）
+        with db.write_connection() as conn:
+            conn.execute("INSERT INTO tasks (title) VALUES ('バックアップ後の追加')")
+        db.close()
+
+def test_export_streams_every_row_in_each_format():
+    """1000件を超えるタスクを、形式・圧縮の有無によらず全件同じ順序で書き出すこと"""
+    with tempfile.TemporaryDirectory() as tmp, swap_database(_new_database(tmp)) as db:
+        with db.write_connection() as conn:
+            conn.executemany(
+                "INSERT INTO tasks (title, description, priority) VALUES (?, ?, ?)",
+                [(f"追加タスク{i}", "説明, \"引用\"\n改行", i % 5 + 1) for i in range(2300)]
+            )
+            conn.executemany("INSERT INTO categories (name) VALUES (?)", [("仕事",), ("家",)])
+            conn.execute("INSERT INTO task_categories (task_id, category_id) VALUES (1, 1), (1, 2)")
+            expected = [row[0] for row in conn.execute(
+                "SELECT id FROM tasks ORDER BY priority DESC, created_at DESC, id DESC"
+            )]
+        assert len(expected) == 2500
+
+        for file_format in ("json", "ndjson", "csv"):
+            for compress in (False, True):
+                path = os.path.join(tmp, f"export.{file_format}")
+                result = task_manager.export_tasks_to_json.fn(
+                    file_path=path, file_format=file_format, compress=compress, chunk_size=300
+                )
+                assert result["success"], result
+                assert result["exported_count"] == 2500
+                assert result["file_path"] == path + (".gz" if compress else "")
+                assert not os.path.exists(result["file_path"] + ".tmp")
+
+                opener = gzip.open if compress else open
+                with opener(result["file_path"], "rt", encoding="utf-8", newline="") as f:
+                    if file_format == "json":
+                        rows = json.load(f)
+                    elif file_format == "ndjson":
+                        rows = [json.loads(line) for line in f]
+                    else:
+                        rows = list(csv.DictReader(f))
+                assert [int(row["id"]) for row in rows] == expected, (file_format, compress)
+                first = next(row for row in rows if int(row["id"]) == 1)
+                categories = first["categories"]
+                if file_format == "csv":
+                    categories = categories.split(";")
+                assert sorted(categories) == ["仕事", "家"]
+                added = next(row for row in rows if row["title"] == "追加タスク0")
+                assert added["description"] == "説明, \"引用\"\n改行"
+
+        invalid = task_manager.export_tasks_to_json.fn(file_path=path, file_format="xml")
+        assert not invalid["success"] and invalid["valid_formats"] == ["json", "ndjson", "csv"]
+
+def test_backup_retention_keeps_newest():
+    """保持件数を超えた古いバックアップだけが削除されること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        names = [f"backup_tasks_2025010{day}_120000.db" for day in range(1, 6)]
+        for name in names + ["manual.db"]:
+            Path(tmp, name).touch()
+        removed = apply_backup_retention(tmp, 2)
+        assert sorted(Path(path).name for path in removed) == names[:3]
+        assert sorted(path.name for path in Path(tmp).iterdir()) == names[3:] + ["manual.db"]
+
+def test_task_counters_match_aggregates_after_random_mutations():
+    """ランダムな追加・更新・削除の後も集計テーブルが実データと一致すること"""
+    rng = random.Random(1234)
+    statuses = ["pending", "completed", "cancelled"]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = _new_database(tmp)
+        for step in range(500):
+            with db.write_connection() as conn:
+                ids = [row[0] for row in conn.execute("SELECT id FROM tasks")]
+                operation = rng.choice(["insert", "insert_many", "status", "priority", "both", "delete"])
+                if operation == "insert" or not ids:
+                    conn.execute(
+                        "INSERT INTO tasks (title, status, priority) VALUES (?, ?, ?)",
+                        (f"乱数タスク{step}", rng.choice(statuses), rng.randint(1, 5))
+                    )
+                elif operation == "insert_many":
+                    conn.executemany(
+                        "INSERT INTO tasks (title, priority) VALUES (?, ?)",
+                        [(f"乱数タスク{step}-{i}", rng.randint(1, 5)) for i in range(rng.randint(1, 5))]
+                    )
+                elif operation == "status":
+                    conn.execute("UPDATE tasks SET status = ? WHERE id = ?",
+                                 (rng.choice(statuses), rng.choice(ids)))
+                elif operation == "priority":
+                    conn.execute("UPDATE tasks SET priority = ? WHERE priority = ?",
+                                 (rng.randint(1, 5), rng.randint(1, 5)))
+                elif operation == "both":
+                    conn.execute("UPDATE tasks SET status = ?, priority = ? WHERE id = ?",
+                                 (rng.choice(statuses), rng.randint(1, 5), rng.choice(ids)))
+                else:
+                    conn.execute("DELETE FROM tasks WHERE id IN (?, ?)",
+                                 (rng.choice(ids), rng.choice(ids)))
+
+            if step % 50 == 0:
+                with db.get_connection() as conn:
+                    assert read_task_counters(conn) == aggregate_task_statistics(conn)
+
+        with db.get_connection() as conn:
+            assert read_task_counters(conn) == aggregate_task_statistics(conn)
+            # 優先度は高い順
+            priorities = list(read_task_counters(conn)["by_priority"])
+            assert priorities == sorted(priorities, reverse=True)
+        db.close()
+
+def test_verify_task_statistics_repairs_drift():
+    """集計テーブルのずれを検出して修復できること"""
+    with tempfile.TemporaryDirectory() as tmp, swap_database(_new_database(tmp)) as db:
+        with db.write_connection() as conn:
+            conn.execute("UPDATE task_counters SET count = count + 3 WHERE dimension = 'status'")
+        result = asyncio.run(_call("verify_task_statistics", {}))
+        assert not result["consistent"] and not result["repaired"]
+        assert [item["item"] for item in result["mismatches"]] == ["by_status"]
+
+        result = asyncio.run(_call("verify_task_statistics", {"repair": True}))
+        assert result["repaired"]
+        result = asyncio.run(_call("verify_task_statistics", {}))
+        assert result["consistent"]
+
+def test_result_cache_invalidated_by_writes():
+    """読み取り結果がキャッシュされ、書き込みツールで無効化されること"""
+    with tempfile.TemporaryDirectory() as tmp, swap_database(TaskDatabase(os.path.join(tmp, "cache.db"))) as db:
+        first = asyncio.run(_call("get_tasks", {}))
+        # 既定値を明示しても同じキーになる
+        second = asyncio.run(_call("get_tasks", {"status": "all", "limit": 10}))
+        assert first == second
+        stats = db.cache.get_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+        asyncio.run(_call("create_task", {"title": "キャッシュ無効化"}))
+        third = asyncio.run(_call("get_tasks", {}))
+        assert third["count"] == first["count"] + 1
+        assert db.cache.get_stats()["misses"] == 2
+
+        # 対象が無く行が変わらなかった書き込みでは無効化しない
+        generation = db.cache.generation
+        assert not asyncio.run(_call("update_task_status", {"task_id": 9999, "status": "completed"}))["success"]
+        assert not asyncio.run(_call("delete_task", {"task_id": 9999}))["success"]
+        assert db.cache.generation == generation
+        assert asyncio.run(_call("get_tasks", {})) == third
+        assert db.cache.get_stats()["hits"] == 2
+
+        # 読み取り中に書き込みがあった結果は保存しない
+        generation = db.cache.generation
+        db.cache.invalidate()
+        db.cache.put("stale", {"success": True}, generation)
+        assert db.cache.get("stale") is None
+
+def test_write_stats_count_every_concurrent_write():
+    """並行した書き込みの回数が欠けずに記録されること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = TaskDatabase(os.path.join(tmp, "writes.db"))
+        def worker():
+            for _ in range(50):
+                with db.write_connection() as conn:
+                    conn.execute("INSERT INTO tasks (title) VALUES ('並行書き込み')")
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = db.get_storage_info()["writer"]
+        assert stats["writes"] == 8 * 50
+        assert 0 <= stats["contended"] <= stats["writes"]
+        db.close()
+
+def test_connection_pool_recovers_from_failed_reconnect():
+    """壊れた接続の作り直しに失敗しても枠が解放され、統計が欠けないこと"""
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "pool.db"), size=1, timeout=1.0)
+        conn = pool.acquire()
+        conn.close()  # 壊れた接続を返却する
+        pool.release(conn)
+
+        original_open = task_manager.open_connection
+        def failing_open(*args, **kwargs):
+            raise sqlite3.OperationalError("unable to open database file")
+        task_manager.open_connection = failing_open
+        try:
+            for _ in range(3):
+                try:
+                    pool.acquire()
+                    assert False, "作り直しの失敗が伝わっていない"
+                except sqlite3.OperationalError:
+                    pass
+        finally:
+            task_manager.open_connection = original_open
+        assert pool.get_stats()["open_connections"] == 0
+
+        # 枠が解放されているので、待たずに新しい接続を作れる
+        pool.release(pool.acquire())
+
+        def worker():
+            for _ in range(200):
+                pool.release(pool.acquire())
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = pool.get_stats()
+        assert stats["checkouts"] == 2 + 8 * 200  # 最初の2回 + 並行分
+        assert stats["open_connections"] == 1
+        pool.close_all()
+
+if __name__ == "__main__":
+    test_migrations_recorded()
+    test_task_list_queries_use_indexes()
+    test_statistics_queries_use_covering_indexes()
+    test_fts_index_follows_task_changes()
+    test_build_fts_query()
+    test_cursor_pagination_walks_every_row_once()
+    test_pagination_rejects_non_positive_limit()
+    test_search_terms_are_anded_on_every_path()
+    test_bulk_tools_report_per_item_results()
+    test_online_backup_is_consistent_while_writing()
+    test_backup_without_wal_copies_in_one_step()
+    test_export_streams_every_row_in_each_format()
+    test_backup_retention_keeps_newest()
+    test_task_counters_match_aggregates_after_random_mutations()
+    test_verify_task_statistics_repairs_drift()
+    test_result_cache_invalidated_by_writes()
+    test_write_stats_count_every_concurrent_write()
+    test_connection_pool_recovers_from_failed_reconnect()
+    print("✅ すべてのテストが成功しました")
@@ -0,0 +1,282 @@
+"""
+タスク管理サーバーの性能ベンチマーク
+"""
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from fastmcp import Client
+
+import task_manager
+from task_manager import TaskDatabase
+from test_database import swap_database
+
+def _seed_tasks(db: TaskDatabase, count: int):
+    """ベンチマーク用のタスクを投入"""
+    with db.write_connection() as conn:
+        conn.executemany(
+            "INSERT INTO tasks (title, description, priority, status) VALUES (?, ?, ?, ?)",
+            [
+                (f"タスク{i}", f"ベンチマーク用タスク {i}", i % 5 + 1,
+                 ("pending", "completed", "cancelled")[i % 3])
+                for i in range(count)
+            ]
+        )
+
+def _calls_per_second(func, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return iterations / (time.perf_counter() - start)
+
+def benchmark_connection_pool(iterations: int = 5000):
+    """接続プール導入前後の get_tasks 相当クエリのスループット比較"""
+    print("=== 接続プール ベンチマーク ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = TaskDatabase(os.path.join(tmp, "bench.db"))
+        _seed_tasks(db, 1000)
+        query = "SELECT * FROM tasks ORDER BY priority DESC, created_at DESC LIMIT 10"
+
+        def connect_per_call():
+            # 従来方式: 呼び出しごとに connect と PRAGMA を実行
+            conn = sqlite3.connect(db.db_path)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys = ON")
+            with conn:
+                [dict(row) for row in conn.execute(query).fetchall()]
+            conn.close()
+
+        def pooled():
+            with db.get_connection() as conn:
+                [dict(row) for row in conn.execute(query).fetchall()]
+
+        before = _calls_per_second(connect_per_call, iterations)
+        after = _calls_per_second(pooled, iterations)
+        db.close()
+
+    print(f"📉 接続ごと: {before:,.0f} calls/sec")
+    print(f"📈 プール使用: {after:,.0f} calls/sec（{after / before:.1f}倍）\n")
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+    return ordered[index]
+
+def benchmark_mixed_workload(profile: str, readers: int = 8, writers: int = 2,
+                             duration: float = 3.0):
+    """読み書き混在の負荷をかけ、p50/p99 レイテンシを計測"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = TaskDatabase(os.path.join(tmp, "stress.db"), pool_size=readers,
+                          storage_profile=profile)
+        _seed_tasks(db, 5000)
+        latencies = {"read": [], "write": []}
+        errors = []
+        stop = time.perf_counter() + duration
+
+        def reader():
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    with db.get_connection() as conn:
+                        conn.execute("""
+                            SELECT * FROM tasks WHERE status = ?
+                            ORDER BY priority DESC, created_at DESC LIMIT 20
+                        """, (random.choice(["pending", "completed"]),)).fetchall()
+                        conn.execute(
+                            "SELECT * FROM tasks WHERE title LIKE ?", ("%タスク42%",)
+                        ).fetchall()
+                except Exception as e:
+                    errors.append(str(e))
+                    continue
+                latencies["read"].append(time.perf_counter() - start)
+
+        def writer():
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    with db.write_connection() as conn:
+                        conn.execute(
+                            "INSERT INTO tasks (title, description, priority) VALUES (?, ?, ?)",
+                            ("負荷テスト", "mixed workload", random.randint(1, 5))
+                        )
+                        conn.execute(
+                            "UPDATE tasks SET status = 'completed', updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                            (random.randint(1, 5000),)
+                        )
+                except Exception as e:
+                    errors.append(str(e))
+                    continue
+                latencies["write"].append(time.perf_counter() - start)
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        db.close()
+
+    print(f"--- storage_profile = {profile} ---")
+    for kind, samples in latencies.items():
+        if samples:
+            print(f"  {kind:5}: {len(samples):6,} ops  "
+                  f"p50={statistics.median(samples) * 1000:.2f}ms  "
+                  f"p99={_percentile(samples, 99) * 1000:.2f}ms")
+    print(f"  errors: {len(errors)}" + (f"（例: {errors[0]}）" if errors else ""))
+
+def _make_vocabulary(size: int, rng: random.Random) -> list:
+    """ランダムな英小文字6文字の語彙"""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choices(letters, k=6)) for _ in range(size)]
+
+def _seed_random_tasks(db: TaskDatabase, count: int, vocabulary: list,
+                       batch: int = 10000):
+    """ランダムな語を組み合わせたタスクを大量に投入"""
+    rng = random.Random(42)
+    for start in range(0, count, batch):
+        rows = [
+            (" ".join(rng.choices(vocabulary, k=3)),
+             " ".join(rng.choices(vocabulary, k=8)),
+             rng.randint(1, 5))
+            for _ in range(start, min(start + batch, count))
+        ]
+        with db.write_connection() as conn:
+            conn.executemany(
+                "INSERT INTO tasks (title, description, priority) VALUES (?, ?, ?)", rows
+            )
+
+def benchmark_search(task_count: int = 500_000, limit: int = 20):
+    """LIKE 検索と FTS5 検索の比較"""
+    print(f"=== 検索ベンチマーク（{task_count:,}件） ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = TaskDatabase(os.path.join(tmp, "search.db"))
+        rng = random.Random(7)
+        vocabulary = _make_vocabulary(20000, rng)
+        start = time.perf_counter()
+        _seed_random_tasks(db, task_count, vocabulary)
+        print(f"🧱 投入: {time.perf_counter() - start:.1f}秒（トークナイザ: {db.fts_tokenizer}）")
+
+        # 各語は平均して数百件のタスクに出現する
+        keywords = rng.sample(vocabulary, 20)
+        with db.get_connection() as conn:
+            start = time.perf_counter()
+            for keyword in keywords:
+                pattern = f"%{keyword}%"
+                conn.execute("""
+                    SELECT * FROM tasks WHERE title LIKE ? OR description LIKE ?
+                    ORDER BY priority DESC, created_at DESC LIMIT ?
+                """, (pattern, pattern, limit)).fetchall()
+            like_ms = (time.perf_counter() - start) / len(keywords) * 1000
+
+            start = time.perf_counter()
+            for keyword in keywords:
+                conn.execute("""
+                    SELECT t.*, f.rank AS score
+                    FROM (SELECT rowid, rank FROM tasks_fts WHERE tasks_fts MATCH ?
+                          ORDER BY rank LIMIT ?) f
+                    JOIN tasks t ON t.id = f.rowid
+                    ORDER BY f.rank
+                """, (f'"{keyword}"', limit)).fetchall()
+            fts_ms = (time.perf_counter() - start) / len(keywords) * 1000
+
+            start = time.perf_counter()
+            for keyword in keywords:
+                conn.execute(
+                    "SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ? LIMIT ?",
+                    (f'"{keyword}"', limit)
+                ).fetchall()
+            fts_unranked_ms = (time.perf_counter() - start) / len(keywords) * 1000
+        db.close()
+
+    print(f"🐢 LIKE:              {like_ms:8.1f} ms/query")
+    print(f"🚀 FTS5（bm25順）:    {fts_ms:8.1f} ms/query")
+    print(f"🚀 FTS5（順位なし）:  {fts_unranked_ms:8.1f} ms/query\n")
+
+async def _bulk_vs_single(count: int) -> dict:
+    """単件ツールの繰り返しと一括ツールの所要時間を比較"""
+    timings = {}
+    tasks = [
+        {"title": f"一括タスク{i}", "description": "bulk benchmark", "priority": i % 5 + 1}
+        for i in range(count)
+    ]
+    async with Client(task_manager.mcp) as client:
+        start = time.perf_counter()
+        ids = []
+        for task in tasks:
+            result = await client.call_tool("create_task", task)
+            ids.append(json.loads(result[0].text)["task"]["id"])
+        timings["create_single"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for task_id in ids:
+            await client.call_tool("update_task_status", {"task_id": task_id, "status": "completed"})
+        timings["update_single"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = await client.call_tool("create_tasks_bulk", {"tasks": tasks})
+        data = json.loads(result[0].text)
+        timings["create_bulk"] = time.perf_counter() - start
+
+        updates = [
+            {"task_id": item["task_id"], "status": "completed"} for item in data["results"]
+        ]
+        start = time.perf_counter()
+        await client.call_tool("update_task_status_bulk", {"updates": updates})
+        timings["update_bulk"] = time.perf_counter() - start
+    return timings
+
+def benchmark_bulk_operations(counts: tuple = (1_000, 10_000)):
+    """一括作成・一括更新ツールのスループット"""
+    print("=== 一括処理ベンチマーク ===")
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp, swap_database(TaskDatabase(os.path.join(tmp, "bulk.db"))):
+            timings = asyncio.run(_bulk_vs_single(count))
+
+        print(f"--- {count:,}件 ---")
+        for operation in ("create", "update"):
+            single = count / timings[f"{operation}_single"]
+            bulk = count / timings[f"{operation}_bulk"]
+            print(f"  {operation}: 単件 {single:10,.0f} items/sec  "
+                  f"一括 {bulk:10,.0f} items/sec（{bulk / single:.0f}倍）")
+    print()
+
+async def _export(args: dict) -> dict:
+    async with Client(task_manager.mcp) as client:
+        result = await client.call_tool("export_tasks_to_json", args)
+        return json.loads(result[0].text)
+
+def benchmark_export(task_count: int = 200_000):
+    """形式ごとのストリーミングエクスポート速度"""
+    print(f"=== エクスポートベンチマーク（{task_count:,}件） ===")
+    with tempfile.TemporaryDirectory() as tmp, swap_database(TaskDatabase(os.path.join(tmp, "export.db"))) as db:
+        _seed_random_tasks(db, task_count, _make_vocabulary(2000, random.Random(1)))
+        for file_format in ("json", "ndjson", "csv"):
+            for compress in (False, True):
+                data = asyncio.run(_export({
+                    "file_path": os.path.join(tmp, f"export.{file_format}"),
+                    "file_format": file_format,
+                    "compress": compress
+                }))
+                label = file_format + ("+gzip" if compress else "")
+                print(f"  {label:12} {data['rows_per_sec']:>9,} rows/sec  "
+                      f"{data['file_size'] / 1024 / 1024:7.1f} MB  "
+                      f"peak RSS +{data['peak_rss_increase_mb']} MB")
+    print()
+
+if __name__ == "__main__":
+    benchmark_connection_pool()
+
+    print("=== 読み書き混在ストレステスト ===")
+    for profile in ("default", "wal"):
+        benchmark_mixed_workload(profile)
+    print()
+
+    benchmark_search()
+    benchmark_bulk_operations()
+    benchmark_export()
@@ -3,20 +3,464 @@
 """
 import sqlite3
 import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import closing, contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
+from settings import config
+
+# analyses.keywords（JSON）を analysis_keywords の行に展開する INSERT
+_EXPAND_KEYWORDS = """
+    INSERT OR IGNORE INTO analysis_keywords (analysis_id, word, count, frequency)
+    SELECT {analysis}.id, json_extract(k.value, '$.word'),
+           json_extract(k.value, '$.count'), json_extract(k.value, '$.frequency')
+    FROM {source}
+"""
+
+# keyword_totals を analysis_keywords から作り直す（閾値変更時）
+REBUILD_KEYWORD_TOTALS_SQL = [
+    "DELETE FROM keyword_totals",
+    "INSERT INTO keyword_totals (word, total_count, documents) "
+    "SELECT word, SUM(count), COUNT(*) FROM analysis_keywords "
+    "WHERE frequency >= (SELECT min_frequency FROM keyword_totals_meta) GROUP BY word",
+]
+
+# スキーママイグレーション（version順に適用し schema_migrations に記録）
+MIGRATIONS = [
+    (1, "add_http_cache", [
+        # URLごとのHTTPキャッシュ情報（条件付きリクエスト用）
+        """
+        CREATE TABLE IF NOT EXISTS http_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,  -- 抽出したタイトル・本文の SHA-256
+            content_bytes INTEGER,  -- レスポンス本文のバイト数
+            analysis_id INTEGER,  -- 再利用する分析結果
+            result TEXT,  -- JSON形式（ツールの返却値）
+            requests INTEGER DEFAULT 0,
+            hits INTEGER DEFAULT 0,  -- 再分析を省略した回数
+            not_modified INTEGER DEFAULT 0,  -- 304 応答の回数
+            bytes_saved INTEGER DEFAULT 0,
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (analysis_id) REFERENCES analyses(id)
+        )
+        """,
+    ]),
+    (2, "add_content_hash_dedup", [
+        # 抽出済み本文の SHA-256（同一内容の検出用）
+        "ALTER TABLE urls ADD COLUMN content_hash TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_urls_content_hash ON urls (content_hash)",
+        # 本文ハッシュ → 分析結果のメモ（同一内容は一度だけ分析する）
+        """
+        CREATE TABLE IF NOT EXISTS analysis_cache (
+            content_hash TEXT PRIMARY KEY,
+            result TEXT NOT NULL,  -- JSON形式（full_analysis の結果）
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (3, "add_keyword_tables", [
+        # 分析ごとのキーワード（analyses.keywords を正規化したもの）
+        """
+        CREATE TABLE IF NOT EXISTS analysis_keywords (
+            analysis_id INTEGER NOT NULL,
+            word TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            frequency REAL NOT NULL,
+            PRIMARY KEY (analysis_id, word),
+            FOREIGN KEY (analysis_id) REFERENCES analyses(id)
+        )
+        """,
+        # 任意の閾値での集計（GROUP BY word）をインデックスだけで行う
+        "CREATE INDEX IF NOT EXISTS idx_analysis_keywords_word "
+        "ON analysis_keywords (word, frequency, count)",
+        # 閾値以上のキーワードの累計（挿入時にトリガーで更新）
+        """
+        CREATE TABLE IF NOT EXISTS keyword_totals (
+            word TEXT PRIMARY KEY,
+            total_count INTEGER NOT NULL DEFAULT 0,
+            documents INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_keyword_totals_count "
+        "ON keyword_totals (total_count DESC, word)",
+        # keyword_totals の閾値と、キーワードを持つ分析の件数
+        """
+        CREATE TABLE IF NOT EXISTS keyword_totals_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            min_frequency REAL NOT NULL,
+            analyzed_documents INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR IGNORE INTO keyword_totals_meta (id, min_frequency) VALUES (1, 0.01)",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS analyses_keywords_insert
+        AFTER INSERT ON analyses
+        WHEN NEW.keywords IS NOT NULL AND json_valid(NEW.keywords)
+        BEGIN
+            UPDATE keyword_totals_meta SET analyzed_documents = analyzed_documents + 1;
+            {_EXPAND_KEYWORDS.format(analysis="NEW", source="json_each(NEW.keywords) k")};
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS analyses_keywords_delete
+        AFTER DELETE ON analyses
+        WHEN OLD.keywords IS NOT NULL AND json_valid(OLD.keywords)
+        BEGIN
+            UPDATE keyword_totals_meta SET analyzed_documents = analyzed_documents - 1;
+            DELETE FROM analysis_keywords WHERE analysis_id = OLD.id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS analysis_keywords_insert
+        AFTER INSERT ON analysis_keywords
+        WHEN NEW.frequency >= (SELECT min_frequency FROM keyword_totals_meta)
+        BEGIN
+            INSERT INTO keyword_totals (word, total_count, documents)
+            VALUES (NEW.word, NEW.count, 1)
+            ON CONFLICT(word) DO UPDATE SET
+                total_count = total_count + excluded.total_count,
+                documents = documents + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS analysis_keywords_delete
+        AFTER DELETE ON analysis_keywords
+        WHEN OLD.frequency >= (SELECT min_frequency FROM keyword_totals_meta)
+        BEGIN
+            UPDATE keyword_totals
+            SET total_count = total_count - OLD.count, documents = documents - 1
+            WHERE word = OLD.word;
+            DELETE FROM keyword_totals WHERE word = OLD.word AND documents <= 0;
+        END
+        """,
+        # 既存の分析結果を展開（上のトリガーで keyword_totals も作られる）
+        _EXPAND_KEYWORDS.format(
+            analysis="a",
+            source="analyses a, json_each(CASE WHEN json_valid(a.keywords) "
+                   "THEN a.keywords END) k"
+        ),
+        "UPDATE keyword_totals_meta SET analyzed_documents = "
+        "(SELECT COUNT(*) FROM analyses WHERE keywords IS NOT NULL AND json_valid(keywords))",
+    ]),
+    (4, "add_analysis_list_indexes", [
+        # get_analysis_history の ORDER BY analyzed_at DESC（id はカーソル用の一意な順序）
+        "CREATE INDEX IF NOT EXISTS idx_analyses_analyzed_at "
+        "ON analyses (analyzed_at DESC, id DESC)",
+        # search_by_sentiment の WHERE sentiment_label = ? ORDER BY sentiment_score DESC
+        "CREATE INDEX IF NOT EXISTS idx_analyses_label_score "
+        "ON analyses (sentiment_label, sentiment_score DESC, id DESC)",
+        # urls 側からの analyses 参照
+        "CREATE INDEX IF NOT EXISTS idx_analyses_url_id ON analyses (url_id)",
+    ]),
+    (5, "repair_orphaned_analyses", [
+        # INSERT OR REPLACE で urls の行が作り直され、参照先を失った分析結果を修復する
+        # 1. HTTPキャッシュに記録が残っていれば、同じURLの現在の行へ付け替える
+        """
+        UPDATE analyses SET url_id = (
+            SELECT u.id FROM http_cache c JOIN urls u ON u.url = c.url
+            WHERE c.analysis_id = analyses.id
+        )
+        WHERE NOT EXISTS (SELECT 1 FROM urls WHERE urls.id = analyses.url_id)
+          AND EXISTS (
+            SELECT 1 FROM http_cache c JOIN urls u ON u.url = c.url
+            WHERE c.analysis_id = analyses.id
+          )
+        """,
+        # 2. 元のURLが分からないものは、元の id で代わりの行を作る
+        """
+        INSERT INTO urls (id, url, title, status)
+        SELECT DISTINCT a.url_id, 'orphaned://url/' || a.url_id, 'Unknown URL', 'orphaned'
+        FROM analyses a
+        WHERE a.url_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM urls u WHERE u.id = a.url_id)
+        """,
+    ]),
+    (6, "add_feed_cache", [
+        # フィードごとの条件付きリクエスト情報と、前回解析した記事一覧
+        """
+        CREATE TABLE IF NOT EXISTS feed_cache (
+            feed_url TEXT PRIMARY KEY,
+            feed_title TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,  -- フィード本文の SHA-256
+            content_bytes INTEGER,
+            entries TEXT,  -- JSON形式（parse_entries の結果）
+            requests INTEGER DEFAULT 0,
+            hits INTEGER DEFAULT 0,  -- 記事一覧の解析を省略した回数
+            not_modified INTEGER DEFAULT 0,  -- 304 応答の回数
+            checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (7, "add_feed_subscriptions", [
+        # 定期的に取得するフィード（時刻は UNIX 時間の秒）
+        """
+        CREATE TABLE IF NOT EXISTS feed_subscriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            feed_url TEXT UNIQUE NOT NULL,
+            interval_seconds REAL NOT NULL,
+            max_items INTEGER NOT NULL,
+            enabled INTEGER DEFAULT 1,
+            next_poll_at REAL NOT NULL,
+            last_polled_at REAL,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_feed_subscriptions_due "
+        "ON feed_subscriptions (enabled, next_poll_at)",
+        # 処理済みの記事（GUID）。同じ記事は二度分析しない
+        """
+        CREATE TABLE IF NOT EXISTS feed_seen_items (
+            subscription_id INTEGER NOT NULL,
+            guid TEXT NOT NULL,
+            link TEXT,
+            analysis_id INTEGER,
+            error TEXT,
+            enqueued_at REAL,
+            analyzed_at REAL,
+            PRIMARY KEY (subscription_id, guid),
+            FOREIGN KEY (subscription_id) REFERENCES feed_subscriptions(id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_feed_seen_items_analyzed_at "
+        "ON feed_seen_items (analyzed_at)",
+    ]),
+    (8, "add_job_queue", [
+        # バックグラウンドで処理する一括分析ジョブ（時刻は UNIX 時間の秒）
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,  -- batch / rss
+            params TEXT,  -- JSON形式（投入時の引数）
+            status TEXT NOT NULL DEFAULT 'pending',  -- pending / running / completed
+            total_items INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL
+        )
+        """,
+        # ジョブの各URL（status: pending / running / done / failed）
+        """
+        CREATE TABLE IF NOT EXISTS job_items (
+            job_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            result TEXT,  -- JSON形式（_internal_scrape_and_analyze の結果）
+            attempts INTEGER DEFAULT 0,
+            started_at REAL,
+            finished_at REAL,
+            PRIMARY KEY (job_id, seq),
+            FOREIGN KEY (job_id) REFERENCES jobs(id)
+        )
+        """,
+        # 未処理の項目をジョブ・投入順に取り出す
+        "CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (status, job_id, seq)",
+    ]),
+]
+
+# URLの保存（同じURLは同じ id のまま、本文が変わったときだけ行を書き換える）
+UPSERT_URL_SQL = """
+    INSERT INTO urls (url, title, content, content_hash, status)
+    VALUES (?, ?, ?, ?, 'scraped')
+    ON CONFLICT(url) DO UPDATE SET
+        title = excluded.title,
+        content = excluded.content,
+        content_hash = excluded.content_hash,
+        status = excluded.status,
+        scraped_at = CURRENT_TIMESTAMP
+    WHERE urls.content_hash IS NOT excluded.content_hash
+       OR urls.title IS NOT excluded.title
+    RETURNING id
+"""
+
+# 一覧・統計の対象となる分析結果
+# （移行で作った代わりの urls 行 = 元のURLが分からない分析結果は除く）
+LISTED_ANALYSES_SQL = "analyses a JOIN urls u ON a.url_id = u.id AND u.status IS NOT 'orphaned'"
+
+def open_connection(db_path: str, timeout: float = 5.0, **kwargs) -> sqlite3.Connection:
+    """WAL用の設定を済ませた接続を作成（スレッド間で受け渡し可能）"""
+    conn = sqlite3.connect(db_path, timeout=timeout, check_same_thread=False, **kwargs)
+    conn.row_factory = sqlite3.Row
+    # WAL では NORMAL でもコミット済みのデータは壊れない（電源断時に直近のコミットが失われうるのみ）
+    conn.execute("PRAGMA synchronous = NORMAL")
+    return conn
+
+class ConnectionPool:
+    """読み書き用の接続を使い回すプール（必要になった時点で作成）"""
+    def __init__(self, db_path: str, size: int = 4, timeout: float = 5.0):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return open_connection(self.db_path, self.timeout)
+        try:
+            return self._pool.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"接続プールが枯渇しています（size={self.size}）")
+    
+    def release(self, conn: sqlite3.Connection):
+        self._pool.put(conn)
+    
+    def close_all(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+class BatchWriter:
+    """書き込み処理をまとめて1トランザクションでコミットする専用スレッド
+    
+    submit() した処理は最大 batch_size 件、または最初の1件から flush_interval 秒
+    待つまでまとめられ、BEGIN IMMEDIATE 〜 COMMIT の中で順に実行される。
+    flush_interval が 0 なら待たずに、その時点で溜まっている分だけをまとめる。
+    各処理はセーブポイントで区切るので、失敗した処理だけが取り消される。
+    Future はコミット完了後に結果を返すため、結果を受け取った時点で永続化済み。
+    """
+    def __init__(self, db_path: str, batch_size: int = 50, flush_interval: float = 0.0,
+                 timeout: float = 5.0):
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.stats = {"jobs": 0, "failed_jobs": 0, "transactions": 0}
+    
+    def submit(self, job: Callable[[sqlite3.Connection], Any]) -> Future:
+        """書き込み処理を登録（job は接続を受け取る関数）"""
+        future = Future()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+                self._thread.start()
+            self._queue.put((job, future))
+        return future
+    
+    def write(self, job: Callable[[sqlite3.Connection], Any]) -> Any:
+        """書き込み処理を登録し、コミットされるまで待って結果を返す"""
+        return self.submit(job).result()
+    
+    def flush(self):
+        """登録済みの書き込みがすべてコミットされるまで待つ"""
+        self.write(lambda conn: None)
+    
+    def close(self):
+        """残りの書き込みをコミットしてスレッドを止める"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+    
+    def _run(self):
+        conn = open_connection(self.db_path, self.timeout, isolation_level=None)
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        # 前のコミット中に溜まった分は待たずに取り出す
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        try:
+                            item = self._queue.get(timeout=remaining)
+                        except queue.Empty:
+                            break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._commit(conn, batch)
+        finally:
+            conn.close()
+    
+    def _commit(self, conn: sqlite3.Connection, batch: list):
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for job, future in batch:
+                conn.execute("SAVEPOINT job")
+                try:
+                    outcomes.append((future, job(conn), None))
+                    conn.execute("RELEASE job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    outcomes.append((future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _, future in batch:
+                future.set_exception(e)
+            self.stats["failed_jobs"] += len(batch)
+            return
+        
+        self.stats["transactions"] += 1
+        for future, value, error in outcomes:
+            self.stats["jobs"] += 1
+            if error is None:
+                future.set_result(value)
+            else:
+                self.stats["failed_jobs"] += 1
+                future.set_exception(error)
 
 class AnalysisDatabase:
-    def __init__(self, db_path: str = "data/analysis.db"):
+    def __init__(self, db_path: str = "data/analysis.db", pool_size: int = None):
+        db_config = config.get("database", {})
         self.db_path = db_path
+        self.timeout = db_config.get("timeout", 5.0)
         self.init_database()
+        self.pool = ConnectionPool(
+            db_path, pool_size or db_config.get("pool_size", 4), self.timeout
+        )
+        self.writer = BatchWriter(
+            db_path,
+            batch_size=db_config.get("write_batch_size", 50),
+            flush_interval=db_config.get("write_flush_interval", 0.0),
+            timeout=self.timeout
+        )
     
     def init_database(self):
         """データベース初期化"""
         import os
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            # 読み込みと書き込みを並行できるよう WAL モードにする（DBファイルに記録される）
+            conn.execute("PRAGMA journal_mode = WAL")
             cursor = conn.cursor()
             
             # 分析対象URLテーブル
@@ -57,13 +501,226 @@ class AnalysisDatabase:
                 )
             """)
             
+            # マイグレーション履歴テーブル
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
             conn.commit()
+            
+            self.migrate(conn)
+            self.sync_keyword_totals(
+                conn, config.get("analysis", {}).get("min_keyword_frequency", 0.01)
+            )
     
+    def sync_keyword_totals(self, conn: sqlite3.Connection, min_frequency: float) -> bool:
+        """keyword_totals の閾値を設定値に合わせる（変わっていれば作り直す）
+        
+        Returns:
+            作り直した場合 True
+        """
+        row = conn.execute("SELECT min_frequency FROM keyword_totals_meta").fetchone()
+        if row is None or row[0] == min_frequency:
+            return False
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute("UPDATE keyword_totals_meta SET min_frequency = ?", (min_frequency,))
+            for statement in REBUILD_KEYWORD_TOTALS_SQL:
+                conn.execute(statement)
+        return True
+    
+    def get_schema_version(self, conn: sqlite3.Connection) -> int:
+        """適用済みの最新マイグレーションバージョン"""
+        row = conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()
+        return row[0] or 0
+    
+    def migrate(self, conn: sqlite3.Connection = None) -> List[int]:
+        """未適用のマイグレーションを順に適用する
+        
+        Returns:
+            今回適用したバージョンのリスト
+        """
+        if conn is None:
+            with closing(sqlite3.connect(self.db_path)) as own_conn:
+                return self.migrate(own_conn)
+        
+        done = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+        applied = []
+        for version, name, steps in MIGRATIONS:
+            if version in done:
+                continue
+            # 1マイグレーション = 1トランザクション
+            with conn:
+                conn.execute("BEGIN")
+                if callable(steps):
+                    if not steps(conn):
+                        # 前提条件を満たさないため記録せず、次回起動時に再判定する
+                        continue
+                else:
+                    for statement in steps:
+                        conn.execute(statement)
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (?, ?)",
+                    (version, name)
+                )
+            applied.append(version)
+        return applied
+    
+    @contextmanager
     def get_connection(self):
-        """データベース接続取得"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        """プールから接続を取得（ブロック終了時にコミットして返却）"""
+        conn = self.pool.acquire()
+        try:
+            with conn:  # 正常終了でコミット、例外でロールバック
+                yield conn
+        finally:
+            self.pool.release(conn)
+    
+    def upsert_url(self, conn: sqlite3.Connection, url: str, title: str,
+                   content: str, content_hash: str) -> int:
+        """URLを保存して id を返す（内容が同じなら行を書き換えない）"""
+        row = conn.execute(UPSERT_URL_SQL, (url, title, content, content_hash)).fetchone()
+        if row is None:
+            # 変更なしで更新されなかった場合は RETURNING が返らない
+            row = conn.execute("SELECT id FROM urls WHERE url = ?", (url,)).fetchone()
+        return row[0]
+    
+    def create_job(self, kind: str, urls: List[str], params: Dict = None) -> int:
+        """ジョブを登録して id を返す（各URLは pending の項目になる）"""
+        def store(conn):
+            job_id = conn.execute("""
+                INSERT INTO jobs (kind, params, total_items, created_at)
+                VALUES (?, ?, ?, ?)
+            """, (kind, json.dumps(params or {}), len(urls), time.time())).lastrowid
+            conn.executemany(
+                "INSERT INTO job_items (job_id, seq, url) VALUES (?, ?, ?)",
+                [(job_id, seq, url) for seq, url in enumerate(urls)]
+            )
+            if not urls:
+                conn.execute(
+                    "UPDATE jobs SET status = 'completed', started_at = created_at, "
+                    "finished_at = created_at WHERE id = ?", (job_id,)
+                )
+            return job_id
+        return self.write(store)
+    
+    def claim_job_item(self) -> Optional[Dict]:
+        """最も古い pending の項目を running にして返す（無ければ None）"""
+        def claim(conn):
+            row = conn.execute("""
+                SELECT job_id, seq, url FROM job_items
+                WHERE status = 'pending'
+                ORDER BY job_id, seq LIMIT 1
+            """).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            conn.execute("""
+                UPDATE job_items SET status = 'running', attempts = attempts + 1, started_at = ?
+                WHERE job_id = ? AND seq = ?
+            """, (now, row["job_id"], row["seq"]))
+            conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?) "
+                "WHERE id = ?", (now, row["job_id"])
+            )
+            return dict(row)
+        return self.write(claim)
+    
+    def complete_job_item(self, job_id: int, seq: int, result: Dict):
+        """項目の結果を保存し、全項目が終わったらジョブを completed にする"""
+        def store(conn):
+            now = time.time()
+            conn.execute("""
+                UPDATE job_items SET status = ?, result = ?, finished_at = ?
+                WHERE job_id = ? AND seq = ?
+            """, ("done" if result.get("success") else "failed", json.dumps(result),
+                  now, job_id, seq))
+            conn.execute("""
+                UPDATE jobs SET status = 'completed', finished_at = ?
+                WHERE id = ? AND NOT EXISTS (
+                    SELECT 1 FROM job_items
+                    WHERE job_id = ? AND status IN ('pending', 'running')
+                )
+            """, (now, job_id, job_id))
+        self.write(store)
+    
+    def requeue_running_job_items(self) -> int:
+        """処理中のまま停止した項目を pending に戻す（起動時に呼び出す）"""
+        return self.write(lambda conn: conn.execute(
+            "UPDATE job_items SET status = 'pending' WHERE status = 'running'"
+        ).rowcount)
+    
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        """ジョブの状態と進み具合・処理速度"""
+        with self.get_connection() as conn:
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(conn.execute("""
+                SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status
+            """, (job_id,)).fetchall())
+            item_seconds = conn.execute("""
+                SELECT AVG(finished_at - started_at) FROM job_items
+                WHERE job_id = ? AND finished_at IS NOT NULL
+            """, (job_id,)).fetchone()[0]
+        
+        job = dict(job)
+        job["params"] = json.loads(job["params"])
+        finished = counts.get("done", 0) + counts.get("failed", 0)
+        remaining = job["total_items"] - finished
+        elapsed = ((job["finished_at"] or time.time()) - job["started_at"]
+                   if job["started_at"] else 0.0)
+        rate = finished / elapsed if elapsed > 0 else 0.0
+        job.update({
+            "pending_items": counts.get("pending", 0),
+            "running_items": counts.get("running", 0),
+            "done_items": counts.get("done", 0),
+            "failed_items": counts.get("failed", 0),
+            "elapsed_seconds": round(elapsed, 3),
+            "items_per_second": round(rate, 3),
+            "avg_item_seconds": round(item_seconds, 3) if item_seconds is not None else None,
+            "eta_seconds": round(remaining / rate, 1) if rate > 0 and remaining else None
+        })
+        return job
+    
+    def write(self, job: Callable[[sqlite3.Connection], Any]) -> Any:
+        """書き込み処理をバッチライターで実行し、コミット後の結果を返す"""
+        return self.writer.write(job)
+    
+    def close(self):
+        """未コミットの書き込みを反映し、接続をすべて閉じる"""
+        self.writer.close()
+        self.pool.close_all()
+
+class LazyDatabase:
+    """最初に使われたときにデータベースを開くプロキシ
+    
+    import しただけではDBファイルの作成・マイグレーション・ライタースレッドの起動を
+    行わないため、テストがサーバーを import しても data/analysis.db には触れない。
+    """
+    def __init__(self, factory: Callable[[], AnalysisDatabase]):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+    
+    def _get(self) -> AnalysisDatabase:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+    
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+    
+    def close(self):
+        """開いていれば閉じる"""
+        if self._instance is not None:
+            self._instance.close()
 
-# グローバルインスタンス
-db = AnalysisDatabase() 
\ No newline at end of file
+# グローバルインスタンス（最初に使われたときに開く）
+db = LazyDatabase(AnalysisDatabase)
@@ -0,0 +1,121 @@
+"""
+RSS / Atom フィード取得モジュール
+（条件付きリクエストに対応。ローカルのフィードファイルも読み込める）
+"""
+import hashlib
+import os
+import time
+from email.utils import formatdate
+from typing import Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+import requests
+
+from web_scraper import READ_CHUNK_SIZE, WebScraper, conditional_headers, scraper
+
+try:
+    import feedparser
+    FEEDPARSER_AVAILABLE = True
+except ImportError:
+    FEEDPARSER_AVAILABLE = False
+
+def local_feed_path(feed_url: str) -> Optional[str]:
+    """ローカルファイルを指す場合はそのパス（file:// またはファイルパス）"""
+    parsed = urlparse(feed_url)
+    if parsed.scheme == "file":
+        return unquote(parsed.path)
+    if parsed.scheme in ("http", "https"):
+        return None
+    return feed_url
+
+def parse_entries(feed) -> List[Dict]:
+    """feedparser の結果から、分析に必要な項目だけを取り出す"""
+    entries = []
+    for entry in feed.entries:
+        link = entry.get("link")
+        if not link:
+            continue
+        entries.append({
+            "id": entry.get("id") or link,  # GUID が無いフィードはリンクで代用
+            "link": link,
+            "title": entry.get("title", "No Title"),
+            "published": entry.get("published")
+        })
+    return entries
+
+def _read_body(feed_url: str, etag: Optional[str], last_modified: Optional[str],
+               client: WebScraper) -> Dict:
+    """フィード本文を取得（変更が無ければ not_modified）"""
+    path = local_feed_path(feed_url)
+    if path is not None:
+        # ローカルファイルは更新日時を Last-Modified として扱う
+        mtime = formatdate(os.path.getmtime(path), usegmt=True)
+        if last_modified == mtime:
+            return {"not_modified": True, "etag": etag, "last_modified": mtime}
+        with open(path, "rb") as f:
+            body = f.read(client.max_download_bytes)
+        return {"body": body, "etag": None, "last_modified": mtime}
+
+    with client.session.get(
+        feed_url, timeout=client.timeout, stream=True,
+        headers=conditional_headers(etag, last_modified)
+    ) as response:
+        if response.status_code == 304:
+            return {"not_modified": True, "etag": etag, "last_modified": last_modified}
+        response.raise_for_status()
+        chunks = []
+        size = 0
+        for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= client.max_download_bytes:
+                break
+        return {
+            "body": b"".join(chunks),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified")
+        }
+
+def fetch_feed(feed_url: str, etag: Optional[str] = None,
+               last_modified: Optional[str] = None,
+               client: WebScraper = scraper) -> Dict:
+    """フィードを取得して記事一覧を返す
+
+    etag / last_modified を渡すと条件付きリクエストを送り、
+    304 の場合は記事一覧を解析せず not_modified を返す。
+    """
+    if not FEEDPARSER_AVAILABLE:
+        return {
+            "success": False,
+            "error": "feedparser module not installed. Run: pip install feedparser"
+        }
+
+    try:
+        fetched = _read_body(feed_url, etag, last_modified, client)
+    except (requests.exceptions.RequestException, OSError) as e:
+        return {"success": False, "error": f"Feed fetch error: {str(e)}"}
+
+    if fetched.get("not_modified"):
+        return {
+            "success": True,
+            "not_modified": True,
+            "etag": fetched["etag"],
+            "last_modified": fetched["last_modified"],
+            "fetched_at": time.time()
+        }
+
+    body = fetched["body"]
+    feed = feedparser.parse(body)
+    if feed.bozo and not feed.entries:
+        return {"success": False, "error": "Invalid RSS feed or parsing error"}
+
+    return {
+        "success": True,
+        "feed_title": feed.feed.get("title", "Unknown Feed"),
+        "entries": parse_entries(feed),
+        "etag": fetched["etag"],
+        "last_modified": fetched["last_modified"],
+        "content_hash": hashlib.sha256(body).hexdigest(),
+        "content_bytes": len(body),
+        "fetched_at": time.time()
+    }
@@ -0,0 +1,259 @@
+"""
+フィード購読スケジューラー
+（購読中のフィードを定期的に取得し、未処理の記事だけを分析する）
+"""
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from database import AnalysisDatabase
+
+class FeedScheduler:
+    """購読フィードの定期取得と、新着記事の分析キュー
+
+    使い方:
+        scheduler = FeedScheduler(db, fetch=get_feed, analyze=analyze_url)
+        scheduler.subscribe("https://example.com/rss")
+        await scheduler.start()  # サーバー起動時
+        ...
+        await scheduler.stop()  # サーバー終了時
+
+    取得間隔には ±jitter の揺らぎを加え、多数の購読が同時に取得されないようにする。
+    記事はキューに入れる時点で feed_seen_items に GUID で登録するので、二度分析しない。
+    分析が終わらないまま停止した記事は、次回の起動時にキューへ戻して再開する。
+    """
+
+    def __init__(self, database: AnalysisDatabase,
+                 fetch: Callable[[str], Dict],
+                 analyze: Callable[[str], Awaitable[Dict]],
+                 default_interval: float = 900, jitter: float = 0.1,
+                 tick: float = 5.0, workers: int = 4, max_items: int = 20):
+        self.db = database
+        self.fetch = fetch  # フィードURL → {"success", "entries", ...}（同期関数）
+        self.analyze = analyze  # 記事URL → 分析結果（コルーチン）
+        self.default_interval = default_interval
+        self.jitter = jitter
+        self.tick = tick
+        self.workers = max(1, workers)
+        self.max_items = max_items
+        self.random = random.Random()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._pending: Dict[tuple, float] = {}  # (購読ID, GUID) → キューに入れた時刻
+        self.stats = {"polls": 0, "poll_errors": 0, "enqueued": 0, "analyzed": 0, "failed": 0}
+
+    def next_poll_time(self, interval: float, now: Optional[float] = None) -> float:
+        """次回の取得時刻（間隔に ±jitter の揺らぎを加える）"""
+        now = time.time() if now is None else now
+        return now + interval * (1 + self.random.uniform(-self.jitter, self.jitter))
+
+    def subscribe(self, feed_url: str, interval_seconds: Optional[float] = None,
+                  max_items: Optional[int] = None) -> Dict:
+        """フィードを購読（登録済みなら設定を更新）。次の巡回ですぐに取得する"""
+        interval = interval_seconds or self.default_interval
+        max_items = max_items or self.max_items
+
+        def store(conn):
+            conn.execute("""
+                INSERT INTO feed_subscriptions (feed_url, interval_seconds, max_items, next_poll_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(feed_url) DO UPDATE SET
+                    interval_seconds = excluded.interval_seconds,
+                    max_items = excluded.max_items,
+                    enabled = 1,
+                    next_poll_at = excluded.next_poll_at
+            """, (feed_url, interval, max_items, time.time()))
+            row = conn.execute(
+                "SELECT * FROM feed_subscriptions WHERE feed_url = ?", (feed_url,)
+            ).fetchone()
+            return dict(row)
+
+        return self.db.write(store)
+
+    def unsubscribe(self, feed_url: str) -> bool:
+        """購読を解除（処理済み記事の記録も削除）"""
+        def delete(conn):
+            row = conn.execute(
+                "SELECT id FROM feed_subscriptions WHERE feed_url = ?", (feed_url,)
+            ).fetchone()
+            if row is None:
+                return False
+            conn.execute("DELETE FROM feed_seen_items WHERE subscription_id = ?", (row["id"],))
+            conn.execute("DELETE FROM feed_subscriptions WHERE id = ?", (row["id"],))
+            return True
+
+        return self.db.write(delete)
+
+    async def start(self):
+        """分析ワーカーと巡回ループを開始"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        # 前回の終了時に処理中だった記事から再開する
+        for item in await asyncio.to_thread(self._unfinished_items):
+            entry = {"id": item["guid"], "link": item["link"]}
+            self._enqueue(item["subscription_id"], entry, item["enqueued_at"])
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._run()))
+
+    async def stop(self):
+        """巡回と分析を止める（未処理の記事は次回の起動時に再びキューに入る）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        self._pending.clear()
+
+    async def drain(self):
+        """キューの記事がすべて処理されるまで待つ"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll_due()
+            except Exception:
+                # DBエラー等でも巡回は止めない（次の周期で再試行）
+                self.stats["poll_errors"] += 1
+            await asyncio.sleep(self.tick)
+
+    async def poll_due(self) -> int:
+        """取得時刻を過ぎた購読をすべて取得し、キューに入れた記事数を返す"""
+        subscriptions = await asyncio.to_thread(self._due_subscriptions)
+        counts = await asyncio.gather(*(self._poll(sub) for sub in subscriptions))
+        return sum(counts)
+
+    def _due_subscriptions(self) -> List[Dict]:
+        """取得時刻を過ぎた購読（取得予定の古い順）"""
+        with self.db.get_connection() as conn:
+            return [dict(row) for row in conn.execute("""
+                SELECT * FROM feed_subscriptions
+                WHERE enabled = 1 AND next_poll_at <= ?
+                ORDER BY next_poll_at
+            """, (time.time(),))]
+
+    async def _poll(self, subscription: Dict) -> int:
+        """1つのフィードを取得し、未処理の記事をキューに入れる"""
+        feed = await asyncio.to_thread(self.fetch, subscription["feed_url"])
+        now = time.time()
+        error = None if feed["success"] else feed["error"]
+        self.stats["polls"] += 1
+        if error:
+            self.stats["poll_errors"] += 1
+
+        entries = feed.get("entries", [])[:subscription["max_items"]] if not error else []
+
+        def claim(conn) -> List[Dict]:
+            # 取得結果の記録と新着記事の登録を1トランザクションで行う
+            # （登録済みの GUID は INSERT OR IGNORE で弾かれるので、二重に分析しない）
+            conn.execute("""
+                UPDATE feed_subscriptions
+                SET last_polled_at = ?, last_error = ?, next_poll_at = ?
+                WHERE id = ?
+            """, (now, error, self.next_poll_time(subscription["interval_seconds"], now),
+                  subscription["id"]))
+            new_entries = []
+            for entry in entries:
+                cursor = conn.execute("""
+                    INSERT OR IGNORE INTO feed_seen_items (subscription_id, guid, link, enqueued_at)
+                    VALUES (?, ?, ?, ?)
+                """, (subscription["id"], entry["id"], entry["link"], now))
+                if cursor.rowcount:
+                    new_entries.append(entry)
+            return new_entries
+
+        new_entries = await asyncio.to_thread(self.db.write, claim)
+        for entry in new_entries:
+            self._enqueue(subscription["id"], entry, now)
+        return len(new_entries)
+
+    def _enqueue(self, subscription_id: int, entry: Dict, enqueued_at: float):
+        key = (subscription_id, entry["id"])
+        self._pending[key] = enqueued_at
+        self._queue.put_nowait((key, entry))
+        self.stats["enqueued"] += 1
+
+    def _unfinished_items(self) -> List[Dict]:
+        """登録済みで分析が終わっていない記事（前回の終了時に処理中だったもの）"""
+        with self.db.get_connection() as conn:
+            return [dict(row) for row in conn.execute("""
+                SELECT i.subscription_id, i.guid, i.link, i.enqueued_at
+                FROM feed_seen_items i
+                JOIN feed_subscriptions s ON s.id = i.subscription_id
+                WHERE i.analyzed_at IS NULL AND s.enabled = 1
+                ORDER BY i.enqueued_at
+            """)]
+
+    async def _worker(self):
+        while True:
+            key, entry = await self._queue.get()
+            try:
+                result = await self.analyze(entry["link"])
+                if result.get("success"):
+                    self.stats["analyzed"] += 1
+                else:
+                    self.stats["failed"] += 1
+                await asyncio.to_thread(self._mark_done, key, entry, result)
+            except Exception:
+                # 記録に失敗した記事は未処理のまま残り、次回の起動時に再開する
+                self.stats["failed"] += 1
+            finally:
+                self._pending.pop(key, None)
+                self._queue.task_done()
+
+    def _mark_done(self, key: tuple, entry: Dict, result: Dict):
+        subscription_id, guid = key
+        self.db.write(lambda conn: conn.execute("""
+            UPDATE feed_seen_items
+            SET analysis_id = ?, error = ?, analyzed_at = ?
+            WHERE subscription_id = ? AND guid = ?
+        """, (
+            result.get("analysis_id"),
+            None if result.get("success") else result.get("error"),
+            time.time(), subscription_id, guid
+        )))
+
+    def status(self, window_seconds: float = 600) -> Dict:
+        """キューの長さ・遅延・処理速度と購読ごとの状態"""
+        now = time.time()
+        with self.db.get_connection() as conn:
+            recent = conn.execute(
+                "SELECT COUNT(*) FROM feed_seen_items WHERE analyzed_at >= ?",
+                (now - window_seconds,)
+            ).fetchone()[0]
+            subscriptions = [dict(row) for row in conn.execute("""
+                SELECT s.id, s.feed_url, s.interval_seconds, s.max_items, s.enabled,
+                       s.next_poll_at, s.last_polled_at, s.last_error,
+                       COUNT(i.guid) AS seen_items,
+                       SUM(i.analyzed_at IS NULL) AS unfinished_items,
+                       SUM(i.error IS NOT NULL) AS failed_items
+                FROM feed_subscriptions s
+                LEFT JOIN feed_seen_items i ON i.subscription_id = s.id
+                GROUP BY s.id
+                ORDER BY s.next_poll_at
+            """)]
+
+        for sub in subscriptions:
+            sub["unfinished_items"] = sub["unfinished_items"] or 0
+            sub["failed_items"] = sub["failed_items"] or 0
+            # 取得時刻を過ぎても取得されていない秒数
+            overdue = now - sub["next_poll_at"] if sub["enabled"] else 0.0
+            sub["poll_lag_seconds"] = round(max(0.0, overdue), 3)
+        # 別スレッドから呼ばれてもよいように、処理中の記事はコピーしてから数える
+        pending = list(self._pending.values())
+        queue = self._queue
+        queue_depth = queue.qsize() if queue is not None else 0
+        oldest = min(pending, default=None)
+        return {
+            "running": bool(self._tasks),
+            "queue_depth": queue_depth,
+            "in_progress": len(pending) - queue_depth,
+            # キュー内で最も古い記事の待ち時間
+            "lag_seconds": round(now - oldest, 3) if oldest is not None else 0.0,
+            "items_per_minute": round(recent / (window_seconds / 60), 2),
+            "stats": dict(self.stats),
+            "subscriptions": subscriptions
+        }
@@ -0,0 +1,259 @@
+"""
+HTML本文抽出モジュール
+（パーサーバックエンドを差し替え可能。feed() で分割して渡すこともできる）
+"""
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# 本文から除外する要素
+SKIP_TAGS = ("script", "style", "nav", "footer", "header")
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.I)
+
+def sniff_encoding(head: bytes, default: str = "utf-8") -> str:
+    """先頭バイト列（BOM / meta charset）から文字コードを推定"""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    match = _META_CHARSET.search(head[:4096])
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return default
+
+class BaseExtractor:
+    """本文抽出の共通インターフェース
+
+    使い方:
+        extractor = StreamingExtractor(max_content_length=5000)
+        extractor.feed(chunk)  # 何度でも
+        result = extractor.close()  # {"title", "content", "content_length"}
+
+    done が True になったら、それ以上 feed する必要はない。
+    """
+    name = "base"
+
+    def __init__(self, max_content_length: int = 5000, encoding: Optional[str] = None):
+        self.max_content_length = max_content_length
+        self.encoding = encoding
+        self.done = False
+        self._decoder = None
+
+    def _decode(self, data: bytes, final: bool = False) -> str:
+        if self._decoder is None:
+            encoding = self.encoding or sniff_encoding(data)
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        return self._decoder.decode(data, final)
+
+    def feed(self, data: bytes):
+        """HTMLの一部を渡す"""
+        if not self.done:
+            self._feed_text(self._decode(data))
+
+    def close(self) -> Dict:
+        """抽出結果を返す"""
+        if self._decoder is not None and not self.done:
+            self._feed_text(self._decode(b"", final=True))
+        return self._finish()
+
+    def extract(self, html: bytes, chunk_size: int = 65536) -> Dict:
+        """HTML全体から抽出（done になった時点で残りは読まない）"""
+        for start in range(0, len(html), chunk_size):
+            if self.done:
+                break
+            self.feed(html[start:start + chunk_size])
+        return self.close()
+
+    def _feed_text(self, text: str):
+        raise NotImplementedError
+
+    def _finish(self) -> Dict:
+        raise NotImplementedError
+
+class _TextCollector(BaseExtractor):
+    """開始タグ・終了タグ・テキストのイベントから本文を組み立てる共通処理
+
+    除外要素の中身は読み飛ばし、本文が max_content_length に達したら done にする。
+    """
+
+    def __init__(self, max_content_length: int = 5000, encoding: Optional[str] = None):
+        super().__init__(max_content_length, encoding)
+        self._skip_depth = 0
+        self._in_title = False
+        self._title = []
+        self._words = []
+        self._length = 0
+        self._pending_space = False
+
+    def _start(self, tag: str):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+
+    def _end(self, tag: str):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "title":
+            self._in_title = False
+
+    def _data(self, data: str):
+        if self._skip_depth or self.done:
+            return
+        if self._in_title:
+            self._title.append(data)
+
+        # ' '.join(text.split()) と同じ結果になるよう単語単位で追加
+        words = data.split()
+        if not words:
+            if data:
+                self._pending_space = True
+            return
+        if data[0].isspace():
+            self._pending_space = True
+        if self._words and not self._pending_space:
+            # 空白を挟まずに続くテキストは直前の単語とつなげる
+            self._words[-1] += words[0]
+            self._length += len(words[0])
+            words = words[1:]
+        for word in words:
+            if self._words:
+                self._length += 1
+            self._words.append(word)
+            self._length += len(word)
+        self._pending_space = data[-1].isspace()
+        if self._length >= self.max_content_length:
+            self.done = True
+
+    def _result(self) -> Dict:
+        title = "".join(self._title).strip()
+        content = " ".join(self._words)
+        return {
+            "title": title or "No Title",
+            "content": content[:self.max_content_length],
+            "content_length": len(content),  # done の場合は打ち切った時点までの長さ
+            "truncated": self.done
+        }
+
+class StreamingExtractor(_TextCollector, HTMLParser):
+    """標準ライブラリの HTMLParser による逐次抽出（追加パッケージ不要）"""
+    name = "stream"
+
+    def __init__(self, max_content_length: int = 5000, encoding: Optional[str] = None):
+        _TextCollector.__init__(self, max_content_length, encoding)
+        HTMLParser.__init__(self, convert_charrefs=True)
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # <nav/> のような空要素は中身が無いので何もしない
+        pass
+
+    def handle_endtag(self, tag):
+        self._end(tag)
+
+    def handle_data(self, data):
+        self._data(data)
+
+    def _feed_text(self, text: str):
+        HTMLParser.feed(self, text)
+
+    def _finish(self) -> Dict:
+        if not self.done:
+            HTMLParser.close(self)
+        return self._result()
+
+class LxmlExtractor(_TextCollector):
+    """lxml（libxml2）の逐次パーサーによる抽出
+
+    木は作らず、パーサーからのイベントを直接受け取る（parser target）。
+    """
+    name = "lxml"
+
+    def __init__(self, max_content_length: int = 5000, encoding: Optional[str] = None):
+        super().__init__(max_content_length, encoding)
+        self._parser = etree.HTMLParser(target=self)
+
+    # parser target のコールバック
+    def start(self, tag, attrib):
+        self._start(tag)
+
+    def end(self, tag):
+        self._end(tag)
+
+    def data(self, data):
+        self._data(data)
+
+    def _feed_text(self, text: str):
+        if text:
+            self._parser.feed(text)
+
+    def _finish(self) -> Dict:
+        if not self.done:
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                # 空の文書など（それまでに得た本文を返す）
+                pass
+        return self._result()
+
+class SoupExtractor(BaseExtractor):
+    """BeautifulSoup（html.parser）による従来の抽出（フォールバック用）"""
+    name = "soup"
+
+    def __init__(self, max_content_length: int = 5000, encoding: Optional[str] = None):
+        super().__init__(max_content_length, encoding)
+        self._chunks: List[bytes] = []
+
+    def feed(self, data: bytes):
+        # 文字コードの判定は BeautifulSoup に任せるためバイト列のまま保持
+        self._chunks.append(data)
+
+    def close(self) -> Dict:
+        soup = BeautifulSoup(b"".join(self._chunks), 'html.parser',
+                             from_encoding=self.encoding)
+
+        # タイトル取得
+        title = soup.find('title')
+        title_text = title.get_text().strip() if title else "No Title"
+
+        # 本文取得（基本的なクリーニング）
+        for script in soup(list(SKIP_TAGS)):
+            script.decompose()
+
+        content = soup.get_text()
+        content = ' '.join(content.split())  # 余分な空白を削除
+        return {
+            "title": title_text,
+            "content": content[:self.max_content_length],
+            "content_length": len(content),
+            "truncated": len(content) > self.max_content_length
+        }
+
+EXTRACTORS = {
+    "stream": StreamingExtractor,
+    "soup": SoupExtractor,
+}
+if LXML_AVAILABLE:
+    EXTRACTORS["lxml"] = LxmlExtractor
+
+def create_extractor(parser: str = "auto", max_content_length: int = 5000,
+                     encoding: Optional[str] = None) -> BaseExtractor:
+    """設定名から抽出器を作成（"auto" は lxml があれば lxml、無ければ標準ライブラリ）"""
+    if parser == "auto":
+        parser = "lxml" if LXML_AVAILABLE else "stream"
+    if parser not in EXTRACTORS:
+        raise ValueError(f"Unknown parser: {parser}（利用可能: {', '.join(EXTRACTORS)}）")
+    return EXTRACTORS[parser](max_content_length=max_content_length, encoding=encoding)
@@ -0,0 +1,84 @@
+"""
+バックグラウンドジョブのワーカー
+（ジョブは AnalysisDatabase の jobs / job_items テーブルに保存し、複数スレッドで処理する）
+"""
+import threading
+from typing import Callable, Dict, List
+
+from database import AnalysisDatabase
+
+class JobWorkers:
+    """job_items の pending 項目を取り出して処理するワーカースレッド群
+
+    使い方:
+        workers = JobWorkers(db, process=scrape_and_analyze_blocking, workers=4)
+        workers.start()  # サーバー起動時（前回処理中だった項目から再開）
+        job_id = workers.submit("batch", urls)
+        ...
+        workers.stop()  # サーバー終了時
+
+    項目の状態はDBにあるので、途中で停止しても次回の start() で続きから処理する。
+    """
+
+    def __init__(self, database: AnalysisDatabase, process: Callable[[str], Dict],
+                 workers: int = 4, idle_wait: float = 1.0):
+        self.db = database
+        self.process = process  # URL → 分析結果（ブロッキング関数）
+        self.workers = max(1, workers)
+        self.idle_wait = idle_wait
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def submit(self, kind: str, urls: List[str], params: Dict = None) -> int:
+        """ジョブを登録してワーカーを起こす"""
+        job_id = self.db.create_job(kind, urls, params)
+        self._wakeup.set()
+        return job_id
+
+    def start(self) -> int:
+        """ワーカーを開始し、前回処理中のまま停止した項目数を返す"""
+        if self._threads:
+            return 0
+        requeued = self.db.requeue_running_job_items()
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"job-worker-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return requeued
+
+    def stop(self, timeout: float = None):
+        """処理中の項目が終わるのを待ってワーカーを止める"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._threads)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                item = self.db.claim_job_item()
+            except Exception:
+                item = None
+            if item is None:
+                # 新しいジョブが来るか idle_wait 秒経つまで待つ
+                self._wakeup.wait(self.idle_wait)
+                self._wakeup.clear()
+                continue
+            try:
+                result = self.process(item["url"])
+            except Exception as e:
+                result = {"success": False, "error": str(e), "stage": "processing"}
+            try:
+                self.db.complete_job_item(item["job_id"], item["seq"], result)
+            except Exception:
+                # 保存できなかった項目は running のまま残り、次回の起動時に再処理する
+                pass
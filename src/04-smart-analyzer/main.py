@@ -2,70 +2,234 @@
 スマート情報収集&分析システム
 FastMCPサーバー
 """
-from fastmcp import FastMCP
-from database import db
-from web_scraper import scraper
-from text_analyzer import analyzer
+from fastmcp import Context, FastMCP
+from database import LISTED_ANALYSES_SQL, db
+from feed_reader import fetch_feed
+from feed_scheduler import FeedScheduler
+from job_queue import JobWorkers
+from web_scraper import async_scraper, rate_limiter, scraper
+from text_analyzer import analysis_pool
+from settings import config
+from contextlib import asynccontextmanager
+import asyncio
+import base64
+import hashlib
 import json
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-app = FastMCP("Smart Information Analyzer")
+@asynccontextmanager
+async def lifespan(server):
+    """起動時に分析ワーカー・フィード巡回・ジョブワーカーを準備し、終了時にそれぞれ閉じる"""
+    await asyncio.to_thread(analysis_pool.warm_up)
+    if feeds_config.get("scheduler_enabled", True):
+        await feed_scheduler.start()
+    if jobs_config.get("enabled", True):
+        await asyncio.to_thread(job_workers.start)
+    try:
+        yield
+    finally:
+        await asyncio.to_thread(job_workers.stop)
+        await feed_scheduler.stop()
+        await async_scraper.close()
+        await asyncio.to_thread(analysis_pool.close)
+        await asyncio.to_thread(db.close)
+
+app = FastMCP("Smart Information Analyzer", lifespan=lifespan)
 
 
 
-def _internal_scrape_and_analyze(url: str) -> Dict:
+async def _internal_scrape_and_analyze(url: str) -> Dict:
     """内部用のスクレイピング＆分析関数（ツール間で共有）"""
     try:
-        # 1. Web情報収集
-        scrape_result = scraper.scrape_url(url)
-        
-        if not scrape_result["success"]:
-            return {
-                "success": False,
-                "error": scrape_result["error"],
-                "stage": "scraping"
-            }
+        # 1. Web情報収集（前回の ETag / Last-Modified で条件付きリクエスト）
+        cached = await asyncio.to_thread(_get_http_cache, url)
+        scrape_result = await async_scraper.scrape_url(
+            url,
+            etag=cached["etag"] if cached else None,
+            last_modified=cached["last_modified"] if cached else None
+        )
+        # 2〜4. 分析とDB保存はブロッキング処理なのでスレッドで実行
+        return await asyncio.to_thread(_store_scrape_result, url, cached, scrape_result)
+    
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "stage": "processing"
+        }
+
+def _scrape_and_analyze_blocking(url: str) -> Dict:
+    """_internal_scrape_and_analyze のスレッド用（ジョブワーカーから呼び出す）"""
+    try:
+        rate_limiter.acquire(url)
+        cached = _get_http_cache(url)
+        scrape_result = scraper.scrape_url(
+            url,
+            etag=cached["etag"] if cached else None,
+            last_modified=cached["last_modified"] if cached else None
+        )
+        return _store_scrape_result(url, cached, scrape_result)
+    
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "stage": "processing"
+        }
+
+def _store_scrape_result(url: str, cached: Optional[Dict], scrape_result: Dict) -> Dict:
+    """取得結果を分析・保存する（未更新なら前回の結果を返す）"""
+    if not scrape_result["success"]:
+        return {
+            "success": False,
+            "error": scrape_result["error"],
+            "stage": "scraping"
+        }
+    
+    # 304 または本文が前回と同一なら、解析・分析を省略して前回の結果を返す
+    if cached and (scrape_result.get("not_modified")
+                   or scrape_result["content_hash"] == cached["content_hash"]):
+        return _reuse_http_cache(url, cached, scrape_result)
+    
+    return _analyze_and_store(url, scrape_result)
+
+def _get_http_cache(url: str) -> Optional[Dict]:
+    """URLのHTTPキャッシュ情報（参照先の分析結果が残っている場合のみ）"""
+    with db.get_connection() as conn:
+        row = conn.execute("""
+            SELECT c.* FROM http_cache c
+            JOIN analyses a ON a.id = c.analysis_id
+            WHERE c.url = ?
+        """, (url,)).fetchone()
+        return dict(row) if row else None
+
+def _reuse_http_cache(url: str, cached: Dict, scrape_result: Dict) -> Dict:
+    """キャッシュ済みの分析結果を返し、ヒット数と節約バイト数を記録
+    
+    本文が同一の 200 応答では、サーバーが付け直した ETag / Last-Modified を保存する
+    （古い値のままだと次回以降の条件付きリクエストが 304 にならない）。
+    """
+    not_modified = bool(scrape_result.get("not_modified"))
+    source = cached if not_modified else scrape_result
+    db.write(lambda conn: conn.execute("""
+            UPDATE http_cache
+            SET requests = requests + 1,
+                hits = hits + 1,
+                not_modified = not_modified + ?,
+                bytes_saved = bytes_saved + ?,
+                etag = ?,
+                last_modified = ?,
+                content_bytes = ?,
+                checked_at = CURRENT_TIMESTAMP
+            WHERE url = ?
+        """, (int(not_modified), cached["content_bytes"] if not_modified else 0,
+              source.get("etag"), source.get("last_modified"), source.get("content_bytes"), url)))
+    
+    result = json.loads(cached["result"])
+    result["http_cache"] = "not_modified" if not_modified else "unchanged"
+    result["analysis_skipped"] = True
+    return result
+
+def _analyze_and_store(url: str, scrape_result: Dict) -> Dict:
+    """取得済みコンテンツを保存・分析する
+    
+    本文のハッシュが過去の分析と一致する場合は analyzer を実行せず結果を再利用する。
+    同じURLで内容も変わっていなければ、urls / analyses への書き込みも省略する。
+    """
+    try:
+        content = scrape_result["content"]
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
         
-        # 2. データベースに保存
         with db.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO urls (url, title, content, status)
-                VALUES (?, ?, ?, 'scraped')
-            """, (url, scrape_result["title"], scrape_result["content"]))
-            url_id = cursor.lastrowid
+            memo = cursor.execute(
+                "SELECT result FROM analysis_cache WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+            previous = cursor.execute("""
+                SELECT u.id AS url_id, MAX(a.id) AS analysis_id
+                FROM urls u JOIN analyses a ON a.url_id = u.id
+                WHERE u.url = ? AND u.content_hash = ?
+                GROUP BY u.id
+            """, (url, content_hash)).fetchone()
         
-        # 3. テキスト分析
-        analysis_result = analyzer.full_analysis(scrape_result["content"])
+        if memo:
+            analysis_result = json.loads(memo["result"])
+        else:
+            # 2. テキスト分析（同一内容の分析結果があれば再利用）
+            # 前回と同じ内容でもメモが無ければ（削除済み・キャッシュ導入前の行など）分析し直す
+            analysis_result = analysis_pool.full_analysis(content)
         
-        # 4. 分析結果を保存
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO analyses (url_id, sentiment_score, sentiment_label, 
-                                    keywords, word_count)
-                VALUES (?, ?, ?, ?, ?)
+        def store(conn) -> Dict:
+            # 3〜4. URL・分析結果・キャッシュ情報を同じトランザクションで保存
+            # （途中で落ちても、URL行の無い分析結果が残ることはない）
+            if memo and previous:
+                # 前回と同一内容: 既存の行をそのまま使う
+                url_id, analysis_id = previous["url_id"], previous["analysis_id"]
+            else:
+                url_id = db.upsert_url(conn, url, scrape_result["title"], content, content_hash)
+                
+                cursor = conn.execute("""
+                    INSERT INTO analyses (url_id, sentiment_score, sentiment_label, 
+                                        keywords, word_count)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (
+                    url_id,
+                    analysis_result["sentiment"]["score"],
+                    analysis_result["sentiment"]["label"],
+                    json.dumps(analysis_result["keywords"]),
+                    analysis_result["statistics"]["word_count"]
+                ))
+                analysis_id = cursor.lastrowid
+                
+                if not memo:
+                    conn.execute("""
+                        INSERT OR IGNORE INTO analysis_cache (content_hash, result)
+                        VALUES (?, ?)
+                    """, (content_hash, json.dumps(analysis_result)))
+            
+            result = {
+                "success": True,
+                "url": url,
+                "title": scrape_result["title"],
+                "content_length": len(content),
+                "sentiment": analysis_result["sentiment"],
+                "top_keywords": analysis_result["keywords"][:5],
+                "statistics": analysis_result["statistics"],
+                "url_id": url_id,
+                "analysis_id": analysis_id,
+                "analysis_skipped": memo is not None
+            }
+            
+            # 次回の条件付きリクエスト用にキャッシュ情報を保存
+            conn.execute("""
+                INSERT INTO http_cache (url, etag, last_modified, content_hash,
+                                        content_bytes, analysis_id, result, requests)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+                ON CONFLICT(url) DO UPDATE SET
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    content_hash = excluded.content_hash,
+                    content_bytes = excluded.content_bytes,
+                    analysis_id = excluded.analysis_id,
+                    result = excluded.result,
+                    requests = requests + 1,
+                    checked_at = CURRENT_TIMESTAMP
             """, (
-                url_id,
-                analysis_result["sentiment"]["score"],
-                analysis_result["sentiment"]["label"],
-                json.dumps(analysis_result["keywords"]),
-                analysis_result["statistics"]["word_count"]
+                url,
+                scrape_result.get("etag"),
+                scrape_result.get("last_modified"),
+                scrape_result.get("content_hash"),
+                scrape_result.get("content_bytes"),
+                analysis_id,
+                json.dumps(result)
             ))
-            analysis_id = cursor.lastrowid
+            return result
         
-        return {
-            "success": True,
-            "url": url,
-            "title": scrape_result["title"],
-            "content_length": len(scrape_result["content"]),
-            "sentiment": analysis_result["sentiment"],
-            "top_keywords": analysis_result["keywords"][:5],
-            "statistics": analysis_result["statistics"],
-            "url_id": url_id,
-            "analysis_id": analysis_id
-        }
+        # 書き込みはバッチライターが他のURLの分とまとめてコミットする
+        result = db.write(store)
+        result["http_cache"] = "miss"
+        return result
     
     except Exception as e:
         return {
@@ -75,7 +239,7 @@ def _internal_scrape_and_analyze(url: str) -> Dict:
         }
 
 @app.tool
-def scrape_and_analyze(url: str) -> Dict:
+async def scrape_and_analyze(url: str) -> Dict:
     """URLを取得して分析する（統合処理）
     
     Args:
@@ -84,24 +248,54 @@ def scrape_and_analyze(url: str) -> Dict:
     Returns:
         スクレイピングと分析の結果
     """
-    return _internal_scrape_and_analyze(url)
+    return await _internal_scrape_and_analyze(url)
+
+async def _analyze_urls_concurrently(urls: List[str], max_concurrency: int) -> List[Dict]:
+    """複数URLを並列に分析（結果は入力順）
+    
+    同時に処理するURL数を max_concurrency に抑え、
+    同じホストへのアクセスは rate_limiter で間隔を空ける。
+    異なるホストへのアクセスは並列に進める。
+    """
+    return await asyncio.gather(*_start_analysis_tasks(urls, max_concurrency))
+
+def _start_analysis_tasks(urls: List[str], max_concurrency: int) -> List[asyncio.Task]:
+    """URLごとの分析タスクを開始（同時実行数とホスト単位の間隔を制限）"""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    
+    async def worker(url: str) -> Dict:
+        async with semaphore:
+            return await _rate_limited_analyze(url)
+    
+    return [asyncio.create_task(worker(url)) for url in urls]
+
+async def _rate_limited_analyze(url: str) -> Dict:
+    """同じホストへの間隔を空けてからスクレイピング＆分析"""
+    await rate_limiter.acquire_async(url)
+    return await _internal_scrape_and_analyze(url)
 
 @app.tool
-def batch_analyze_urls(urls: List[str]) -> Dict:
+async def batch_analyze_urls(urls: List[str], max_concurrency: Optional[int] = None) -> Dict:
     """複数URLを一括分析
     
     Args:
         urls: 分析対象URLのリスト
+        max_concurrency: 同時に処理するURL数（省略時は config.toml の値）
         
     Returns:
-        一括分析の結果
+        一括分析の結果（入力と同じ順序）
     """
+    if max_concurrency is None:
+        max_concurrency = config.get("scraping", {}).get("max_concurrency", 64)
+    
+    start = time.time()
     results = []
     successful = 0
     failed = 0
+    cache_hits = 0
+    skipped_analyses = 0
     
-    for url in urls:
-        result = _internal_scrape_and_analyze(url)
+    for url, result in zip(urls, await _analyze_urls_concurrently(urls, max_concurrency)):
         results.append({
             "url": url,
             "success": result["success"],
@@ -112,46 +306,80 @@ def batch_analyze_urls(urls: List[str]) -> Dict:
             successful += 1
         else:
             failed += 1
-        
-        # レート制限（1秒待機）
-        time.sleep(1)
+        if result.get("http_cache") in ("not_modified", "unchanged"):
+            cache_hits += 1
+        if result.get("analysis_skipped"):
+            skipped_analyses += 1
     
     return {
         "success": True,
         "total_urls": len(urls),
         "successful": successful,
         "failed": failed,
+        "cache_hits": cache_hits,
+        "skipped_analyses": skipped_analyses,
+        "elapsed_seconds": round(time.time() - start, 3),
         "results": results
     }
 
+def encode_cursor(kind: str, values: list) -> str:
+    """ページング用の不透明なカーソル文字列を作成"""
+    payload = json.dumps([kind, *values], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str, kind: str) -> list:
+    """カーソル文字列を検証して値を取り出す"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise ValueError(f"無効なカーソルです: {cursor}")
+    if not isinstance(payload, list) or not payload or payload[0] != kind:
+        raise ValueError(f"このツールでは使用できないカーソルです: {cursor}")
+    return payload[1:]
+
 @app.tool
-def get_analysis_history(limit: int = 10) -> Dict:
+def get_analysis_history(limit: int = 10, cursor: Optional[str] = None) -> Dict:
     """分析履歴を取得
     
     Args:
         limit: 取得する件数
+        cursor: 前回の結果の next_cursor（続きのページを取得）
         
     Returns:
-        分析履歴
+        分析履歴と次ページ用の next_cursor（最終ページならNone）
     """
+    if limit < 1:
+        return {"success": False, "error": f"limit は1以上を指定してください: {limit}"}
     try:
+        where = ""
+        params = []
+        if cursor:
+            # 前ページ最後の (analyzed_at, id) より後ろから読む
+            where = "WHERE (a.analyzed_at, a.id) < (?, ?)"
+            params.extend(decode_cursor(cursor, "history"))
+        
         with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT u.url, u.title, a.sentiment_score, a.sentiment_label,
-                       a.word_count, a.analyzed_at
-                FROM analyses a
-                JOIN urls u ON a.url_id = u.id
-                ORDER BY a.analyzed_at DESC
+            rows = conn.execute(f"""
+                SELECT a.id AS analysis_id, u.url, u.title, a.sentiment_score,
+                       a.sentiment_label, a.word_count, a.analyzed_at
+                FROM {LISTED_ANALYSES_SQL}
+                {where}
+                ORDER BY a.analyzed_at DESC, a.id DESC
                 LIMIT ?
-            """, (limit,))
+            """, (*params, limit + 1)).fetchall()
             
-            history = [dict(row) for row in cursor.fetchall()]
+            rows = [dict(row) for row in rows]
+            history = rows[:limit]
+            next_cursor = None
+            if len(rows) > limit:
+                last = history[-1]
+                next_cursor = encode_cursor("history", [last["analyzed_at"], last["analysis_id"]])
             
             return {
                 "success": True,
                 "history": history,
-                "count": len(history)
+                "count": len(history),
+                "next_cursor": next_cursor
             }
     
     except Exception as e:
@@ -161,34 +389,54 @@ def get_analysis_history(limit: int = 10) -> Dict:
         }
 
 @app.tool
-def search_by_sentiment(sentiment_label: str) -> Dict:
+def search_by_sentiment(sentiment_label: str, limit: int = 50,
+                        cursor: Optional[str] = None) -> Dict:
     """感情ラベルで検索
     
     Args:
         sentiment_label: 感情ラベル（positive/negative/neutral）
+        limit: 取得する件数
+        cursor: 前回の結果の next_cursor（続きのページを取得）
         
     Returns:
-        検索結果
+        検索結果（感情スコアの高い順）と次ページ用の next_cursor
     """
+    if limit < 1:
+        return {"success": False, "error": f"limit は1以上を指定してください: {limit}"}
     try:
+        where = "WHERE a.sentiment_label = ?"
+        params = [sentiment_label]
+        if cursor:
+            # 前ページ最後の (sentiment_score, id) より後ろから読む
+            where += " AND (a.sentiment_score, a.id) < (?, ?)"
+            params.extend(decode_cursor(cursor, f"sentiment:{sentiment_label}"))
+        
         with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT u.url, u.title, a.sentiment_score, a.sentiment_label,
-                       a.word_count, a.analyzed_at
-                FROM analyses a
-                JOIN urls u ON a.url_id = u.id
-                WHERE a.sentiment_label = ?
-                ORDER BY a.sentiment_score DESC
-            """, (sentiment_label,))
+            rows = conn.execute(f"""
+                SELECT a.id AS analysis_id, u.url, u.title, a.sentiment_score,
+                       a.sentiment_label, a.word_count, a.analyzed_at
+                FROM {LISTED_ANALYSES_SQL}
+                {where}
+                ORDER BY a.sentiment_score DESC, a.id DESC
+                LIMIT ?
+            """, (*params, limit + 1)).fetchall()
             
-            results = [dict(row) for row in cursor.fetchall()]
+            rows = [dict(row) for row in rows]
+            results = rows[:limit]
+            next_cursor = None
+            if len(rows) > limit:
+                last = results[-1]
+                next_cursor = encode_cursor(
+                    f"sentiment:{sentiment_label}",
+                    [last["sentiment_score"], last["analysis_id"]]
+                )
             
             return {
                 "success": True,
                 "sentiment_label": sentiment_label,
                 "results": results,
-                "count": len(results)
+                "count": len(results),
+                "next_cursor": next_cursor
             }
     
     except Exception as e:
@@ -198,38 +446,47 @@ def search_by_sentiment(sentiment_label: str) -> Dict:
         }
 
 @app.tool
-def get_keyword_analysis(min_frequency: float = 0.01) -> Dict:
+def get_keyword_analysis(min_frequency: float = 0.01, limit: int = 20) -> Dict:
     """キーワード分析
     
     Args:
         min_frequency: 最小頻度閾値
+        limit: 取得するキーワード数
         
     Returns:
         キーワード分析結果
     """
     try:
-        from collections import Counter
-        
         with db.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT keywords FROM analyses WHERE keywords IS NOT NULL")
+            meta = cursor.execute(
+                "SELECT min_frequency, analyzed_documents FROM keyword_totals_meta"
+            ).fetchone()
             
-            all_keywords = Counter()
-            for row in cursor.fetchall():
-                keywords = json.loads(row["keywords"])
-                for kw in keywords:
-                    if kw["frequency"] >= min_frequency:
-                        all_keywords[kw["word"]] += kw["count"]
+            if meta["min_frequency"] == min_frequency:
+                # 設定された閾値なら累計テーブルから上位N件を読むだけ
+                cursor.execute("""
+                    SELECT word, total_count FROM keyword_totals
+                    ORDER BY total_count DESC, word
+                    LIMIT ?
+                """, (limit,))
+            else:
+                # その他の閾値はキーワード表をインデックスで集計
+                cursor.execute("""
+                    SELECT word, SUM(count) AS total_count
+                    FROM analysis_keywords
+                    WHERE frequency >= ?
+                    GROUP BY word
+                    ORDER BY total_count DESC, word
+                    LIMIT ?
+                """, (min_frequency, limit))
             
-            top_keywords = all_keywords.most_common(20)
+            top_keywords = [dict(row) for row in cursor.fetchall()]
             
             return {
                 "success": True,
-                "top_keywords": [
-                    {"word": word, "total_count": count}
-                    for word, count in top_keywords
-                ],
-                "analyzed_documents": cursor.rowcount
+                "top_keywords": top_keywords,
+                "analyzed_documents": meta["analyzed_documents"]
             }
     
     except Exception as e:
@@ -250,26 +507,26 @@ def generate_summary_report() -> Dict:
             cursor = conn.cursor()
             
             # 全体統計
-            cursor.execute("SELECT COUNT(*) as total FROM analyses")
+            cursor.execute(f"SELECT COUNT(*) as total FROM {LISTED_ANALYSES_SQL}")
             total_analyses = cursor.fetchone()["total"]
             
             # 感情分布
-            cursor.execute("""
-                SELECT sentiment_label, COUNT(*) as count
-                FROM analyses
-                GROUP BY sentiment_label
+            cursor.execute(f"""
+                SELECT a.sentiment_label, COUNT(*) as count
+                FROM {LISTED_ANALYSES_SQL}
+                GROUP BY a.sentiment_label
             """)
             sentiment_dist = {row["sentiment_label"]: row["count"] for row in cursor.fetchall()}
             
             # 平均感情スコア
-            cursor.execute("SELECT AVG(sentiment_score) as avg_score FROM analyses")
+            cursor.execute(f"SELECT AVG(a.sentiment_score) as avg_score FROM {LISTED_ANALYSES_SQL}")
             avg_sentiment = cursor.fetchone()["avg_score"] or 0
             
             # 最近の分析
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT COUNT(*) as recent_count
-                FROM analyses
-                WHERE analyzed_at > datetime('now', '-7 days')
+                FROM {LISTED_ANALYSES_SQL}
+                WHERE a.analyzed_at > datetime('now', '-7 days')
             """)
             recent_analyses = cursor.fetchone()["recent_count"]
             
@@ -303,56 +560,361 @@ def generate_summary_report() -> Dict:
         }
 
 @app.tool
-def analyze_rss_feed(rss_url: str, max_items: int = 10) -> Dict:
+def get_http_cache_stats() -> Dict:
+    """HTTPキャッシュ（条件付きリクエスト）の統計
+    
+    Returns:
+        キャッシュヒット率と節約できた転送バイト数
+    """
+    try:
+        with db.get_connection() as conn:
+            row = conn.execute("""
+                SELECT COUNT(*) AS entries,
+                       COALESCE(SUM(requests), 0) AS requests,
+                       COALESCE(SUM(hits), 0) AS hits,
+                       COALESCE(SUM(not_modified), 0) AS not_modified,
+                       COALESCE(SUM(bytes_saved), 0) AS bytes_saved
+                FROM http_cache
+            """).fetchone()
+            stats = dict(row)
+        
+        stats["hit_ratio"] = round(stats["hits"] / stats["requests"], 3) if stats["requests"] else 0.0
+        return {
+            "success": True,
+            "http_cache": stats
+        }
+    
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+def _get_feed(rss_url: str) -> Dict:
+    """フィードを条件付きで取得し、変更が無ければ前回の記事一覧を使う"""
+    with db.get_connection() as conn:
+        row = conn.execute("SELECT * FROM feed_cache WHERE feed_url = ?", (rss_url,)).fetchone()
+        cached = dict(row) if row else None
+    
+    fetched = fetch_feed(
+        rss_url,
+        etag=cached["etag"] if cached else None,
+        last_modified=cached["last_modified"] if cached else None
+    )
+    if not fetched["success"]:
+        return fetched
+    
+    if cached and (fetched.get("not_modified")
+                   or fetched["content_hash"] == cached["content_hash"]):
+        not_modified = bool(fetched.get("not_modified"))
+        db.write(lambda conn: conn.execute("""
+            UPDATE feed_cache
+            SET requests = requests + 1,
+                hits = hits + 1,
+                not_modified = not_modified + ?,
+                checked_at = CURRENT_TIMESTAMP
+            WHERE feed_url = ?
+        """, (int(not_modified), rss_url)))
+        return {
+            "success": True,
+            "feed_title": cached["feed_title"],
+            "entries": json.loads(cached["entries"]),
+            "feed_cache": "not_modified" if not_modified else "unchanged"
+        }
+    
+    db.write(lambda conn: conn.execute("""
+        INSERT INTO feed_cache (feed_url, feed_title, etag, last_modified,
+                                content_hash, content_bytes, entries, requests)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+        ON CONFLICT(feed_url) DO UPDATE SET
+            feed_title = excluded.feed_title,
+            etag = excluded.etag,
+            last_modified = excluded.last_modified,
+            content_hash = excluded.content_hash,
+            content_bytes = excluded.content_bytes,
+            entries = excluded.entries,
+            requests = requests + 1,
+            checked_at = CURRENT_TIMESTAMP
+    """, (
+        rss_url,
+        fetched["feed_title"],
+        fetched["etag"],
+        fetched["last_modified"],
+        fetched["content_hash"],
+        fetched["content_bytes"],
+        json.dumps(fetched["entries"])
+    )))
+    fetched["feed_cache"] = "miss"
+    return fetched
+
+@app.tool
+async def analyze_rss_feed(rss_url: str, max_items: int = 10,
+                           max_concurrency: Optional[int] = None,
+                           deadline_seconds: Optional[float] = None,
+                           ctx: Optional[Context] = None) -> Dict:
     """RSSフィードを分析（応用例）
     
+    記事は並列に取得・分析し（同じホストへは rate_limiter で間隔を空ける）、
+    1件終わるごとに進捗通知で結果を知らせる。
+    期限までに終わらなかった記事は打ち切り、pending_items として返す
+    （保存処理の途中だった記事は、返却後に保存が完了することがある）。
+    
     Args:
         rss_url: RSSフィードのURL
         max_items: 分析する最大記事数
+        max_concurrency: 同時に処理する記事数（省略時は config.toml の値）
+        deadline_seconds: この秒数で打ち切り、終わった分だけ返す（省略時は config.toml の値）
         
     Returns:
         RSS分析結果
     """
+    if max_concurrency is None:
+        max_concurrency = config.get("scraping", {}).get("max_concurrency", 64)
+    if deadline_seconds is None:
+        deadline_seconds = feeds_config.get("deadline", 60)
+    
+    tasks: List[asyncio.Task] = []
     try:
-        import feedparser
+        start = time.time()
+        feed = await asyncio.to_thread(_get_feed, rss_url)
+        if not feed["success"]:
+            return feed
         
-        feed = feedparser.parse(rss_url)
+        entries = feed["entries"][:max_items]
+        tasks = _start_analysis_tasks([entry["link"] for entry in entries], max_concurrency)
+        entry_of = dict(zip(tasks, entries))
+        results = {}
         
-        if not hasattr(feed, 'entries'):
-            return {
-                "success": False,
-                "error": "Invalid RSS feed or parsing error"
-            }
-        
-        results = []
-        
-        for entry in feed.entries[:max_items]:
-            if hasattr(entry, 'link'):
-                result = _internal_scrape_and_analyze(entry.link)
-                result['rss_title'] = getattr(entry, 'title', 'No Title')
-                result['published'] = getattr(entry, 'published', None)
-                results.append(result)
-                
-                # レート制限
-                time.sleep(1)
+        remaining = set(tasks)
+        deadline = start + deadline_seconds
+        while remaining:
+            done, remaining = await asyncio.wait(
+                remaining, timeout=max(0.0, deadline - time.time()),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break  # 期限切れ
+            for task in done:
+                entry = entry_of[task]
+                result = task.result()
+                result['rss_title'] = entry["title"]
+                result['published'] = entry["published"]
+                results[task] = result
+                if ctx is not None:
+                    status = (result["sentiment"]["label"] if result["success"]
+                              else f"error: {result['error']}")
+                    await ctx.report_progress(
+                        len(results), len(tasks), message=f"{entry['link']} ({status})"
+                    )
         
         return {
             "success": True,
-            "feed_title": getattr(feed.feed, 'title', 'Unknown Feed'),
+            "feed_title": feed["feed_title"],
+            "feed_cache": feed["feed_cache"],
             "analyzed_items": len(results),
-            "results": results
+            "completed": not remaining,
+            "elapsed_seconds": round(time.time() - start, 3),
+            "results": [results[task] for task in tasks if task in results],
+            "pending_items": [entry_of[task]["link"] for task in tasks if task in remaining]
         }
     
-    except ImportError:
+    except Exception as e:
         return {
             "success": False,
-            "error": "feedparser module not installed. Run: pip install feedparser"
+            "error": str(e)
+        }
+    
+    finally:
+        # 期限切れ・例外で終わらなかった記事を打ち切り、終了を待つ。
+        # ただしスレッドで実行中の分析・保存は止められないため、
+        # 打ち切った記事の結果がツールの返却後にDBへ保存されることがある。
+        unfinished = [task for task in tasks if not task.done()]
+        for task in unfinished:
+            task.cancel()
+        if unfinished:
+            await asyncio.gather(*unfinished, return_exceptions=True)
+
+feeds_config = config.get("feeds", {})
+feed_scheduler = FeedScheduler(
+    db,
+    fetch=_get_feed,
+    analyze=_rate_limited_analyze,
+    default_interval=feeds_config.get("poll_interval", 900),
+    jitter=feeds_config.get("poll_jitter", 0.1),
+    tick=feeds_config.get("scheduler_tick", 5),
+    workers=feeds_config.get("scheduler_workers", 4),
+    max_items=feeds_config.get("max_items", 20)
+)
+
+@app.tool
+async def subscribe_feed(feed_url: str, interval_seconds: Optional[float] = None,
+                         max_items: Optional[int] = None) -> Dict:
+    """フィードを購読し、定期的に新着記事だけを分析する
+    
+    Args:
+        feed_url: RSS / Atom フィードのURL（ローカルファイルのパスも可）
+        interval_seconds: 取得間隔（省略時は config.toml の値。実際は ±jitter の揺らぎあり）
+        max_items: 1回の取得で対象にする最大記事数
+        
+    Returns:
+        購読情報
+    """
+    try:
+        subscription = await asyncio.to_thread(
+            feed_scheduler.subscribe, feed_url, interval_seconds, max_items
+        )
+        return {"success": True, "subscription": subscription}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.tool
+async def unsubscribe_feed(feed_url: str) -> Dict:
+    """フィードの購読を解除
+    
+    Args:
+        feed_url: 購読中のフィードのURL
+        
+    Returns:
+        解除結果
+    """
+    try:
+        if not await asyncio.to_thread(feed_scheduler.unsubscribe, feed_url):
+            return {"success": False, "error": f"Not subscribed: {feed_url}"}
+        return {"success": True, "feed_url": feed_url}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.tool
+async def get_feed_scheduler_status() -> Dict:
+    """フィード巡回の状態（キューの長さ、遅延、1分あたりの処理件数、購読ごとの状態）
+    
+    Returns:
+        スケジューラーの状態
+    """
+    try:
+        return {"success": True, **(await asyncio.to_thread(feed_scheduler.status))}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+jobs_config = config.get("jobs", {})
+job_workers = JobWorkers(
+    db,
+    process=_scrape_and_analyze_blocking,
+    workers=jobs_config.get("workers", 4),
+    idle_wait=jobs_config.get("idle_wait", 1.0)
+)
+
+@app.tool
+async def submit_batch_job(urls: Optional[List[str]] = None, rss_url: Optional[str] = None,
+                           max_items: int = 50) -> Dict:
+    """一括分析をバックグラウンドジョブとして登録（結果は get_job_results で取得）
+    
+    サーバーが再起動しても、未処理のURLから処理を続ける。
+    
+    Args:
+        urls: 分析対象URLのリスト
+        rss_url: 指定するとフィードの記事（最大 max_items 件）を分析対象にする
+        max_items: rss_url 指定時の最大記事数
+        
+    Returns:
+        ジョブID
+    """
+    try:
+        if rss_url:
+            feed = await asyncio.to_thread(_get_feed, rss_url)
+            if not feed["success"]:
+                return feed
+            kind = "rss"
+            targets = [entry["link"] for entry in feed["entries"][:max_items]]
+            params = {"rss_url": rss_url, "max_items": max_items}
+        elif urls:
+            kind = "batch"
+            targets = list(urls)
+            params = {}
+        else:
+            return {"success": False, "error": "urls または rss_url を指定してください"}
+        
+        job_id = await asyncio.to_thread(job_workers.submit, kind, targets, params)
+        return {
+            "success": True,
+            "job_id": job_id,
+            "kind": kind,
+            "total_items": len(targets),
+            "workers_running": job_workers.running
         }
     except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.tool
+def get_job_status(job_id: int) -> Dict:
+    """ジョブの状態・進み具合・処理速度（items_per_second / eta_seconds）
+    
+    Args:
+        job_id: submit_batch_job が返したジョブID
+        
+    Returns:
+        ジョブの状態
+    """
+    try:
+        job = db.get_job(job_id)
+        if job is None:
+            return {"success": False, "error": f"Job not found: {job_id}"}
+        return {"success": True, "job": job}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@app.tool
+def get_job_results(job_id: int, limit: int = 50, cursor: Optional[str] = None) -> Dict:
+    """ジョブの処理済み項目の結果（投入順）
+    
+    Args:
+        job_id: submit_batch_job が返したジョブID
+        limit: 取得する件数
+        cursor: 前回の next_cursor（続きのページを取得）
+        
+    Returns:
+        項目ごとの結果と、続きがある場合の next_cursor
+    """
+    if limit < 1:
+        return {"success": False, "error": f"limit は1以上を指定してください: {limit}"}
+    try:
+        after = decode_cursor(cursor, f"job:{job_id}")[0] if cursor else -1
+        with db.get_connection() as conn:
+            job = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return {"success": False, "error": f"Job not found: {job_id}"}
+            # 未処理の項目より前の分だけを返す（カーソルが未処理の項目を飛び越さないように）
+            rows = conn.execute("""
+                SELECT seq, url, status, result, attempts, started_at, finished_at
+                FROM job_items
+                WHERE job_id = ? AND seq > ? AND seq < COALESCE((
+                    SELECT MIN(seq) FROM job_items
+                    WHERE job_id = ? AND status IN ('pending', 'running')
+                ), 9223372036854775807)
+                ORDER BY seq LIMIT ?
+            """, (job_id, after, job_id, limit + 1)).fetchall()
+        
+        results = []
+        for row in rows[:limit]:
+            item = dict(row)
+            item["result"] = json.loads(item["result"])
+            results.append(item)
+        
+        # 続きがある（または処理中で今後増える）場合は次回の取得位置を返す
+        next_cursor = None
+        if len(rows) > limit or job["status"] != "completed":
+            last = results[-1]["seq"] if results else after
+            next_cursor = encode_cursor(f"job:{job_id}", [last])
         return {
-            "success": False,
-            "error": str(e)
+            "success": True,
+            "job_id": job_id,
+            "job_status": job["status"],
+            "count": len(results),
+            "results": results,
+            "next_cursor": next_cursor
         }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
 
 if __name__ == "__main__":
     app.run() 
\ No newline at end of file
@@ -0,0 +1,13 @@
+"""
+設定ファイル（config.toml）の読み込み
+"""
+import tomllib
+from pathlib import Path
+
+# 設定読み込み
+config_path = Path("config.toml")
+if config_path.exists():
+    with open(config_path, "rb") as f:
+        config = tomllib.load(f)
+else:
+    config = {}
@@ -0,0 +1,430 @@
+"""
+分析データベースの単体テスト
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+import main
+from database import LISTED_ANALYSES_SQL, AnalysisDatabase
+
+def _query_plan(db: AnalysisDatabase, sql: str, params: tuple = ()) -> str:
+    """EXPLAIN QUERY PLAN の結果を1つの文字列にまとめる"""
+    with db.get_connection() as conn:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return "\n".join(row["detail"] for row in rows)
+
+@contextmanager
+def temporary_database():
+    """main.db を一時データベースに差し替え、終了時に元に戻して閉じる"""
+    original_db = main.db
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AnalysisDatabase(os.path.join(tmp, "data", "test.db"))
+        main.db = db
+        try:
+            yield db
+        finally:
+            main.db = original_db
+            db.close()
+
+def _random_keywords(rng: random.Random, vocabulary: list) -> list:
+    words = rng.sample(vocabulary, 10)
+    counts = [rng.randint(1, 20) for _ in words]
+    total = sum(counts) * rng.randint(2, 50)
+    return [
+        {"word": word, "count": count, "frequency": count / total}
+        for word, count in zip(words, counts)
+    ]
+
+def _expected_totals(db: AnalysisDatabase, min_frequency: float) -> dict:
+    """従来方式（JSONを読み込んで Counter で集計）の結果"""
+    totals = Counter()
+    with db.get_connection() as conn:
+        for row in conn.execute("SELECT keywords FROM analyses WHERE keywords IS NOT NULL"):
+            for keyword in json.loads(row["keywords"]):
+                if keyword["frequency"] >= min_frequency:
+                    totals[keyword["word"]] += keyword["count"]
+    return dict(totals)
+
+def test_keyword_totals_follow_inserts_and_deletes():
+    """キーワード累計がトリガーで更新され、JSONからの集計と一致すること"""
+    rng = random.Random(1)
+    vocabulary = [f"word{i}" for i in range(200)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AnalysisDatabase(os.path.join(tmp, "data", "test.db"))
+        with db.get_connection() as conn:
+            conn.executemany(
+                "INSERT INTO analyses (url_id, sentiment_score, sentiment_label, keywords, word_count) "
+                "VALUES (?, 0, 'neutral', ?, 100)",
+                [(i, json.dumps(_random_keywords(rng, vocabulary))) for i in range(500)]
+            )
+            conn.execute("INSERT INTO analyses (url_id, keywords) VALUES (0, NULL)")
+            conn.execute("DELETE FROM analyses WHERE id % 7 = 0")
+
+        with db.get_connection() as conn:
+            meta = conn.execute("SELECT * FROM keyword_totals_meta").fetchone()
+            totals = {row["word"]: row["total_count"]
+                      for row in conn.execute("SELECT * FROM keyword_totals")}
+            documents = conn.execute(
+                "SELECT COUNT(*) FROM analyses WHERE keywords IS NOT NULL"
+            ).fetchone()[0]
+        assert totals == _expected_totals(db, meta["min_frequency"])
+        assert meta["analyzed_documents"] == documents
+
+        # 閾値を変更すると作り直される
+        with db.get_connection() as conn:
+            assert db.sync_keyword_totals(conn, 0.05)
+            totals = {row["word"]: row["total_count"]
+                      for row in conn.execute("SELECT * FROM keyword_totals")}
+        assert totals == _expected_totals(db, 0.05)
+
+def test_keyword_migration_backfills_existing_rows():
+    """マイグレーション前に保存された分析結果も展開されること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AnalysisDatabase(os.path.join(tmp, "data", "test.db"))
+        keywords = [{"word": "python", "count": 3, "frequency": 0.1},
+                    {"word": "rare", "count": 1, "frequency": 0.001}]
+        with db.get_connection() as conn:
+            # トリガーとキーワード表が無かった頃の状態を再現
+            conn.execute("DROP TRIGGER analyses_keywords_insert")
+            conn.execute("INSERT INTO analyses (url_id, keywords) VALUES (1, ?)", (json.dumps(keywords),))
+            conn.execute("INSERT INTO analyses (url_id, keywords) VALUES (2, 'not json')")
+            for table in ("analysis_keywords", "keyword_totals", "keyword_totals_meta"):
+                conn.execute(f"DROP TABLE {table}")
+            conn.execute("DELETE FROM schema_migrations WHERE version >= 3")
+
+        assert 3 in db.migrate()
+        with db.get_connection() as conn:
+            rows = conn.execute("SELECT word, count FROM analysis_keywords ORDER BY word").fetchall()
+            totals = conn.execute("SELECT word, total_count FROM keyword_totals").fetchall()
+            meta = conn.execute("SELECT analyzed_documents FROM keyword_totals_meta").fetchone()
+        assert [tuple(row) for row in rows] == [("python", 3), ("rare", 1)]
+        assert [tuple(row) for row in totals] == [("python", 3)]
+        assert meta["analyzed_documents"] == 1
+
+def test_keyword_queries_use_indexes():
+    """キーワード分析のクエリがインデックスを使うこと"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AnalysisDatabase(os.path.join(tmp, "data", "test.db"))
+        plan = _query_plan(db, """
+            SELECT word, total_count FROM keyword_totals
+            ORDER BY total_count DESC, word LIMIT 20
+        """)
+        assert "idx_keyword_totals_count" in plan, plan
+        plan = _query_plan(db, """
+            SELECT word, SUM(count) AS total_count FROM analysis_keywords
+            WHERE frequency >= ? GROUP BY word ORDER BY total_count DESC LIMIT 20
+        """, (0.05,))
+        assert "COVERING INDEX idx_analysis_keywords_word" in plan, plan
+
+def _seed_analyses(db: AnalysisDatabase, count: int, url_count: int, batch: int = 100_000):
+    """合成データ（keywords なし）を投入"""
+    rng = random.Random(7)
+    labels = ("positive", "negative", "neutral")
+    with db.get_connection() as conn:
+        conn.executemany(
+            "INSERT INTO urls (id, url, title) VALUES (?, ?, ?)",
+            [(i, f"https://example.com/{i}", f"page {i}") for i in range(1, url_count + 1)]
+        )
+        for start in range(0, count, batch):
+            conn.executemany(
+                "INSERT INTO analyses (url_id, sentiment_score, sentiment_label, word_count, analyzed_at) "
+                "VALUES (?, ?, ?, ?, datetime('2024-01-01', ? || ' seconds'))",
+                [
+                    (rng.randint(1, url_count), round(rng.uniform(-1, 1), 3),
+                     rng.choice(labels), rng.randint(10, 5000), rng.randint(0, 10_000_000))
+                    for _ in range(start, min(start + batch, count))
+                ]
+            )
+        conn.execute("ANALYZE")
+
+def _assert_no_full_scan(plan: str):
+    for line in plan.splitlines():
+        assert not (line.startswith("SCAN") and "INDEX" not in line), plan
+    assert "TEMP B-TREE" not in plan, plan
+
+def test_history_and_sentiment_queries_use_indexes(rows: int = 5_000):
+    """履歴・感情検索が全件走査・ソートをしないこと（ANALYZE 済みの統計で実行計画を確認）"""
+    history_sql = f"""
+        SELECT a.id AS analysis_id, u.url, u.title, a.sentiment_score,
+               a.sentiment_label, a.word_count, a.analyzed_at
+        FROM {LISTED_ANALYSES_SQL}
+        {{where}}
+        ORDER BY a.analyzed_at DESC, a.id DESC LIMIT 11
+    """
+    sentiment_sql = f"""
+        SELECT a.id AS analysis_id, u.url, u.title, a.sentiment_score,
+               a.sentiment_label, a.word_count, a.analyzed_at
+        FROM {LISTED_ANALYSES_SQL}
+        WHERE a.sentiment_label = ? {{where}}
+        ORDER BY a.sentiment_score DESC, a.id DESC LIMIT 51
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AnalysisDatabase(os.path.join(tmp, "data", "test.db"))
+        _seed_analyses(db, rows, url_count=rows // 10)
+
+        plans = [
+            _query_plan(db, history_sql.format(where="")),
+            _query_plan(db, history_sql.format(where="WHERE (a.analyzed_at, a.id) < (?, ?)"),
+                        ("2024-03-01 00:00:00", rows // 2)),
+            _query_plan(db, sentiment_sql.format(where=""), ("positive",)),
+            _query_plan(db, sentiment_sql.format(where="AND (a.sentiment_score, a.id) < (?, ?)"),
+                        ("positive", 0.5, rows // 2)),
+            _query_plan(db, "SELECT id FROM analyses WHERE url_id = ?", (42,)),
+        ]
+        for plan in plans:
+            _assert_no_full_scan(plan)
+        assert "idx_analyses_analyzed_at" in plans[0] and "idx_analyses_analyzed_at" in plans[1]
+        assert "idx_analyses_label_score" in plans[2] and "idx_analyses_label_score" in plans[3]
+        assert "idx_analyses_url_id" in plans[4]
+
+def test_cursor_pagination_walks_every_row_once():
+    """カーソルで全ページをたどると、全件が重複・欠落なく順序どおりに得られること"""
+    with temporary_database() as db:
+        with db.get_connection() as conn:
+            conn.execute("INSERT INTO urls (id, url) VALUES (1, 'https://example.com/')")
+            # analyzed_at と sentiment_score が同じ行を多数作る（同値の境界をまたぐ）
+            conn.executemany(
+                "INSERT INTO analyses (url_id, sentiment_score, sentiment_label, analyzed_at) "
+                "VALUES (1, ?, 'positive', ?)",
+                [(i % 3 / 10, f"2024-01-0{i % 4 + 1} 00:00:00") for i in range(95)]
+            )
+        for tool, key, args in (
+            (main.get_analysis_history, "history", {}),
+            (main.search_by_sentiment, "results", {"sentiment_label": "positive"}),
+        ):
+            seen = []
+            cursor = None
+            while True:
+                page = tool.fn(limit=10, cursor=cursor, **args)
+                assert page["success"], page
+                seen.extend(page[key])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            ids = [row["analysis_id"] for row in seen]
+            assert sorted(ids) == list(range(1, 96))
+            order_key = ((lambda row: (row["analyzed_at"], row["analysis_id"]))
+                         if key == "history" else
+                         (lambda row: (row["sentiment_score"], row["analysis_id"])))
+            assert seen == sorted(seen, key=order_key, reverse=True)
+
+        # 別ツールのカーソルは拒否される
+        history_cursor = main.get_analysis_history.fn(limit=10)["next_cursor"]
+        assert not main.search_by_sentiment.fn("positive", cursor=history_cursor)["success"]
+        broken = main.get_analysis_history.fn(limit=10, cursor="not a cursor")
+        assert not broken["success"] and "無効なカーソル" in broken["error"], broken
+
+        # limit が1未満ならページを作らずにエラーを返す
+        for limit in (0, -1):
+            for result in (main.get_analysis_history.fn(limit=limit),
+                           main.search_by_sentiment.fn("positive", limit=limit),
+                           main.get_job_results.fn(1, limit=limit)):
+                assert not result["success"] and "limit" in result["error"], result
+
+def _store_page(i: int):
+    """URL行と分析結果を1つの書き込み処理として保存する"""
+    def job(conn):
+        url_id = conn.execute(
+            "INSERT INTO urls (url, title) VALUES (?, ?)", (f"https://example.com/{i}", f"page {i}")
+        ).lastrowid
+        return conn.execute(
+            "INSERT INTO analyses (url_id, sentiment_label, word_count) VALUES (?, 'neutral', ?)",
+            (url_id, i)
+        ).lastrowid
+    return job
+
+def test_batch_writer_groups_commits():
+    """並行した書き込みがまとめてコミットされ、失敗した処理だけが取り消されること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AnalysisDatabase(os.path.join(tmp, "data", "test.db"))
+        with db.get_connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        db.writer.flush_interval = 0.01  # まとまり方を環境の速さに依存させない
+        
+        futures = []
+        lock = threading.Lock()
+        def submit(start):
+            for i in range(start, start + 100):
+                future = db.writer.submit(_store_page(i))
+                with lock:
+                    futures.append(future)
+        threads = [threading.Thread(target=submit, args=(n * 100,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        failing = db.writer.submit(_store_page(0))  # url の UNIQUE 制約違反
+        ids = [future.result() for future in futures]
+        
+        assert len(set(ids)) == 400
+        assert isinstance(failing.exception(), Exception)
+        assert db.writer.stats["transactions"] < 400 / 5, db.writer.stats
+        with db.get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0] == 400
+            assert conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0] == 400
+        db.close()
+
+_CRASH_SCRIPT = textwrap.dedent("""
+    import os, sys, threading
+    sys.path.insert(0, {cwd!r})
+    from database import AnalysisDatabase
+    from test_database import _store_page
+
+    db = AnalysisDatabase({path!r})
+    committed = threading.Event()
+    for i in range(5000):
+        future = db.writer.submit(_store_page(i))
+        if i == 200:
+            future.add_done_callback(lambda f: committed.set())
+    committed.wait()
+    os._exit(1)  # コミット途中のバッチを残したまま強制終了
+""")
+
+def test_crash_leaves_no_orphan_analyses():
+    """書き込み中にプロセスが落ちても、URL行の無い分析結果が残らないこと"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data", "test.db")
+        script = _CRASH_SCRIPT.format(cwd=os.path.dirname(os.path.abspath(__file__)), path=path)
+        subprocess.run([sys.executable, "-c", script], check=False, timeout=60)
+        
+        db = AnalysisDatabase(path)
+        with db.get_connection() as conn:
+            assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+            analyses = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+            orphans = conn.execute("""
+                SELECT COUNT(*) FROM analyses a
+                LEFT JOIN urls u ON u.id = a.url_id WHERE u.id IS NULL
+            """).fetchone()[0]
+            urls = conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+        assert analyses >= 201
+        assert orphans == 0
+        assert urls == analyses
+        db.close()
+
+def _scrape_result(title: str, content: str) -> dict:
+    return {"success": True, "title": title, "content": content,
+            "content_hash": str(hash((title, content))), "content_bytes": len(content)}
+
+def test_rescrape_keeps_url_id():
+    """再取得しても urls の id が変わらず、過去の分析結果の参照が保たれること"""
+    with temporary_database() as db:
+        url = "https://example.com/article"
+        first = main._analyze_and_store(url, _scrape_result("Article", "good news today"))
+        same = main._analyze_and_store(url, _scrape_result("Article", "good news today"))
+        changed = main._analyze_and_store(url, _scrape_result("Article", "bad news today"))
+        assert first["success"] and same["success"] and changed["success"]
+        assert first["url_id"] == same["url_id"] == changed["url_id"]
+        assert same["analysis_id"] == first["analysis_id"]
+        assert changed["analysis_id"] != first["analysis_id"]
+        with db.get_connection() as conn:
+            row = conn.execute("SELECT content FROM urls WHERE id = ?", (first["url_id"],)).fetchone()
+            linked = conn.execute(
+                "SELECT COUNT(*) FROM analyses WHERE url_id = ?", (first["url_id"],)
+            ).fetchone()[0]
+        assert row["content"] == "bad news today"
+        assert linked == 2
+
+def test_unchanged_response_refreshes_validators():
+    """本文が同一の 200 応答で、新しい ETag / Last-Modified を保存すること"""
+    with temporary_database() as db:
+        url = "https://example.com/article"
+        page = _scrape_result("Article", "good news today")
+        main._analyze_and_store(url, {**page, "etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+        rotated = {**page, "etag": '"v2"', "last_modified": "Tue, 02 Jan 2024 00:00:00 GMT",
+                   "content_bytes": 99}
+        unchanged = main._store_scrape_result(url, main._get_http_cache(url), rotated)
+        not_modified = main._store_scrape_result(
+            url, main._get_http_cache(url), {"success": True, "url": url, "not_modified": True}
+        )
+        cached = main._get_http_cache(url)
+        assert unchanged["http_cache"] == "unchanged"
+        assert not_modified["http_cache"] == "not_modified"
+        assert (cached["etag"], cached["last_modified"], cached["content_bytes"]) == \
+            ('"v2"', "Tue, 02 Jan 2024 00:00:00 GMT", 99)
+        assert (cached["hits"], cached["not_modified"], cached["bytes_saved"]) == (2, 1, 99)
+
+def test_reanalyzes_when_memo_is_missing():
+    """同じ内容の分析結果はあるがメモが無い場合、分析し直して保存すること"""
+    with temporary_database() as db:
+        url = "https://example.com/article"
+        first = main._analyze_and_store(url, _scrape_result("Article", "good news today"))
+        with db.get_connection() as conn:
+            conn.execute("DELETE FROM analysis_cache")
+        again = main._analyze_and_store(url, _scrape_result("Article", "good news today"))
+        assert again["success"], again
+        assert again["url_id"] == first["url_id"]
+        assert again["sentiment"] == first["sentiment"]
+        assert not again["analysis_skipped"]
+        with db.get_connection() as conn:
+            memo = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        assert memo == 1
+
+def test_orphan_repair_migration():
+    """参照先の無い分析結果が、HTTPキャッシュから分かるURLか代わりの行に付け替わること"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = AnalysisDatabase(os.path.join(tmp, "data", "test.db"))
+        with db.get_connection() as conn:
+            # INSERT OR REPLACE で url の id が 1 → 3 に変わった状態を再現
+            conn.execute("INSERT INTO urls (id, url) VALUES (3, 'https://example.com/a')")
+            conn.execute("INSERT INTO analyses (id, url_id) VALUES (10, 1)")
+            conn.execute("INSERT INTO analyses (id, url_id) VALUES (11, 1)")
+            conn.execute("INSERT INTO analyses (id, url_id) VALUES (12, 2)")
+            conn.execute("INSERT INTO http_cache (url, analysis_id) VALUES ('https://example.com/a', 11)")
+            conn.execute("DELETE FROM schema_migrations WHERE version >= 5")
+
+        assert 5 in db.migrate()
+        with db.get_connection() as conn:
+            links = dict(conn.execute("SELECT id, url_id FROM analyses").fetchall())
+            urls = dict(conn.execute("SELECT id, url FROM urls").fetchall())
+            orphans = conn.execute("""
+                SELECT COUNT(*) FROM analyses a
+                WHERE NOT EXISTS (SELECT 1 FROM urls u WHERE u.id = a.url_id)
+            """).fetchone()[0]
+        assert links == {10: 1, 11: 3, 12: 2}
+        assert urls == {1: "orphaned://url/1", 2: "orphaned://url/2", 3: "https://example.com/a"}
+        assert orphans == 0
+        db.close()
+
+def test_orphaned_placeholders_are_not_listed():
+    """元のURLが分からない分析結果（代わりの urls 行）が履歴・検索・統計に出ないこと"""
+    with temporary_database() as db:
+        with db.get_connection() as conn:
+            conn.execute("INSERT INTO urls (id, url, title) VALUES (1, 'https://example.com/a', 'A')")
+            conn.execute("INSERT INTO urls (id, url, title, status) "
+                         "VALUES (2, 'orphaned://url/2', 'Unknown URL', 'orphaned')")
+            conn.execute("INSERT INTO analyses (id, url_id, sentiment_score, sentiment_label) "
+                         "VALUES (10, 1, 0.5, 'positive')")
+            conn.execute("INSERT INTO analyses (id, url_id, sentiment_score, sentiment_label) "
+                         "VALUES (11, 2, -0.5, 'negative')")
+
+        history = main.get_analysis_history.fn(limit=10)
+        negative = main.search_by_sentiment.fn("negative")
+        summary = main.generate_summary_report.fn()["summary"]
+        assert [row["analysis_id"] for row in history["history"]] == [10]
+        assert negative["count"] == 0
+        assert summary["total_analyses"] == 1
+        assert summary["sentiment_distribution"] == {"positive": 1}
+        assert summary["average_sentiment"] == 0.5
+
+if __name__ == "__main__":
+    test_keyword_totals_follow_inserts_and_deletes()
+    test_keyword_migration_backfills_existing_rows()
+    test_keyword_queries_use_indexes()
+    test_history_and_sentiment_queries_use_indexes()
+    test_cursor_pagination_walks_every_row_once()
+    test_batch_writer_groups_commits()
+    test_crash_leaves_no_orphan_analyses()
+    test_rescrape_keeps_url_id()
+    test_reanalyzes_when_memo_is_missing()
+    test_unchanged_response_refreshes_validators()
+    test_orphan_repair_migration()
+    test_orphaned_placeholders_are_not_listed()
+    print("✅ すべてのテストが成功しました")
@@ -0,0 +1,172 @@
+"""
+RSSフィード取得・分析の単体テスト
+（ローカルHTTPサーバーを使用し、外部ネットワークには接続しない）
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+from feed_reader import fetch_feed
+from test_database import temporary_database
+from web_scraper import HostRateLimiter, async_scraper
+
+PAGE_HTML = "<html><head><title>{title}</title></head><body><p>great news number {n}</p></body></html>"
+FEED_ETAG = '"feed-v1"'
+
+def make_rss(links: list) -> bytes:
+    items = "".join(
+        f"<item><title>Item {n}</title><link>{link}</link><guid>item-{n}</guid></item>"
+        for n, link in enumerate(links)
+    )
+    return (f'<?xml version="1.0"?><rss version="2.0"><channel><title>Local Feed</title>'
+            f"{items}</channel></rss>").encode("utf-8")
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    """/feed でRSSを、/slow/N と /fast/N で記事ページを返すハンドラ"""
+    links = []
+    feed_requests = 0
+
+    def do_GET(self):
+        if self.path == "/feed":
+            type(self).feed_requests += 1
+            if self.headers.get("If-None-Match") == FEED_ETAG:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send("application/rss+xml", make_rss(self.links), {"ETag": FEED_ETAG})
+        elif self.path.startswith(("/slow/", "/fast/")):
+            if self.path.startswith("/slow/"):
+                time.sleep(2)
+            n = self.path.rsplit("/", 1)[1]
+            body = PAGE_HTML.format(title=f"Page {n}", n=n).encode("utf-8")
+            self._send("text/html; charset=utf-8", body)
+        else:
+            self.send_error(404)
+
+    def _send(self, content_type: str, body: bytes, headers: dict = None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@contextmanager
+def feed_environment(paths: list):
+    """ローカルサーバー・一時DB・間隔なしのレート制限に差し替える"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    _FeedHandler.links = [base + path for path in paths]
+    _FeedHandler.feed_requests = 0
+    original_limiter = main.rate_limiter
+    with temporary_database():
+        main.rate_limiter = HostRateLimiter(interval=0)
+        try:
+            yield base
+        finally:
+            main.rate_limiter = original_limiter
+            server.shutdown()
+            server.server_close()
+
+class _ProgressRecorder:
+    """ツールに渡す Context の代わり（進捗通知を記録する）"""
+    def __init__(self):
+        self.events = []
+
+    async def report_progress(self, progress, total=None, message=None):
+        self.events.append((progress, total, message, time.perf_counter()))
+
+def _analyze_feed(**kwargs) -> dict:
+    async def run():
+        try:
+            return await main.analyze_rss_feed.fn(**kwargs)
+        finally:
+            await async_scraper.close()
+    return asyncio.run(run())
+
+def test_items_are_analyzed_concurrently_with_progress():
+    """記事が並列に処理され、1件ごとに進捗通知が送られること"""
+    with feed_environment([f"/fast/{n}" for n in range(8)]) as base:
+        recorder = _ProgressRecorder()
+        result = _analyze_feed(rss_url=f"{base}/feed", max_items=8, ctx=recorder)
+        assert result["success"], result
+        assert result["completed"] and result["analyzed_items"] == 8
+        assert [r["url"] for r in result["results"]] == _FeedHandler.links  # フィード順
+        assert [event[0] for event in recorder.events] == list(range(1, 9))
+        assert all(event[1] == 8 for event in recorder.events)
+        assert all(event[2].split(" (")[0] in _FeedHandler.links for event in recorder.events)
+
+def test_deadline_returns_finished_items():
+    """期限を過ぎたら、終わった記事だけを返し残りを pending_items にすること"""
+    with feed_environment(["/fast/0", "/slow/1", "/fast/2", "/slow/3"]) as base:
+        start = time.perf_counter()
+        result = _analyze_feed(rss_url=f"{base}/feed", deadline_seconds=1.0)
+        elapsed = time.perf_counter() - start
+        assert result["success"], result
+        assert not result["completed"]
+        assert elapsed < 1.8
+        assert [r["url"] for r in result["results"]] == [f"{base}/fast/0", f"{base}/fast/2"]
+        assert result["pending_items"] == [f"{base}/slow/1", f"{base}/slow/3"]
+
+class _FailingRecorder(_ProgressRecorder):
+    """最初の進捗通知で例外を送出する Context"""
+    async def report_progress(self, progress, total=None, message=None):
+        raise RuntimeError("client disconnected")
+
+def test_unfinished_items_are_cancelled_on_error():
+    """途中で例外が起きても、残りの記事のタスクを打ち切ってから返すこと"""
+    async def run(base):
+        try:
+            result = await main.analyze_rss_feed.fn(rss_url=f"{base}/feed", ctx=_FailingRecorder())
+        finally:
+            await async_scraper.close()
+        others = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        return result, others
+
+    with feed_environment(["/fast/0", "/slow/1", "/slow/2"]) as base:
+        start = time.perf_counter()
+        result, others = asyncio.run(run(base))
+        assert not result["success"] and "client disconnected" in result["error"]
+        assert others == []
+        assert time.perf_counter() - start < 1.8  # 遅い記事の完了を待っていない
+
+def test_feed_document_is_cached():
+    """2回目はフィードを条件付きで取得し、304 なら前回の記事一覧を使うこと"""
+    with feed_environment(["/fast/0"]) as base:
+        first = _analyze_feed(rss_url=f"{base}/feed")
+        second = _analyze_feed(rss_url=f"{base}/feed")
+        assert first["feed_cache"] == "miss"
+        assert second["feed_cache"] == "not_modified"
+        assert second["feed_title"] == "Local Feed"
+        assert second["analyzed_items"] == 1
+        assert _FeedHandler.feed_requests == 2
+
+def test_local_feed_file():
+    """ローカルのフィードファイルを読み、更新が無ければ not_modified を返すこと"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "feed.xml")
+        with open(path, "wb") as f:
+            f.write(make_rss(["https://example.com/a", "https://example.com/b"]))
+        result = fetch_feed(path)
+        assert result["success"], result
+        assert [entry["id"] for entry in result["entries"]] == ["item-0", "item-1"]
+        again = fetch_feed(f"file://{path}", last_modified=result["last_modified"])
+        assert again["not_modified"]
+
+if __name__ == "__main__":
+    test_items_are_analyzed_concurrently_with_progress()
+    test_deadline_returns_finished_items()
+    test_unfinished_items_are_cancelled_on_error()
+    test_feed_document_is_cached()
+    test_local_feed_file()
+    print("✅ すべてのテストが成功しました")
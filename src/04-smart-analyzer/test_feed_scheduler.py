@@ -0,0 +1,147 @@
+"""
+フィード購読スケジューラーの単体テスト
+（ローカルのフィードファイルとHTTPサーバーを使用し、外部ネットワークには接続しない）
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+import main
+from feed_scheduler import FeedScheduler
+from test_feed_reader import feed_environment, make_rss
+from web_scraper import async_scraper
+
+def _write_feed(path: str, links: list, mtime: float):
+    with open(path, "wb") as f:
+        f.write(make_rss(links))
+    os.utime(path, (mtime, mtime))  # 更新日時を変えて Last-Modified を更新する
+
+def _make_scheduler(**kwargs) -> FeedScheduler:
+    return FeedScheduler(main.db, fetch=main._get_feed, analyze=main._rate_limited_analyze,
+                         tick=0.05, workers=2, **kwargs)
+
+async def _wait_until(condition, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+def _make_due(feed_url: str):
+    """次の巡回で取得されるよう取得時刻を過去にする"""
+    main.db.write(lambda conn: conn.execute(
+        "UPDATE feed_subscriptions SET next_poll_at = 0 WHERE feed_url = ?", (feed_url,)
+    ))
+
+def test_only_new_items_are_analyzed():
+    """購読したフィードを巡回し、新着の記事だけを分析すること（再起動後も）"""
+    async def run(base, path):
+        links = [f"{base}/fast/{n}" for n in range(3)]
+        _write_feed(path, links, mtime=1_000_000)
+        scheduler = _make_scheduler()
+        scheduler.subscribe(path, interval_seconds=3600)
+        await scheduler.start()
+        try:
+            await _wait_until(lambda: scheduler.stats["analyzed"] == 3)
+            status = scheduler.status()
+            assert status["queue_depth"] == 0 and status["lag_seconds"] == 0.0
+            assert status["items_per_minute"] == 3 / 10
+            subscription = status["subscriptions"][0]
+            assert subscription["seen_items"] == 3 and subscription["unfinished_items"] == 0
+            assert subscription["next_poll_at"] > time.time() + 3600 * 0.8
+
+            # フィードが変わらなければ何も分析しない
+            polls = scheduler.stats["polls"]
+            _make_due(path)
+            await _wait_until(lambda: scheduler.stats["polls"] > polls)
+            await scheduler.drain()
+            assert scheduler.stats["analyzed"] == 3
+
+            # 1件追加されたら、その1件だけを分析する
+            _write_feed(path, links + [f"{base}/fast/3"], mtime=1_000_100)
+            _make_due(path)
+            await _wait_until(lambda: scheduler.stats["analyzed"] == 4)
+        finally:
+            await scheduler.stop()
+
+        # 再起動しても処理済みの記事は分析しない
+        restarted = _make_scheduler()
+        _make_due(path)
+        await restarted.start()
+        try:
+            await _wait_until(lambda: restarted.stats["polls"] >= 1)
+            await restarted.drain()
+            assert restarted.stats["enqueued"] == 0
+        finally:
+            await restarted.stop()
+            await async_scraper.close()
+
+    with tempfile.TemporaryDirectory() as tmp, feed_environment([]) as base:
+        asyncio.run(run(base, os.path.join(tmp, "feed.xml")))
+        with main.db.get_connection() as conn:
+            analyzed = conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+        assert analyzed == 4
+
+def test_unfinished_items_resume_after_restart():
+    """分析中に停止した記事が、次回の起動時に再開されること"""
+    async def run(base, path):
+        _write_feed(path, [f"{base}/slow/0", f"{base}/fast/1"], mtime=1_000_000)
+        scheduler = _make_scheduler()
+        scheduler.subscribe(path, interval_seconds=3600)
+        await scheduler.start()
+        try:
+            await _wait_until(lambda: scheduler.stats["analyzed"] == 1)
+            status = await asyncio.to_thread(scheduler.status)  # ツールと同じく別スレッドで取得
+            assert status["in_progress"] == 1  # /slow/0 は分析中
+        finally:
+            await scheduler.stop()
+
+        restarted = _make_scheduler()
+        await restarted.start()
+        try:
+            assert restarted.stats["enqueued"] == 1
+            await restarted.drain()
+            status = restarted.status()
+            assert restarted.stats["analyzed"] == 1
+            assert status["subscriptions"][0]["unfinished_items"] == 0
+        finally:
+            await restarted.stop()
+            await async_scraper.close()
+
+    with tempfile.TemporaryDirectory() as tmp, feed_environment([]) as base:
+        asyncio.run(run(base, os.path.join(tmp, "feed.xml")))
+
+def test_poll_interval_jitter():
+    """取得間隔に ±jitter の範囲で揺らぎが加わること"""
+    scheduler = FeedScheduler(main.db, fetch=main._get_feed, analyze=main._rate_limited_analyze,
+                              jitter=0.2)
+    times = [scheduler.next_poll_time(100, now=0) for _ in range(200)]
+    assert all(80 <= t <= 120 for t in times)
+    assert max(times) - min(times) > 20
+
+def test_subscription_tools():
+    """購読・解除ツールが購読情報を保存・削除すること"""
+    with feed_environment([]) as base:
+        original = main.feed_scheduler
+        main.feed_scheduler = _make_scheduler()
+        try:
+            feed_url = f"{base}/feed"
+            subscribed = asyncio.run(main.subscribe_feed.fn(feed_url, interval_seconds=60, max_items=5))
+            assert subscribed["success"], subscribed
+            assert (subscribed["subscription"]["interval_seconds"],
+                    subscribed["subscription"]["max_items"]) == (60, 5)
+            status = asyncio.run(main.get_feed_scheduler_status.fn())
+            assert [sub["feed_url"] for sub in status["subscriptions"]] == [feed_url]
+
+            assert asyncio.run(main.unsubscribe_feed.fn(feed_url))["success"]
+            assert not asyncio.run(main.unsubscribe_feed.fn(feed_url))["success"]
+            assert asyncio.run(main.get_feed_scheduler_status.fn())["subscriptions"] == []
+        finally:
+            main.feed_scheduler = original
+
+if __name__ == "__main__":
+    test_only_new_items_are_analyzed()
+    test_unfinished_items_resume_after_restart()
+    test_poll_interval_jitter()
+    test_subscription_tools()
+    print("✅ すべてのテストが成功しました")
@@ -0,0 +1,101 @@
+"""
+バックグラウンドジョブの単体テスト
+（ローカルHTTPサーバーを使用し、外部ネットワークには接続しない）
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+
+import main
+from job_queue import JobWorkers
+from test_feed_reader import feed_environment
+
+@contextmanager
+def job_environment(paths: list, workers: int = 4, start: bool = True):
+    """一時DBとローカルサーバーで動くジョブワーカーに差し替える"""
+    with feed_environment(paths) as base:
+        original = main.job_workers
+        main.job_workers = JobWorkers(main.db, process=main._scrape_and_analyze_blocking,
+                                      workers=workers, idle_wait=0.05)
+        if start:
+            main.job_workers.start()
+        try:
+            yield base
+        finally:
+            main.job_workers.stop()
+            main.job_workers = original
+
+def _submit(**kwargs) -> dict:
+    return asyncio.run(main.submit_batch_job.fn(**kwargs))
+
+def _wait_for_job(job_id: int, timeout: float = 15.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        job = main.get_job_status.fn(job_id)["job"]
+        if job["status"] == "completed":
+            return job
+        assert time.monotonic() < deadline, job
+        time.sleep(0.05)
+
+def test_batch_job_results_are_paginated_in_order():
+    """ジョブがバックグラウンドで処理され、結果を投入順にページングで取得できること"""
+    with job_environment([]) as base:
+        urls = [f"{base}/fast/{n}" for n in range(8)] + [f"{base}/missing"]
+        submitted = _submit(urls=urls)
+        assert submitted["success"] and submitted["total_items"] == 9
+        job = _wait_for_job(submitted["job_id"])
+        assert job["done_items"] == 8 and job["failed_items"] == 1
+        assert job["pending_items"] == job["running_items"] == 0
+        assert job["items_per_second"] > 0 and job["eta_seconds"] is None
+
+        seen, cursor = [], None
+        while True:
+            page = main.get_job_results.fn(submitted["job_id"], limit=4, cursor=cursor)
+            assert page["success"], page
+            seen.extend(page["results"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert [item["url"] for item in seen] == urls
+        assert [item["status"] for item in seen] == ["done"] * 8 + ["failed"]
+        assert seen[0]["result"]["sentiment"]["label"] in ("positive", "neutral", "negative")
+
+def test_items_run_in_parallel_workers():
+    """複数のワーカースレッドで並列に処理されること"""
+    with job_environment([], workers=4) as base:
+        start = time.perf_counter()
+        job_id = _submit(urls=[f"{base}/slow/{n}" for n in range(4)])["job_id"]
+        job = _wait_for_job(job_id)
+        assert time.perf_counter() - start < 4  # 1件2秒 × 4件を逐次なら8秒
+        assert job["avg_item_seconds"] >= 2
+
+def test_interrupted_items_resume_after_restart():
+    """処理中のまま停止した項目が、次回の起動時に再処理されること"""
+    with job_environment([], start=False) as base:
+        urls = [f"{base}/fast/{n}" for n in range(3)]
+        job_id = main.db.create_job("batch", urls)
+        # 1件目を取り出した直後にプロセスが落ちた状態を再現
+        assert main.db.claim_job_item()["seq"] == 0
+        assert main.get_job_status.fn(job_id)["job"]["running_items"] == 1
+
+        assert main.job_workers.start() == 1
+        job = _wait_for_job(job_id)
+        assert job["done_items"] == 3
+        first = main.get_job_results.fn(job_id)["results"][0]
+        assert first["attempts"] == 2
+
+def test_rss_job_expands_feed_items():
+    """rss_url を指定すると、フィードの記事が項目として登録されること"""
+    with job_environment(["/fast/0", "/fast/1", "/fast/2"]) as base:
+        submitted = _submit(rss_url=f"{base}/feed", max_items=2)
+        assert submitted["kind"] == "rss" and submitted["total_items"] == 2
+        job = _wait_for_job(submitted["job_id"])
+        assert job["params"] == {"rss_url": f"{base}/feed", "max_items": 2}
+        assert job["done_items"] == 2
+
+if __name__ == "__main__":
+    test_batch_job_results_are_paginated_in_order()
+    test_items_run_in_parallel_workers()
+    test_interrupted_items_resume_after_restart()
+    test_rss_job_expands_feed_items()
+    print("✅ すべてのテストが成功しました")
@@ -0,0 +1,410 @@
+"""
+スマート情報収集&分析システムの性能ベンチマーク
+（ローカルHTTPサーバーを代替サイトとして使用し、外部ネットワークには接続しない）
+"""
+import asyncio
+import glob
+import os
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import closing, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main
+from database import UPSERT_URL_SQL, AnalysisDatabase
+from html_extractor import EXTRACTORS, create_extractor
+from concurrent.futures import ThreadPoolExecutor
+from test_database import temporary_database
+from text_analyzer import AnalysisWorkerPool, TextAnalyzer
+from web_scraper import HostRateLimiter, async_scraper
+
+SAMPLE_HTML = """<html><head><title>Benchmark Page</title></head>
+<body><nav>menu</nav><p>This is a great and wonderful benchmark page about
+performance engineering and database tuning.</p><footer>footer</footer></body></html>"""
+
+class _PageHandler(BaseHTTPRequestHandler):
+    """一定の遅延の後にHTMLを返すハンドラ"""
+    latency = 0.2
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = SAMPLE_HTML.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class _CachedPageHandler(_PageHandler):
+    """ETag / Last-Modified に対応し、未更新なら 304 を返すハンドラ"""
+    etag = '"bench-v1"'
+    last_modified = "Mon, 01 Jan 2024 00:00:00 GMT"
+    body = SAMPLE_HTML.replace("</body>", "<p>" + "padding text " * 2000 + "</p></body>").encode("utf-8")
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.send_header("ETag", self.etag)
+        self.send_header("Last-Modified", self.last_modified)
+        self.end_headers()
+        self.wfile.write(self.body)
+
+@contextmanager
+def local_sites(count: int, handler=_PageHandler):
+    """ポート違いのローカルHTTPサーバーを count 個起動（= count 個の別ホスト）"""
+    servers = [ThreadingHTTPServer(("127.0.0.1", 0), handler) for _ in range(count)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield [f"http://127.0.0.1:{server.server_address[1]}" for server in servers]
+    finally:
+        for server in servers:
+            server.shutdown()
+            server.server_close()
+
+async def _run_batch(urls: list, concurrency: int) -> list:
+    """1回分の一括分析を実行し、HTTPセッションを閉じる"""
+    try:
+        return await main._analyze_urls_concurrently(urls, concurrency)
+    finally:
+        await async_scraper.close()
+
+def benchmark_batch_concurrency(hosts: int = 10, pages_per_host: int = 4,
+                                rate_limit: float = 0.5,
+                                concurrencies: tuple = (1, 4, 16, 64)):
+    """batch_analyze_urls の並列度ごとの所要時間"""
+    print(f"=== 一括分析ベンチマーク（{hosts}ホスト × {pages_per_host}ページ, "
+          f"応答遅延 {_PageHandler.latency}秒, ホスト毎の間隔 {rate_limit}秒） ===")
+    original_limiter = main.rate_limiter
+    with local_sites(hosts) as sites, temporary_database():
+        urls = [f"{site}/page/{page}" for page in range(pages_per_host) for site in sites]
+        # 従来方式: 逐次処理 + 1件ごとに sleep(1)
+        legacy = len(urls) * (_PageHandler.latency + 1.0)
+        print(f"  従来（逐次 + sleep(1)）: 約 {legacy:6.1f}秒（推定）")
+        try:
+            for concurrency in concurrencies:
+                main.rate_limiter = HostRateLimiter(interval=rate_limit)
+                start = time.perf_counter()
+                results = asyncio.run(_run_batch(urls, concurrency))
+                elapsed = time.perf_counter() - start
+                assert [result["url"] for result in results] == urls
+                successful = sum(result["success"] for result in results)
+                print(f"  並列度 {concurrency:3}: {elapsed:6.2f}秒（成功 {successful}/{len(urls)}）")
+        finally:
+            main.rate_limiter = original_limiter
+    print()
+
+def benchmark_http_cache(hosts: int = 10, pages_per_host: int = 4, rounds: int = 3):
+    """同じURL群を繰り返し分析したときの条件付きリクエストの効果"""
+    print(f"=== HTTPキャッシュベンチマーク（{hosts}ホスト × {pages_per_host}ページ × {rounds}回） ===")
+    original_limiter = main.rate_limiter
+    with local_sites(hosts, handler=_CachedPageHandler) as sites, temporary_database():
+        urls = [f"{site}/page/{page}" for page in range(pages_per_host) for site in sites]
+        main.rate_limiter = HostRateLimiter(interval=0)
+        try:
+            for round_no in range(1, rounds + 1):
+                start = time.perf_counter()
+                results = asyncio.run(_run_batch(urls, 64))
+                elapsed = time.perf_counter() - start
+                hits = sum(result.get("http_cache") == "not_modified" for result in results)
+                print(f"  {round_no}回目: {elapsed:6.2f}秒（304 {hits}/{len(urls)}）")
+        finally:
+            main.rate_limiter = original_limiter
+        stats = main.get_http_cache_stats.fn()["http_cache"]
+    print(f"  ヒット率 {stats['hit_ratio']:.0%}  節約 {stats['bytes_saved'] / 1024:,.0f} KB\n")
+
+def benchmark_content_dedup(hosts: int = 20, pages_per_host: int = 5):
+    """同一内容のページ（ミラー等）を一括分析したときの分析省略数"""
+    print(f"=== 本文ハッシュによる重複分析の省略（{hosts}ホスト × {pages_per_host}ページ, 全て同一内容） ===")
+    original_limiter = main.rate_limiter
+    with local_sites(hosts) as sites, temporary_database() as db:
+        urls = [f"{site}/page/{page}" for page in range(pages_per_host) for site in sites]
+        main.rate_limiter = HostRateLimiter(interval=0)
+        try:
+            results = asyncio.run(_run_batch(urls, 64))
+        finally:
+            main.rate_limiter = original_limiter
+        skipped = sum(bool(result.get("analysis_skipped")) for result in results)
+        with db.get_connection() as conn:
+            memo = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+    print(f"  分析省略 {skipped}/{len(urls)}件（分析結果のメモ {memo}件）\n")
+
+def _write_page(conn, i: int):
+    """1ページ分の保存（URL・分析結果・キャッシュ情報）"""
+    url = f"https://example.com/{i}"
+    url_id = conn.execute(UPSERT_URL_SQL, (url, f"page {i}", "content " * 200, None)).fetchone()[0]
+    analysis_id = conn.execute(
+        "INSERT INTO analyses (url_id, sentiment_score, sentiment_label, keywords, word_count) "
+        "VALUES (?, 0.1, 'positive', '[]', 200)", (url_id,)
+    ).lastrowid
+    conn.execute(
+        "INSERT OR REPLACE INTO http_cache (url, analysis_id, result) VALUES (?, ?, '{}')",
+        (url, analysis_id)
+    )
+
+def benchmark_batch_writes(pages: int = 2000, concurrency: int = 16):
+    """分析結果の保存: 従来方式（1件ごとに接続・コミット）vs WAL + バッチライター"""
+    print(f"=== 保存ベンチマーク（{pages}ページ, 同時実行 {concurrency}） ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = AnalysisDatabase(os.path.join(tmp, "data", "legacy.db"))
+        with closing(sqlite3.connect(legacy_db.db_path)) as conn:
+            conn.execute("PRAGMA journal_mode = DELETE")  # 従来の既定のジャーナル
+        db = AnalysisDatabase(os.path.join(tmp, "data", "bench.db"))
+        
+        def legacy(i):
+            with closing(sqlite3.connect(legacy_db.db_path, timeout=30)) as conn:
+                with conn:
+                    _write_page(conn, i)
+        
+        def batched(i):
+            db.write(lambda conn: _write_page(conn, i))
+        
+        for label, store in (("従来方式", legacy), ("バッチライター", batched)):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(store, range(pages)))
+            elapsed = time.perf_counter() - start
+            print(f"  {label:10}: {pages / elapsed:8.0f} pages/sec")
+        print(f"  バッチライターのコミット回数: {db.writer.stats['transactions']}回")
+        legacy_db.close()
+        db.close()
+    print()
+
+def _wal_bytes(conn, write) -> int:
+    """write(conn) が WAL に追記したバイト数"""
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    wal_path = conn.execute("PRAGMA database_list").fetchone()["file"] + "-wal"
+    with conn:
+        write(conn)
+    return os.path.getsize(wal_path)
+
+def benchmark_rescrape_writes(pages: int = 200, content_kb: int = 20):
+    """同じURLを再取得したときの書き込み量: INSERT OR REPLACE vs upsert"""
+    print(f"=== 再取得時の書き込み量（{pages}ページ × 本文 {content_kb}KB） ===")
+    def content(i: int, version: int) -> str:
+        return f"version {version} of page {i} " + "lorem ipsum " * (content_kb * 1024 // 12)
+
+    def legacy(conn, i, version):
+        text = content(i, version)
+        return conn.execute(
+            "INSERT OR REPLACE INTO urls (url, title, content, content_hash, status) "
+            "VALUES (?, ?, ?, ?, 'scraped')",
+            (f"https://example.com/{i}", f"page {i}", text, str(hash(text)))
+        ).lastrowid
+
+    def upsert(conn, i, version):
+        text = content(i, version)
+        return db.upsert_url(conn, f"https://example.com/{i}", f"page {i}", text, str(hash(text)))
+
+    for label, store in (("INSERT OR REPLACE", legacy), ("upsert", upsert)):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = AnalysisDatabase(os.path.join(tmp, "data", "bench.db"))
+            with closing(sqlite3.connect(db.db_path)) as conn:
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA wal_autocheckpoint = 0")
+                def scrape(version):
+                    def write(conn):
+                        for i in range(pages):
+                            url_id = store(conn, i, version)
+                            conn.execute("INSERT INTO analyses (url_id) VALUES (?)", (url_id,))
+                    return write
+                _wal_bytes(conn, scrape(0))
+                unchanged = _wal_bytes(conn, scrape(0))
+                changed = _wal_bytes(conn, scrape(1))
+                orphans = conn.execute("""
+                    SELECT COUNT(*) FROM analyses a
+                    WHERE NOT EXISTS (SELECT 1 FROM urls u WHERE u.id = a.url_id)
+                """).fetchone()[0]
+            db.close()
+        print(f"  {label:17}: 本文同一 {unchanged / pages / 1024:6.1f} KB/ページ  "
+              f"本文変更 {changed / pages / 1024:6.1f} KB/ページ  "
+              f"参照先を失った分析 {orphans}件")
+    print()
+
+def benchmark_history_pagination(rows: int = 1_000_000, pages: int = 20):
+    """大量の分析結果に対する履歴・感情検索のページ取得時間（カーソル方式）"""
+    print(f"=== 履歴・感情検索のページ取得（分析結果 {rows:,}件） ===")
+    rng = random.Random(7)
+    labels = ("positive", "negative", "neutral")
+    url_count = rows // 10
+    with temporary_database() as db:
+        with db.get_connection() as conn:
+            conn.executemany(
+                "INSERT INTO urls (id, url, title) VALUES (?, ?, ?)",
+                [(i, f"https://example.com/{i}", f"page {i}") for i in range(1, url_count + 1)]
+            )
+            for start in range(0, rows, 100_000):
+                conn.executemany(
+                    "INSERT INTO analyses (url_id, sentiment_score, sentiment_label, word_count, analyzed_at) "
+                    "VALUES (?, ?, ?, ?, datetime('2024-01-01', ? || ' seconds'))",
+                    [
+                        (rng.randint(1, url_count), round(rng.uniform(-1, 1), 3),
+                         rng.choice(labels), rng.randint(10, 5000), rng.randint(0, 10_000_000))
+                        for _ in range(start, min(start + 100_000, rows))
+                    ]
+                )
+            conn.execute("ANALYZE")
+
+        for label, fetch in (
+            ("get_analysis_history", lambda cursor: main.get_analysis_history.fn(limit=10, cursor=cursor)),
+            ("search_by_sentiment", lambda cursor: main.search_by_sentiment.fn("negative", cursor=cursor)),
+        ):
+            cursor = None
+            start = time.perf_counter()
+            for _ in range(pages):
+                page = fetch(cursor)
+                cursor = page["next_cursor"]
+            elapsed = time.perf_counter() - start
+            print(f"  {label:20}: {elapsed / pages * 1000:6.2f} ms/ページ（{pages}ページ）")
+    print()
+
+def make_html_fixture(size_kb: int, seed: int = 0) -> bytes:
+    """ニュースサイト風のHTMLを生成（スクリプト・ナビゲーション・本文・フッター）"""
+    rng = random.Random(seed)
+    words = ["performance", "database", "great", "analysis", "network", "python",
+             "server", "terrible", "cache", "latency", "データ", "分析"]
+    head = ("<html><head><meta charset=\"utf-8\"><title>Fixture Page</title>"
+            + "<script>var config = {debug: false};</script>" * 20
+            + "<style>.a { color: red; }</style>" * 20 + "</head><body>"
+            + "<header><h1>Site</h1></header><nav>"
+            + "".join(f'<a href="/c/{i}">Category {i}</a>' for i in range(50)) + "</nav>")
+    parts = [head]
+    size = len(head)
+    while size < size_kb * 1024:
+        sentence = " ".join(rng.choices(words, k=12))
+        block = (f'<div class="article"><p>{sentence} <a href="/x">link</a> '
+                 f'<b>{rng.choice(words)}</b></p><script>track({size});</script></div>\n')
+        parts.append(block)
+        size += len(block)
+    parts.append("<footer>copyright</footer></body></html>")
+    return "".join(parts).encode("utf-8")
+
+def benchmark_html_extraction(fixtures_dir: str = None, max_content_length: int = 10000,
+                              repeat: int = 5):
+    """パーサーバックエンドごとの本文抽出速度
+    
+    fixtures_dir を指定すると保存済みの *.html を、省略時は生成したHTMLを使う。
+    """
+    if fixtures_dir:
+        fixtures = {os.path.basename(path): open(path, "rb").read()
+                    for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.html")))}
+    else:
+        fixtures = {f"{size_kb:,}KB": make_html_fixture(size_kb) for size_kb in (20, 200, 2000)}
+    print(f"=== HTML抽出ベンチマーク（max_content_length={max_content_length}） ===")
+    for name, html in fixtures.items():
+        expected = create_extractor("soup", max_content_length).extract(html)["content"]
+        line = []
+        for parser in EXTRACTORS:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                result = create_extractor(parser, max_content_length).extract(html)
+            elapsed = (time.perf_counter() - start) / repeat * 1000
+            mark = "" if result["content"] == expected else "（差異あり）"
+            line.append(f"{parser} {elapsed:8.2f}ms{mark}")
+        print(f"  {name:>8}: " + "  ".join(line))
+    print()
+
+def _legacy_full_analysis(analyzer: TextAnalyzer, text: str) -> None:
+    """従来方式: 感情分析・キーワード抽出・統計でそれぞれテキストを走査"""
+    text_lower = text.lower()
+    for word in analyzer.positive_words | analyzer.negative_words:
+        word in text_lower
+    cleaned = re.sub(r'[^\w\s]', ' ', text.lower())
+    filtered = [word for word in cleaned.split()
+                if word not in analyzer.stop_words and len(word) > 2]
+    Counter(filtered).most_common(10)
+    words = text.split()
+    text.split('.')
+    sum(len(word) for word in words)
+
+def make_text(size_kb: int, seed: int = 0) -> str:
+    """英単語（感情語を含む）を並べたテキスト"""
+    rng = random.Random(seed)
+    words = ["performance", "database", "great", "analysis", "network", "the", "bad",
+             "server", "terrible", "cache", "latency", "with", "python", "excellent."]
+    parts = []
+    size = 0
+    while size < size_kb * 1024:
+        word = rng.choice(words)
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)
+
+def benchmark_text_analysis(repeat: int = 5, batch_size: int = 1000):
+    """TextAnalyzer.full_analysis の文書サイズごとの処理時間"""
+    print("=== テキスト分析ベンチマーク ===")
+    analyzer = TextAnalyzer()
+    for size_kb in (1, 100, 10_240):
+        text = make_text(size_kb)
+        count = repeat if size_kb > 1 else repeat * 200
+        timings = []
+        for func in (lambda: _legacy_full_analysis(analyzer, text),
+                     lambda: analyzer.full_analysis(text)):
+            start = time.perf_counter()
+            for _ in range(count):
+                func()
+            timings.append((time.perf_counter() - start) / count * 1000)
+        print(f"  {size_kb:>6,}KB: 従来 {timings[0]:9.3f}ms  1パス {timings[1]:9.3f}ms/文書"
+              f"（{timings[0] / timings[1]:.1f}倍）")
+
+    texts = [make_text(1, seed=i % (batch_size // 2)) for i in range(batch_size)]
+    start = time.perf_counter()
+    for text in texts:
+        analyzer.full_analysis(text)
+    single = (time.perf_counter() - start) / batch_size * 1000
+    start = time.perf_counter()
+    analyzer.full_analysis_many(texts)
+    many = (time.perf_counter() - start) / batch_size * 1000
+    print(f"  1KB × {batch_size}件（半数が重複）: full_analysis {single:.3f}ms  "
+          f"full_analysis_many {many:.3f}ms/文書\n")
+
+def benchmark_analysis_workers(worker_counts: tuple = (0, 1, 2, 4), documents: int = 200,
+                               size_kb: int = 100, concurrency: int = 8):
+    """分析ワーカープロセス数ごとのスループット
+    
+    サーバーと同じく複数スレッドから同時に full_analysis を呼び出す。
+    """
+    print(f"=== 分析ワーカーベンチマーク（{size_kb}KB × {documents}件, "
+          f"同時実行 {concurrency}, CPU {os.cpu_count()}コア） ===")
+    texts = [make_text(size_kb, seed=i) for i in range(documents)]
+    for workers in worker_counts:
+        pool = AnalysisWorkerPool(TextAnalyzer(), workers=workers)
+        try:
+            pool.warm_up()  # 起動時間は計測に含めない
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(pool.full_analysis, texts))
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.close()
+        label = "サーバープロセス内" if workers == 0 else f"ワーカー {workers}"
+        print(f"  {label:12}: {documents / elapsed:8.1f} docs/sec")
+    print()
+
+if __name__ == "__main__":
+    benchmark_batch_concurrency()
+    # 多数のホストに対する同時リクエスト（数百件を同時に待つ）
+    benchmark_batch_concurrency(hosts=200, pages_per_host=1, concurrencies=(16, 64, 256))
+    benchmark_http_cache()
+    benchmark_content_dedup()
+    benchmark_batch_writes()
+    benchmark_rescrape_writes()
+    benchmark_history_pagination()
+    benchmark_html_extraction()
+    benchmark_text_analysis()
+    benchmark_analysis_workers()
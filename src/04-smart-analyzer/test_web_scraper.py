@@ -0,0 +1,163 @@
+"""
+Web情報収集モジュールの単体テスト
+（ローカルHTTPサーバーを使用し、外部ネットワークには接続しない）
+"""
+import asyncio
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from web_scraper import AsyncWebScraper, WebScraper
+
+LARGE_BODY_MB = 50
+PARAGRAPH = b"<p>" + b"streaming response body with plenty of words " * 20 + b"</p>\n"
+
+class _LargeBodyHandler(BaseHTTPRequestHandler):
+    """大きな本文を少しずつ送信するハンドラ（送信済みバイト数を記録）"""
+    bytes_sent = {}
+
+    def _stream(self, content_type: str, head: bytes, filler: bytes, total: int):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(total))
+        self.end_headers()
+        sent = 0
+        try:
+            self.wfile.write(head)
+            sent += len(head)
+            while sent < total:
+                chunk = filler[:total - sent]
+                self.wfile.write(chunk)
+                sent += len(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.bytes_sent[self.path] = sent
+
+    def do_GET(self):
+        total = LARGE_BODY_MB * 1024 * 1024
+        if self.path == "/large":
+            self._stream("text/html; charset=utf-8",
+                         b"<html><head><title>Large</title></head><body>", PARAGRAPH * 100, total)
+        elif self.path == "/script":
+            # 本文が出てこないページ（抽出が終わらないので上限まで読む）
+            self._stream("text/html", b"<html><body><script>", b"var x = 1;\n" * 10000, total)
+        elif self.path == "/binary":
+            self._stream("application/octet-stream", b"", b"\0" * 65536, total)
+        elif self.path == "/sjis":
+            body = "<html><body><p>日本語のページ</p></body></html>".encode("shift_jis")
+            self._send("text/html; charset=Shift_JIS", body)
+        elif self.path == "/meta":
+            body = ('<html><head><meta charset="euc-jp"><title>メタ</title></head>'
+                    "<body><p>文字コード判定</p></body></html>").encode("euc-jp")
+            self._send("text/html", body)
+        else:
+            self.send_error(404)
+
+    def _send(self, content_type: str, body: bytes):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@contextmanager
+def local_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _LargeBodyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def _peak_memory_mb(func) -> tuple:
+    """func 実行中の Python のメモリ確保量のピーク（MB）"""
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak / 1024 / 1024
+
+def _async_scrape(scraper: WebScraper, url: str) -> dict:
+    async def run():
+        async_scraper = AsyncWebScraper(scraper)
+        try:
+            return await async_scraper.scrape_url(url)
+        finally:
+            await async_scraper.close()
+    return asyncio.run(run())
+
+def test_large_body_is_not_buffered():
+    """巨大な本文でも必要な分だけ読み、メモリ使用量が本文サイズに比例しないこと"""
+    scraper = WebScraper(max_content_length=5000, max_download_bytes=5 * 1024 * 1024)
+    with local_server() as base:
+        for fetch in (scraper.scrape_url, lambda url: _async_scrape(scraper, url)):
+            result, peak_mb = _peak_memory_mb(lambda: fetch(f"{base}/large"))
+            assert result["success"], result
+            assert result["title"] == "Large"
+            assert len(result["content"]) == 5000
+            assert result["content_bytes"] < 1024 * 1024
+            assert peak_mb < 10, f"peak {peak_mb:.1f} MB"
+            assert _LargeBodyHandler.bytes_sent["/large"] < LARGE_BODY_MB * 1024 * 1024
+
+def test_download_size_is_capped():
+    """本文が見つからないページは max_download_bytes で読み込みを打ち切ること"""
+    cap = 2 * 1024 * 1024
+    scraper = WebScraper(max_download_bytes=cap)
+    with local_server() as base:
+        for fetch in (scraper.scrape_url, lambda url: _async_scrape(scraper, url)):
+            result, peak_mb = _peak_memory_mb(lambda: fetch(f"{base}/script"))
+            assert result["success"], result
+            assert result["content_bytes"] == cap
+            assert result["download_truncated"]
+            assert peak_mb < 3 * cap / 1024 / 1024, f"peak {peak_mb:.1f} MB"
+
+def test_non_html_is_rejected_before_body():
+    """HTML以外の Content-Type は本文を読まずにエラーにすること"""
+    scraper = WebScraper()
+    with local_server() as base:
+        for fetch in (scraper.scrape_url, lambda url: _async_scrape(scraper, url)):
+            result = fetch(f"{base}/binary")
+            assert not result["success"]
+            assert "application/octet-stream" in result["error"]
+
+def test_encoding_from_header_and_meta():
+    """ヘッダーの charset、無ければ meta の charset で文字コードを判定すること"""
+    scraper = WebScraper()
+    with local_server() as base:
+        for fetch in (scraper.scrape_url, lambda url: _async_scrape(scraper, url)):
+            assert fetch(f"{base}/sjis")["content"] == "日本語のページ"
+            result = fetch(f"{base}/meta")
+            assert result["title"] == "メタ"
+            assert result["content"] == "メタ文字コード判定"
+
+def test_async_sessions_are_closed_with_their_loop():
+    """asyncio.run ごとのセッションが、close() を呼ばなくてもループの終了時に閉じること"""
+    async_scraper = AsyncWebScraper(WebScraper())
+    sessions = []
+
+    async def fetch(url):
+        result = await async_scraper.scrape_url(url)
+        sessions.append(await async_scraper._get_session())
+        return result
+
+    with local_server() as base:
+        for _ in range(3):
+            assert asyncio.run(fetch(f"{base}/sjis"))["success"]
+    assert len(set(map(id, sessions))) == 3
+    assert all(session.closed for session in sessions)
+    assert async_scraper._sessions == {} and async_scraper._closers == {}
+
+if __name__ == "__main__":
+    test_large_body_is_not_buffered()
+    test_download_size_is_capped()
+    test_non_html_is_rejected_before_body()
+    test_encoding_from_header_and_meta()
+    test_async_sessions_are_closed_with_their_loop()
+    print("✅ すべてのテストが成功しました")
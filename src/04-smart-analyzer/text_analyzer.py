@@ -3,9 +3,14 @@
 """
 import re
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
 from typing import Dict, List, Tuple
 import json
 import time
+from settings import config
 
 try:
     from textblob import TextBlob
@@ -13,6 +18,9 @@ try:
 except ImportError:
     TEXTBLOB_AVAILABLE = False
 
+# 単語の切り出し（記号を区切りとして扱う）
+TOKEN_PATTERN = re.compile(r'\w+')
+
 class TextAnalyzer:
     def __init__(self):
         self.stop_words = {
@@ -26,8 +34,35 @@ class TextAnalyzer:
             'who', 'oil', 'sit', 'now', 'find', 'down', 'day', 'did', 'get',
             'come', 'made', 'may', 'part'
         }
+        # 簡易感情分析の語彙
+        self.positive_words = frozenset([
+            'good', 'great', 'excellent', 'amazing', 'wonderful',
+            'fantastic', 'awesome', 'perfect', 'best', 'love'
+        ])
+        self.negative_words = frozenset([
+            'bad', 'terrible', 'awful', 'horrible', 'worst',
+            'hate', 'disgusting', 'disappointing', 'poor', 'fail'
+        ])
     
-    def analyze_sentiment(self, text: str) -> Dict:
+    def tokenize(self, text: str, words: List[str] = None) -> Counter:
+        """小文字化した単語（\\w+ 単位）の出現回数（感情分析とキーワード抽出で共有）
+        
+        空白区切りの単語列 words を渡すと、それを再利用して分割し直さない。
+        """
+        if words is None:
+            words = text.lower().split()
+        
+        # 記号を含む単語だけを正規表現で分割する（判定は異なり語ごとに1回）
+        token_counts = Counter()
+        for word, count in Counter(words).items():
+            if TOKEN_PATTERN.fullmatch(word):
+                token_counts[word] += count
+            else:
+                for token in TOKEN_PATTERN.findall(word):
+                    token_counts[token] += count
+        return token_counts
+    
+    def analyze_sentiment(self, text: str, token_counts: Counter = None) -> Dict:
         """感情分析を実行"""
         if TEXTBLOB_AVAILABLE:
             blob = TextBlob(text)
@@ -50,18 +85,15 @@ class TextAnalyzer:
             }
         else:
             # 簡易感情分析（TextBlobが使えない場合）
-            return self._simple_sentiment_analysis(text)
+            return self._simple_sentiment_analysis(text, token_counts)
     
-    def _simple_sentiment_analysis(self, text: str) -> Dict:
-        """簡易感情分析"""
-        positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 
-                         'fantastic', 'awesome', 'perfect', 'best', 'love']
-        negative_words = ['bad', 'terrible', 'awful', 'horrible', 'worst', 
-                         'hate', 'disgusting', 'disappointing', 'poor', 'fail']
+    def _simple_sentiment_analysis(self, text: str, token_counts: Counter = None) -> Dict:
+        """簡易感情分析（語彙に含まれる単語が何種類出現したか）"""
+        if token_counts is None:
+            token_counts = self.tokenize(text)
         
-        text_lower = text.lower()
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        negative_count = sum(1 for word in negative_words if word in text_lower)
+        positive_count = sum(1 for word in self.positive_words if word in token_counts)
+        negative_count = sum(1 for word in self.negative_words if word in token_counts)
         
         total = positive_count + negative_count
         if total == 0:
@@ -85,47 +117,52 @@ class TextAnalyzer:
             "negative_count": negative_count
         }
     
-    def extract_keywords(self, text: str, top_n: int = 10) -> List[Dict]:
+    def extract_keywords(self, text: str, top_n: int = 10,
+                         token_counts: Counter = None) -> List[Dict]:
         """キーワード抽出"""
-        # テキストクリーニング
-        text = re.sub(r'[^\w\s]', ' ', text.lower())
-        words = text.split()
+        if token_counts is None:
+            token_counts = self.tokenize(text)
         
-        # ストップワード除去と長さフィルタ
-        filtered_words = [
-            word for word in words 
+        # ストップワード除去と長さフィルタ（異なり語ごとに1回だけ判定）
+        word_counts = Counter({
+            word: count for word, count in token_counts.items()
             if word not in self.stop_words and len(word) > 2
-        ]
-        
-        # 頻度カウント
-        word_counts = Counter(filtered_words)
+        })
+        total = sum(word_counts.values())
         
         # 上位キーワード取得
         top_keywords = word_counts.most_common(top_n)
         
         return [
-            {"word": word, "count": count, "frequency": count/len(filtered_words)}
+            {"word": word, "count": count, "frequency": count/total}
             for word, count in top_keywords
         ]
     
-    def get_text_statistics(self, text: str) -> Dict:
+    def get_text_statistics(self, text: str, words: List[str] = None) -> Dict:
         """テキスト統計情報"""
-        words = text.split()
-        sentences = text.split('.')
+        if words is None:
+            words = text.split()
+        sentence_count = text.count('.') + 1  # len(text.split('.')) と同じ
         
         return {
             "word_count": len(words),
-            "sentence_count": len(sentences),
+            "sentence_count": sentence_count,
             "character_count": len(text),
-            "average_word_length": sum(len(word) for word in words) / len(words) if words else 0,
-            "average_sentence_length": len(words) / len(sentences) if sentences else 0
+            "average_word_length": sum(map(len, words)) / len(words) if words else 0,
+            "average_sentence_length": len(words) / sentence_count
         }
     
     def full_analysis(self, text: str) -> Dict:
-        """完全分析"""
-        sentiment = self.analyze_sentiment(text)
-        keywords = self.extract_keywords(text)
-        statistics = self.get_text_statistics(text)
+        """完全分析（単語分割は1回だけ行い、各分析で共有）"""
+        text_lower = text.lower()
+        words = text_lower.split()
+        token_counts = self.tokenize(text_lower, words)
+        sentiment = self.analyze_sentiment(text, token_counts)
+        keywords = self.extract_keywords(text, token_counts=token_counts)
+        # 小文字化で文字数が変わる文字（例: 'İ'）が無ければ単語長も同じなので再利用
+        statistics = self.get_text_statistics(
+            text, words if len(text_lower) == len(text) else None
+        )
         
         return {
             "sentiment": sentiment,
@@ -133,6 +170,105 @@ class TextAnalyzer:
             "statistics": statistics,
             "analyzed_at": time.time()
         }
+    
+    def full_analysis_many(self, texts: List[str]) -> List[Dict]:
+        """複数テキストをまとめて分析（同一テキストは1回だけ分析）
+        
+        Returns:
+            texts と同じ順序の分析結果
+        """
+        memo = {}
+        results = []
+        for text in texts:
+            if text not in memo:
+                memo[text] = self.full_analysis(text)
+            results.append(dict(memo[text]))
+        return results
+
+# ワーカープロセス内の分析器（_init_worker で1回だけ作成）
+_worker_analyzer = None
+
+def _init_worker():
+    """ワーカープロセスの初期化（TextBlob の辞書などをここで読み込んでおく）"""
+    global _worker_analyzer
+    _worker_analyzer = TextAnalyzer()
+    _worker_analyzer.full_analysis("warm up the analyzer. This is a good start.")
+
+def _analyze_in_worker(text: str) -> Dict:
+    return _worker_analyzer.full_analysis(text)
+
+def _ping_worker(_) -> bool:
+    return _worker_analyzer is not None
+
+class AnalysisWorkerPool:
+    """CPU処理のテキスト分析を別プロセスで実行するプール
+    
+    workers が 0 の場合は呼び出し元のスレッドでそのまま分析する。
+    ワーカーは spawn で起動する（スレッドを使うサーバープロセスを fork しない）。
+    """
+    def __init__(self, analyzer: TextAnalyzer, workers: int = 0):
+        self.analyzer = analyzer
+        self.workers = max(0, workers)
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+            return self._executor
+    
+    def warm_up(self):
+        """全ワーカーを起動し、初期化が終わるまで待つ"""
+        if self.enabled:
+            list(self._get_executor().map(_ping_worker, range(self.workers)))
+    
+    def full_analysis(self, text: str) -> Dict:
+        """完全分析（ワーカーが使えない場合はこのプロセスで実行）"""
+        if not self.enabled:
+            return self.analyzer.full_analysis(text)
+        try:
+            return self._get_executor().submit(_analyze_in_worker, text).result()
+        except BrokenProcessPool:
+            # ワーカーが異常終了した場合は次回作り直す
+            self._discard_executor()
+            return self.analyzer.full_analysis(text)
+    
+    def full_analysis_many(self, texts: List[str]) -> List[Dict]:
+        """複数テキストをワーカーに分散して分析（結果は入力順）"""
+        if not self.enabled:
+            return self.analyzer.full_analysis_many(texts)
+        try:
+            chunksize = max(1, len(texts) // (self.workers * 4))
+            return list(self._get_executor().map(_analyze_in_worker, texts, chunksize=chunksize))
+        except BrokenProcessPool:
+            self._discard_executor()
+            return self.analyzer.full_analysis_many(texts)
+    
+    def _discard_executor(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def close(self):
+        """ワーカーを停止（実行中の分析は完了を待ち、未着手のものは取り消す）"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
 
 # グローバルインスタンス
-analyzer = TextAnalyzer() 
\ No newline at end of file
+analyzer = TextAnalyzer()
+analysis_pool = AnalysisWorkerPool(
+    analyzer,
+    workers=config.get("analysis", {}).get("worker_processes", 0)
+) 
\ No newline at end of file
@@ -2,65 +2,234 @@
 Web情報収集モジュール
 """
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
+import asyncio
+import hashlib
+import threading
 import time
 from typing import Dict, List, Optional
+from settings import config
+from html_extractor import create_extractor, SoupExtractor
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+class HostRateLimiter:
+    """ホスト単位のトークンバケット型レート制限
+    
+    同じホストへのリクエストは interval 秒に1回（burst 回までは連続可）に抑え、
+    異なるホストへのリクエストは互いに待たせない。
+    """
+    def __init__(self, interval: float = 1.0, burst: int = 1):
+        self.interval = interval
+        self.burst = max(1, burst)
+        self._buckets = {}  # host -> [トークン数, 最終補充時刻]
+        self._lock = threading.Lock()
+    
+    def _reserve(self, url: str) -> float:
+        """トークンを1つ予約し、使えるようになるまでの待ち時間を返す"""
+        if self.interval <= 0:
+            return 0.0
+        host = urlparse(url).netloc
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(host, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) / self.interval)
+            # 不足分は負のトークンとして予約し、その分だけ待つ
+            tokens -= 1
+            self._buckets[host] = (tokens, now)
+        return max(0.0, -tokens * self.interval)
+    
+    def acquire(self, url: str) -> float:
+        """リクエスト可能になるまで待機（待った秒数を返す）"""
+        wait = self._reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+    
+    async def acquire_async(self, url: str) -> float:
+        """acquire の非同期版（イベントループを止めずに待機）"""
+        wait = self._reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+def conditional_headers(etag: Optional[str] = None,
+                        last_modified: Optional[str] = None) -> Dict[str, str]:
+    """条件付きリクエスト用のヘッダー"""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
+
+# 本文を読む対象とする Content-Type（ヘッダーが無い場合も読む）
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+READ_CHUNK_SIZE = 65536
+
+def check_content_type(headers) -> Optional[str]:
+    """HTML以外の Content-Type ならエラーメッセージを返す"""
+    content_type = headers.get("Content-Type", "")
+    mime = content_type.split(";")[0].strip().lower()
+    if mime and mime not in HTML_CONTENT_TYPES:
+        return f"Unsupported Content-Type: {mime}"
+    return None
+
+def header_charset(headers) -> Optional[str]:
+    """Content-Type ヘッダーの charset（指定が無ければ None）"""
+    for param in headers.get("Content-Type", "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            return value.strip().strip('"\'')
+    return None
+
+class PageReader:
+    """レスポンス本文を少しずつ受け取り、抽出しながら読み込み量を制限する
+    
+    本文の抽出が済んだ時点、または max_download_bytes に達した時点で
+    feed() が False を返すので、呼び出し側はそこで読み込みをやめる。
+    """
+    def __init__(self, scraper: "WebScraper", url: str, encoding: Optional[str] = None):
+        self.scraper = scraper
+        self.url = url
+        self.encoding = encoding
+        self.extractor = create_extractor(scraper.parser, scraper.max_content_length, encoding)
+        self.bytes_read = 0
+        self._chunks = []  # 抽出に失敗した場合のフォールバック用（上限までしか溜まらない）
+        self._error = None
+    
+    def feed(self, chunk: bytes) -> bool:
+        """本文の一部を渡す（続きを読むべきなら True）"""
+        chunk = chunk[:self.scraper.max_download_bytes - self.bytes_read]
+        self.bytes_read += len(chunk)
+        self._chunks.append(chunk)
+        if self._error is None:
+            try:
+                self.extractor.feed(chunk)
+            except Exception as e:
+                self._error = e
+        if self.bytes_read >= self.scraper.max_download_bytes:
+            return False
+        return self._error is not None or not self.extractor.done
+    
+    def finish(self, headers=None) -> Dict:
+        """抽出結果（＋次回の条件付きリクエスト用の情報）を返す"""
+        try:
+            try:
+                if self._error is not None:
+                    raise self._error
+                extracted = self.extractor.close()
+            except Exception:
+                # 高速パーサーで失敗した場合は従来の BeautifulSoup で抽出
+                extracted = SoupExtractor(self.scraper.max_content_length, self.encoding).extract(
+                    b"".join(self._chunks)
+                )
+        except Exception as e:
+            return self.scraper._error_result(self.url, f"Parse Error: {str(e)}")
+        
+        # 読み込み量は抽出の打ち切り位置で変わるため、ハッシュは抽出結果から求める
+        digest = hashlib.sha256(
+            (extracted["title"] + "\n" + extracted["content"]).encode("utf-8")
+        ).hexdigest()
+        headers = headers or {}
+        return {
+            "success": True,
+            "url": self.url,
+            "title": extracted["title"],
+            "content": extracted["content"],
+            "content_length": extracted["content_length"],
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "content_hash": digest,
+            "content_bytes": self.bytes_read,
+            "download_truncated": self.bytes_read >= self.scraper.max_download_bytes,
+            "scraped_at": time.time()
+        }
+
+def not_modified_result(url: str) -> Dict:
+    """304 Not Modified の結果"""
+    return {
+        "success": True,
+        "url": url,
+        "not_modified": True,
+        "scraped_at": time.time()
+    }
 
 class WebScraper:
-    def __init__(self):
+    def __init__(self, pool_size: int = 10, timeout: float = 10,
+                 parser: str = "auto", max_content_length: int = 5000,
+                 max_download_bytes: int = 5 * 1024 * 1024):
+        self.timeout = timeout
+        self.parser = parser
+        self.max_content_length = max_content_length
+        self.max_download_bytes = max_download_bytes
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        # 並列実行時にホストごとの接続を使い回せるようプールを広げる
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
     
-    def scrape_url(self, url: str) -> Dict:
-        """URLからコンテンツを取得"""
-        try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # タイトル取得
-            title = soup.find('title')
-            title_text = title.get_text().strip() if title else "No Title"
-            
-            # 本文取得（基本的なクリーニング）
-            for script in soup(["script", "style", "nav", "footer", "header"]):
-                script.decompose()
-            
-            content = soup.get_text()
-            content = ' '.join(content.split())  # 余分な空白を削除
-            
-            return {
-                "success": True,
-                "url": url,
-                "title": title_text,
-                "content": content[:5000],  # 最初の5000文字
-                "content_length": len(content),
-                "scraped_at": time.time()
-            }
+    def scrape_url(self, url: str, etag: Optional[str] = None,
+                   last_modified: Optional[str] = None) -> Dict:
+        """URLからコンテンツを取得
         
+        etag / last_modified を渡すと条件付きリクエストを送り、
+        304 の場合は本文を解析せず not_modified を返す。
+        本文はストリーミングで読み、必要な分だけ受信したら接続を閉じる。
+        """
+        try:
+            with self.session.get(
+                url, timeout=self.timeout, stream=True,
+                headers=conditional_headers(etag, last_modified)
+            ) as response:
+                if response.status_code == 304:
+                    return not_modified_result(url)
+                response.raise_for_status()
+                
+                # 本文を受信する前に Content-Type を確認
+                error = check_content_type(response.headers)
+                if error:
+                    return self._error_result(url, error)
+                
+                reader = PageReader(self, url, encoding=header_charset(response.headers))
+                for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+                    if not reader.feed(chunk):
+                        break
+                headers = response.headers
         except requests.exceptions.RequestException as e:
-            return {
-                "success": False,
-                "url": url,
-                "error": f"HTTP Error: {str(e)}",
-                "scraped_at": time.time()
-            }
-        except Exception as e:
-            return {
-                "success": False,
-                "url": url,
-                "error": f"Parse Error: {str(e)}",
-                "scraped_at": time.time()
-            }
+            return self._error_result(url, f"HTTP Error: {str(e)}")
+        
+        return reader.finish(headers)
+    
+    def parse_html(self, url: str, html: bytes, encoding: Optional[str] = None) -> Dict:
+        """取得済みのHTMLからタイトルと本文を抽出"""
+        reader = PageReader(self, url, encoding)
+        for start in range(0, len(html), READ_CHUNK_SIZE):
+            if not reader.feed(html[start:start + READ_CHUNK_SIZE]):
+                break
+        return reader.finish()
+    
+    def _error_result(self, url: str, error: str) -> Dict:
+        return {
+            "success": False,
+            "url": url,
+            "error": error,
+            "scraped_at": time.time()
+        }
     
     def extract_links(self, url: str, base_url: str = None) -> List[str]:
         """ページ内のリンクを抽出"""
         try:
-            response = self.session.get(url, timeout=10)
+            response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -86,5 +255,108 @@ class WebScraper:
         except:
             return False
 
+class AsyncWebScraper:
+    """aiohttp を使った非同期スクレイパー
+    
+    イベントループごとに1つの ClientSession（接続プール + Keep-Alive）を使い回し、
+    全体の同時接続数とホストごとの同時接続数を TCPConnector で制限する。
+    セッションは close() か、ループの終了時（asyncio.run が残りのタスクを打ち切るとき）に閉じる。
+    HTMLの解析は CPU 処理なのでスレッドに逃がし、イベントループを塞がない。
+    aiohttp が無い環境では同期版 WebScraper をスレッドで実行する。
+    """
+    def __init__(self, scraper: WebScraper, timeout: float = 10,
+                 max_connections: int = 100, max_connections_per_host: int = 4,
+                 keepalive_timeout: float = 30):
+        self.scraper = scraper
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._sessions = {}  # イベントループ → ClientSession
+        self._closers = {}  # イベントループ → セッションを閉じるタスク
+    
+    async def _get_session(self):
+        """実行中のイベントループに紐づくセッションを取得（無ければ作成）"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=dict(self.scraper.session.headers)
+            )
+            self._sessions[loop] = session
+            self._closers[loop] = loop.create_task(self._close_when_cancelled(loop, session))
+        return session
+    
+    async def _close_when_cancelled(self, loop, session):
+        """打ち切られるまで待ち、セッションを閉じる（close() またはループの終了時）"""
+        try:
+            await loop.create_future()
+        finally:
+            if self._sessions.get(loop) is session:
+                del self._sessions[loop]
+                self._closers.pop(loop, None)
+            await session.close()
+    
+    async def scrape_url(self, url: str, etag: Optional[str] = None,
+                         last_modified: Optional[str] = None) -> Dict:
+        """URLからコンテンツを非同期に取得（条件付きリクエスト対応）"""
+        if not AIOHTTP_AVAILABLE:
+            return await asyncio.to_thread(self.scraper.scrape_url, url, etag, last_modified)
+        
+        try:
+            session = await self._get_session()
+            async with session.get(url, headers=conditional_headers(etag, last_modified)) as response:
+                if response.status == 304:
+                    return not_modified_result(url)
+                response.raise_for_status()
+                
+                # 本文を受信する前に Content-Type を確認
+                error = check_content_type(response.headers)
+                if error:
+                    return self.scraper._error_result(url, error)
+                
+                # 受信したチャンクを順に抽出器へ渡す（解析はスレッドで実行）
+                reader = PageReader(self.scraper, url, encoding=header_charset(response.headers))
+                async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+                    if not await asyncio.to_thread(reader.feed, chunk):
+                        break
+                headers = response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return self.scraper._error_result(url, f"HTTP Error: {str(e) or type(e).__name__}")
+        
+        return await asyncio.to_thread(reader.finish, headers)
+    
+    async def close(self):
+        """実行中のイベントループのセッションを閉じる（サーバー終了時）"""
+        closer = self._closers.pop(asyncio.get_running_loop(), None)
+        if closer is not None:
+            closer.cancel()
+            await asyncio.gather(closer, return_exceptions=True)
+
 # グローバルインスタンス
-scraper = WebScraper() 
\ No newline at end of file
+scraping_config = config.get("scraping", {})
+scraper = WebScraper(
+    pool_size=scraping_config.get("max_connections", 100),
+    timeout=scraping_config.get("timeout", 10),
+    parser=scraping_config.get("parser", "auto"),
+    max_content_length=scraping_config.get("max_content_length", 5000),
+    max_download_bytes=scraping_config.get("max_download_bytes", 5 * 1024 * 1024)
+)
+async_scraper = AsyncWebScraper(
+    scraper,
+    timeout=scraping_config.get("timeout", 10),
+    max_connections=scraping_config.get("max_connections", 100),
+    max_connections_per_host=scraping_config.get("max_connections_per_host", 4)
+)
+rate_limiter = HostRateLimiter(
+    interval=scraping_config.get("rate_limit", 1.0),
+    burst=scraping_config.get("rate_limit_burst", 1)
+)